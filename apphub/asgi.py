@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "apphub.settings")
 
 application = get_asgi_application()
+
+# Web processes run the queued jobs, management commands do not load this.
+from distribute.jobs import start_in_process_workers  # noqa: E402
+
+start_in_process_workers()
@@ -118,6 +118,42 @@
 # DATABASE_PASSWORD = ''
 
 
+# Cache settings
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# CACHE_BACKEND
+# Default: 'django.core.cache.backends.locmem.LocMemCache'
+# The cache shared by the apphub processes. The default one is private to each
+# process, use a shared one when running more than one.
+# Options:
+#   - 'django.core.cache.backends.locmem.LocMemCache'
+#   - 'django.core.cache.backends.redis.RedisCache' (requires redis)
+#   - 'django.core.cache.backends.filebased.FileBasedCache'
+#   - 'django.core.cache.backends.db.DatabaseCache' (run manage.py createcachetable)
+# CACHE_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+
+# CACHE_LOCATION
+# Default: '' (Empty string)
+# Where the cache lives: the redis url ('redis://127.0.0.1:6379'), the
+# directory of the file cache or the table of the database cache.
+# CACHE_LOCATION = ''
+
+# CACHE_TIMEOUT
+# Default: 60
+# Seconds app details and package and release lists stay cached. They are
+# dropped as soon as the app, its packages or releases change, the timeout
+# only bounds other changes such as a renamed uploader. Keep it well below
+# the lifetime of the storage's signed download urls.
+# CACHE_TIMEOUT = 60
+
+# CACHE_APP_DATA
+# Default: True with a shared CACHE_BACKEND, False with the local memory one
+# Cache app details and package and release lists. A per-process cache is
+# not told about changes made by other processes, such as ingests run by
+# `python manage.py run_workers`, so it would serve stale lists.
+# CACHE_APP_DATA = False
+
+
 # Auth settings
 
 # ENABLE_EMAIL_ACCOUNT
@@ -189,6 +225,100 @@
 #   - 'TencentCOS'
 # STORAGE_TYPE = 'LocalFileSystem'
 
+# ASYNC_PACKAGE_INGEST
+# Default: False
+# If True, confirming a package uploaded directly to the storage (PUT upload/package/record/<id>) # noqa: E501
+# returns 202 at once and the package is parsed and stored in the background.
+# Clients poll the record (GET) until its status is 'completed' or 'failed'.
+# ASYNC_PACKAGE_INGEST = False
+
+# CHUNKED_UPLOAD_CHUNK_SIZE
+# Default: 8388608 (8 MB)
+# The chunk size of resumable uploads (upload/package/chunked) on the
+# LocalFileSystem storage. Each chunk is one PUT request, keep it below the
+# request body limit of the proxy in front of apphub.
+# CHUNKED_UPLOAD_CHUNK_SIZE = 8388608
+
+# CHUNKED_UPLOAD_MAX_SIZE
+# Default: 4294967296 (4 GB)
+# The largest package a resumable upload session accepts.
+# CHUNKED_UPLOAD_MAX_SIZE = 4294967296
+
+# STORAGE_MULTIPART_THRESHOLD, STORAGE_MULTIPART_PART_SIZE,
+# STORAGE_MULTIPART_THREADS, STORAGE_MULTIPART_RETRIES
+# Default: 67108864 (64 MB), 16777216 (16 MB), 4, 3
+# Files stored on AlibabaCloudOSS or AmazonAWSS3 from at least the threshold
+# size are uploaded in parts of the part size, from that many threads.
+# A failed part is retried (OSS: up to STORAGE_MULTIPART_RETRIES times,
+# S3: by boto3's own retries) before the whole upload is given up.
+# STORAGE_MULTIPART_THRESHOLD = 67108864
+# STORAGE_MULTIPART_PART_SIZE = 16777216
+# STORAGE_MULTIPART_THREADS = 4
+# STORAGE_MULTIPART_RETRIES = 3
+
+
+# Background job settings
+# Webhooks and queued package ingests are stored as jobs in the database and
+# run by workers, so they survive restarts and can be spread over machines.
+
+# JOB_WORKER_THREADS
+# Default: 1
+# Worker threads each web process (apphub.wsgi or apphub.asgi) starts when
+# it loads. Set it to 0 when the jobs are run by
+# `python manage.py run_workers` instead.
+# JOB_WORKER_THREADS = 1
+
+# JOB_WORKERS
+# Default: 4
+# Worker threads of `python manage.py run_workers` (overridden by --workers).
+# JOB_WORKERS = 4
+
+# JOB_VISIBILITY_TIMEOUT
+# Default: 900
+# Seconds a worker may spend on a job. A job still running after that is
+# taken to be lost with its worker and run again.
+# JOB_VISIBILITY_TIMEOUT = 900
+
+# JOB_MAX_ATTEMPTS
+# Default: 5
+# Attempts before a failing job is given up and kept as dead. The delay
+# between attempts doubles from 10 seconds up to an hour.
+# JOB_MAX_ATTEMPTS = 5
+
+# WEBHOOK_THREADS, WEBHOOK_MAX_CONCURRENCY
+# Default: 8, 2
+# Webhooks of an event are sent at once from up to WEBHOOK_THREADS threads,
+# with at most WEBHOOK_MAX_CONCURRENCY requests to the same webhook.
+# WEBHOOK_THREADS = 8
+# WEBHOOK_MAX_CONCURRENCY = 2
+
+# WEBHOOK_CONNECT_TIMEOUT, WEBHOOK_READ_TIMEOUT
+# Default: 5, 10
+# Seconds to wait for a webhook receiver to accept the connection and to answer.
+# WEBHOOK_CONNECT_TIMEOUT = 5
+# WEBHOOK_READ_TIMEOUT = 10
+
+# WEBHOOK_ATTEMPTS
+# Default: 3
+# Attempts to send a webhook when the connection fails or the receiver
+# answers 429 or 5xx.
+# WEBHOOK_ATTEMPTS = 3
+
+# WEBHOOK_DIGEST_WINDOW
+# Default: 30
+# Seconds events of an app are collected before its webhooks are called.
+# Every package uploaded by a CI pipeline within the window is sent as one
+# digest. With 0 they are called as soon as a worker is free.
+# WEBHOOK_DIGEST_WINDOW = 30
+
+# STORE_TIMEOUT, STORE_DEADLINE
+# Default: 5, 10
+# Seconds to wait for one store to answer a version lookup, and for all the
+# stores of an app together. The stores are asked at once, the ones that
+# have not answered by the deadline are left out of the result.
+# STORE_TIMEOUT = 5
+# STORE_DEADLINE = 10
+
 
 # AlibabaCloudOSS settings
 # ALIYUN_OSS_ACCESS_KEY_ID = ''
@@ -97,6 +97,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "application.middleware.AppResolverMiddleware",
 ]
 
 ROOT_URLCONF = "apphub.urls"
@@ -144,6 +145,28 @@ else:
 
 KEY_PREFIX = "apphub_"
 
+# Cache
+CACHE_BACKEND = get_env_value(
+    "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+)
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": get_env_value("CACHE_LOCATION", default=""),
+        "TIMEOUT": int(get_env_value("CACHE_TIMEOUT", 60)),
+        "KEY_PREFIX": KEY_PREFIX,
+    }
+}
+# App data is only cached in a cache shared by all processes, a private one
+# would keep serving what another process (run_workers) changed.
+PRIVATE_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+CACHE_APP_DATA = get_env_value(
+    "CACHE_APP_DATA", default=CACHE_BACKEND not in PRIVATE_CACHE_BACKENDS
+)
+
 # Email
 EMAIL_HOST = get_env_value("EMAIL_HOST", "localhost")
 EMAIL_PORT = int(get_env_value("EMAIL_PORT", 25))
@@ -224,6 +247,37 @@ STORAGE_MAP = {
 
 DEFAULT_FILE_STORAGE = STORAGE_MAP.get(STORAGE_TYPE, "storage.nginx.NginxPrivateFileStorage")  # noqa: E501
 
+ASYNC_PACKAGE_INGEST = get_env_value("ASYNC_PACKAGE_INGEST", False)
+CHUNKED_UPLOAD_CHUNK_SIZE = int(
+    get_env_value("CHUNKED_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+)
+CHUNKED_UPLOAD_MAX_SIZE = int(
+    get_env_value("CHUNKED_UPLOAD_MAX_SIZE", 4 * 1024 * 1024 * 1024)
+)
+STORAGE_MULTIPART_THRESHOLD = int(
+    get_env_value("STORAGE_MULTIPART_THRESHOLD", 64 * 1024 * 1024)
+)
+STORAGE_MULTIPART_PART_SIZE = int(
+    get_env_value("STORAGE_MULTIPART_PART_SIZE", 16 * 1024 * 1024)
+)
+STORAGE_MULTIPART_THREADS = int(get_env_value("STORAGE_MULTIPART_THREADS", 4))
+STORAGE_MULTIPART_RETRIES = int(get_env_value("STORAGE_MULTIPART_RETRIES", 3))
+
+JOB_WORKER_THREADS = int(get_env_value("JOB_WORKER_THREADS", 1))
+JOB_WORKERS = int(get_env_value("JOB_WORKERS", 4))
+JOB_VISIBILITY_TIMEOUT = int(get_env_value("JOB_VISIBILITY_TIMEOUT", 15 * 60))
+JOB_MAX_ATTEMPTS = int(get_env_value("JOB_MAX_ATTEMPTS", 5))
+
+WEBHOOK_THREADS = int(get_env_value("WEBHOOK_THREADS", 8))
+WEBHOOK_MAX_CONCURRENCY = int(get_env_value("WEBHOOK_MAX_CONCURRENCY", 2))
+WEBHOOK_CONNECT_TIMEOUT = float(get_env_value("WEBHOOK_CONNECT_TIMEOUT", 5))
+WEBHOOK_READ_TIMEOUT = float(get_env_value("WEBHOOK_READ_TIMEOUT", 10))
+WEBHOOK_ATTEMPTS = int(get_env_value("WEBHOOK_ATTEMPTS", 3))
+WEBHOOK_DIGEST_WINDOW = int(get_env_value("WEBHOOK_DIGEST_WINDOW", 30))
+
+STORE_TIMEOUT = float(get_env_value("STORE_TIMEOUT", 5))
+STORE_DEADLINE = float(get_env_value("STORE_DEADLINE", 10))
+
 
 if DEFAULT_FILE_STORAGE == "storage.aliyun.AliyunOssMediaStorage":
     ALIYUN_OSS_ACCESS_KEY_ID = get_env_value("ALIYUN_OSS_ACCESS_KEY_ID")
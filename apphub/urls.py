@@ -36,15 +36,24 @@ urlpatterns = [
     path("upload/package", TokenAppPackageUpload.as_view(), name="token-package-upload"),
     path("upload/package/request", RequestUploadPackage.as_view()),
     path("upload/package/record/<record_id>", CheckUploadPackage.as_view()),
+    path("upload/package/chunked", ChunkedUploadPackage.as_view(), name="token-package-chunked-upload"),
+    path("upload/package/chunked/<int:record_id>", ChunkedUploadPackageSession.as_view()),
+    path("upload/package/chunked/<int:record_id>/<int:index>", ChunkedUploadPackageSession.as_view()),
     path("upload/symbol/<int:package_id>", TokenAppSymbolUpload.as_view(), name="token-symbol-upload"),
     path("upload/symbol/request/<int:package_id>", RequestUploadSymbolFile.as_view()),
     path("upload/symbol/record/<int:record_id>", CheckUploadSymbolFile.as_view()),
     path("users/<namespace>/apps/<path>/packages/upload", UserAppPackageUpload.as_view(), name="user-package-upload"),
     path("users/<namespace>/apps/<path>/packages/upload/request", UserAppRequestUploadPackage.as_view()),
     path("users/<namespace>/apps/<path>/packages/upload/record/<int:record_id>", UserAppCheckUploadPackage.as_view()),
+    path("users/<namespace>/apps/<path>/packages/upload/chunked", UserAppChunkedUploadPackage.as_view(), name="user-package-chunked-upload"),
+    path("users/<namespace>/apps/<path>/packages/upload/chunked/<int:record_id>", UserAppChunkedUploadPackageSession.as_view()),
+    path("users/<namespace>/apps/<path>/packages/upload/chunked/<int:record_id>/<int:index>", UserAppChunkedUploadPackageSession.as_view()),
     path("orgs/<namespace>/apps/<path>/packages/upload", OrganizationAppPackageUpload.as_view(), name="org-package-upload"),
     path("orgs/<namespace>/apps/<path>/packages/upload/request", OrganizationAppRequestUploadPackage.as_view()),
     path("orgs/<namespace>/apps/<path>/packages/upload/record/<int:record_id>", OrganizationAppCheckUploadPackage.as_view()),
+    path("orgs/<namespace>/apps/<path>/packages/upload/chunked", OrganizationAppChunkedUploadPackage.as_view(), name="org-package-chunked-upload"),
+    path("orgs/<namespace>/apps/<path>/packages/upload/chunked/<int:record_id>", OrganizationAppChunkedUploadPackageSession.as_view()),
+    path("orgs/<namespace>/apps/<path>/packages/upload/chunked/<int:record_id>/<int:index>", OrganizationAppChunkedUploadPackageSession.as_view()),
     path("users/<namespace>/apps/<path>/packages/upload/symbol", UserAppSymbolUpload.as_view(), name="user-symbol-upload"),
     path("users/<namespace>/apps/<path>/packages/upload/symbol/request", UserAppRequestUploadSymbolFile.as_view()),
     path("users/<namespace>/apps/<path>/packages/upload/symbol/record/<int:record_id>", UserAppCheckUploadSymbolFile.as_view()),
@@ -98,6 +107,10 @@ urlpatterns = [
         OrganizationUniversalAppWebhookDetail.as_view(),
         name="org-app-webhook",
     ),
+    path(
+        "orgs/<namespace>/apps/<path>/webhooks/<webhook_id>/deliveries",
+        OrganizationUniversalAppWebhookDeliveryList.as_view(),
+    ),
     path("orgs/<namespace>/apps/<path>/packages", OrganizationAppPackageList.as_view()),
     path(
         "orgs/<namespace>/apps/<path>/packages/<int:package_id>",
@@ -164,6 +177,10 @@ urlpatterns = [
         UserUniversalAppWebhookDetail.as_view(),
         name="user-app-webhook",
     ),
+    path(
+        "users/<namespace>/apps/<path>/webhooks/<webhook_id>/deliveries",
+        UserUniversalAppWebhookDeliveryList.as_view(),
+    ),
     path("users/<namespace>/apps/<path>/packages", UserAppPackageList.as_view()),
     path(
         "users/<namespace>/apps/<path>/packages/<int:package_id>",
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ApplicationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "application"
+
+    def ready(self):
+        from application.roles import fill_effective_roles
+
+        post_migrate.connect(fill_effective_roles, sender=self)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from application.roles import rebuild_effective_roles
+
+
+class Command(BaseCommand):
+    help = "Rebuild the effective app roles from app and organization members."
+
+    def handle(self, *args, **options):
+        count = rebuild_effective_roles()
+        self.stdout.write("{} effective roles written.".format(count))
@@ -0,0 +1,13 @@
+from application.permissions import AppResolver, app_resolver
+
+
+class AppResolverMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = app_resolver.set(AppResolver())
+        try:
+            return self.get_response(request)
+        finally:
+            app_resolver.reset(token)
@@ -2,6 +2,7 @@ from django.conf import settings
 from django.db import models
 
 from util.choice import ChoiceField, CustomChoicesMeta
+from util.json_template import compile_template, render_template
 from util.role import Role
 from util.url import get_file_extension
 from util.visibility import VisibilityType
@@ -32,6 +33,13 @@ def universal_app_directory_path(instance, filename):
         )
 
 
+def compile_webhook_template(template):
+    body = template.get("body", None) if isinstance(template, dict) else None
+    if body is None:
+        return None
+    return compile_template(body)
+
+
 class Application(models.Model):
     class OperatingSystem(models.IntegerChoices, metaclass=CustomChoicesMeta):
         Android = 1
@@ -119,45 +127,25 @@ class UniversalApp(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "path"], name="universal_app_owner_path_idx"),
+            models.Index(fields=["org", "path"], name="universal_app_org_path_idx"),
+        ]
+
     def enable_os_enum_list(self):
-        ret = []
+        # Only the ids are needed, loading the applications would cost a query
+        # each.
         choices = ChoiceField(choices=Application.OperatingSystem.choices)
-        obj = self
-        try:
-            if obj.iOS:
-                ret.append(choices.to_representation(Application.OperatingSystem.iOS))
-        except:  # noqa: E722
-            pass
-        try:
-            if obj.android:
-                ret.append(
-                    choices.to_representation(Application.OperatingSystem.Android)
-                )
-        except:  # noqa: E722
-            pass
-        try:
-            if obj.macOS:
-                ret.append(choices.to_representation(Application.OperatingSystem.macOS))
-        except:  # noqa: E722
-            pass
-        try:
-            if obj.windows:
-                ret.append(
-                    choices.to_representation(Application.OperatingSystem.Windows)
-                )
-        except:  # noqa: E722
-            pass
-        try:
-            if obj.linux:
-                ret.append(choices.to_representation(Application.OperatingSystem.Linux))
-        except:  # noqa: E722
-            pass
-        try:
-            if obj.tvOS:
-                ret.append(choices.to_representation(Application.OperatingSystem.tvOS))
-        except:  # noqa: E722
-            pass
-        return ret
+        enabled = [
+            (self.iOS_id, Application.OperatingSystem.iOS),
+            (self.android_id, Application.OperatingSystem.Android),
+            (self.macOS_id, Application.OperatingSystem.macOS),
+            (self.windows_id, Application.OperatingSystem.Windows),
+            (self.linux_id, Application.OperatingSystem.Linux),
+            (self.tvOS_id, Application.OperatingSystem.tvOS),
+        ]
+        return [choices.to_representation(os) for id, os in enabled if id]
 
 
 class UniversalAppUser(models.Model):
@@ -168,6 +156,35 @@ class UniversalAppUser(models.Model):
     update_time = models.DateTimeField(auto_now=True)
 
 
+class EffectiveAppRole(models.Model):
+    """
+    The role a user has on an app, either as an app member or through the
+    app's organization. Maintained by application.roles from
+    UniversalAppUser and OrganizationUser, so a permission check is a
+    single lookup.
+    """
+
+    class Kind(models.IntegerChoices):
+        Application = 1
+        Organization = 2
+
+    app = models.ForeignKey(
+        UniversalApp, on_delete=models.CASCADE, related_name="effective_roles"
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    role = models.IntegerField(choices=Role.choices)
+    kind = models.IntegerField(choices=Kind.choices)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                "user",
+                "app",
+                name="effective_app_role_unique",
+            ),
+        ]
+
+
 class AppAPIToken(models.Model):
     app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE)
     name = models.CharField(max_length=64)
@@ -186,9 +203,47 @@ class Webhook(models.Model):
     url = models.URLField()
     auth_data = models.JSONField(default=dict)
     template = models.JSONField(default=dict)
+    compiled_template = models.JSONField(blank=True, null=True, editable=False)
     when_new_package = models.BooleanField(default=True)
     when_new_release = models.BooleanField(default=False)
     when_new_upgrade = models.BooleanField(default=False)
     when_store_state_change = models.BooleanField(default=False)
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        self.compiled_template = compile_webhook_template(self.template)
+        update_fields = kwargs.get("update_fields", None)
+        if update_fields is not None and "template" in update_fields:
+            kwargs["update_fields"] = list(update_fields) + ["compiled_template"]
+        super().save(*args, **kwargs)
+
+    def render(self, context):
+        parts = self.compiled_template
+        if parts is None:
+            # Saved before templates were compiled.
+            parts = compile_webhook_template(self.template)
+        if parts is None:
+            raise ValueError("The webhook has no template body.")
+        return render_template(parts, context)
+
+
+class WebhookDelivery(models.Model):
+    webhook = models.ForeignKey(
+        Webhook, on_delete=models.CASCADE, related_name="deliveries"
+    )
+    event = models.CharField(max_length=32)
+    success = models.BooleanField(default=False)
+    status_code = models.IntegerField(blank=True, null=True)
+    error = models.CharField(max_length=1024, blank=True, default="")
+    attempts = models.IntegerField(default=0)
+    latency = models.IntegerField(default=0, help_text="Milliseconds spent sending.")
+    create_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["webhook", "-create_time", "-id"],
+                name="webhook_delivery_create_idx",
+            ),
+        ]
@@ -1,11 +1,12 @@
+from contextvars import ContextVar
 from enum import Enum
 
 from django.core.exceptions import PermissionDenied
+from django.db.models import F, FilteredRelation, Q
 from django.http import Http404
 from rest_framework.permissions import BasePermission
 
-from application.models import AppAPIToken, UniversalApp, UniversalAppUser
-from organization.models import OrganizationUser
+from application.models import AppAPIToken, EffectiveAppRole, UniversalApp
 from util.choice import ChoiceField
 from util.role import Role
 from util.visibility import VisibilityType
@@ -84,60 +85,80 @@ class UserRoleKind:
         }
 
 
-def check_user_app_view_permission(user, path, ownername):
-    if user.is_authenticated:
-        try:
-            user_app = UniversalAppUser.objects.get(
-                user=user, app__path=path, app__owner__username=ownername
-            )
-            return user_app.app, UserRoleKind.application(user_app.role)
-        except UniversalAppUser.DoesNotExist:
-            pass
+class AppResolver:
+    """
+    Apps looked up during one request, so the permission helpers and views
+    share a single query per app.
+    """
+
+    def __init__(self):
+        self._apps = {}
+
+    def resolve(self, user, **filters):
+        user_id = user.pk if user is not None and user.is_authenticated else None
+        key = (user_id, tuple(sorted(filters.items())))
+        if key not in self._apps:
+            self._apps[key] = fetch_app_with_role(user, **filters)
+        return self._apps[key]
+
+
+app_resolver = ContextVar("app_resolver", default=None)
+
+
+def fetch_app_with_role(user, **filters):
+    query = UniversalApp.objects.filter(**filters).select_related("owner", "org")
+    if user is not None and user.is_authenticated:
+        query = query.annotate(
+            user_role=FilteredRelation(
+                "effective_roles", condition=Q(effective_roles__user=user)
+            ),
+            effective_role=F("user_role__role"),
+            effective_role_kind=F("user_role__kind"),
+        )
+    try:
+        app = query.get()
+    except UniversalApp.DoesNotExist:
+        raise Http404
+    role = getattr(app, "effective_role", None)
+    if role is None:
+        return app, None
+    if app.effective_role_kind == EffectiveAppRole.Kind.Application:
+        return app, UserRoleKind.application(role)
+    return app, UserRoleKind.organization(role)
+
+
+def get_app_with_role(user, **filters):
+    """
+    Fetch an app together with the user's effective role on it in one query,
+    reusing the result within the current request.
+    """
+    resolver = app_resolver.get()
+    if resolver is None:
+        return fetch_app_with_role(user, **filters)
+    return resolver.resolve(user, **filters)
+
+
+def check_visible_app(user, app, role):
+    if role is not None:
+        return
     if user.is_authenticated:
         allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
     else:
         allow_visibility = [VisibilityType.Public]
-    try:
-        app = UniversalApp.objects.get(
-            path=path, owner__username=ownername, visibility__in=allow_visibility
-        )
-        return app, None
-    except UniversalApp.DoesNotExist:
+    if app.visibility not in allow_visibility:
         raise Http404
 
 
-def check_org_app_view_permission(user, path, org_path):
-    if user.is_authenticated:
-        try:
-            user_app = UniversalAppUser.objects.get(
-                app__org__path=org_path, app__path=path, user=user
-            )
-            return user_app.app, UserRoleKind.application(user_app.role)
-        except UniversalAppUser.DoesNotExist:
-            pass
-        user_role_kind = None
-        try:
-            user_org = OrganizationUser.objects.get(org__path=org_path, user=user)
-            user_role_kind = UserRoleKind.organization(user_org.role)
-            try:
-                app = UniversalApp.objects.get(org__path=org_path, path=path)
-                return app, user_role_kind
-            except UniversalApp.DoesNotExist:
-                raise Http404
-        except OrganizationUser.DoesNotExist:
-            pass
+def check_user_app_view_permission(user, path, ownername):
+    app, role = get_app_with_role(user, path=path, owner__username=ownername)
+    check_visible_app(user, app, role)
+    return app, role
 
-    try:
-        if user.is_authenticated:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-        else:
-            allow_visibility = [VisibilityType.Public]
-        app = UniversalApp.objects.get(
-            org__path=org_path, path=path, visibility__in=allow_visibility
-        )
-        return app, None
-    except UniversalApp.DoesNotExist:
-        raise Http404
+
+def check_org_app_view_permission(user, path, org_path):
+    app, role = get_app_with_role(user, path=path, org__path=org_path)
+    check_visible_app(user, app, role)
+    return app, role
 
 
 def check_app_view_permission(user, path, namespace):
@@ -148,26 +169,17 @@ def check_app_view_permission(user, path, namespace):
 
 
 def check_app_download_permission(user, slug):
-    app = UniversalApp.objects.get(install_slug=slug)
-    if app.owner:
-        check_app_view_permission(user, app.path, Namespace.user(app.owner.username))
-    elif app.org:
-        check_app_view_permission(user, app.path, Namespace.organization(app.org.path))
+    app, role = get_app_with_role(user, install_slug=slug)
+    check_visible_app(user, app, role)
     return app
 
 
 def get_user_app(path, ownername):
-    try:
-        return UniversalApp.objects.get(path=path, owner__username=ownername)
-    except UniversalApp.DoesNotExist:
-        raise Http404
+    return get_app_with_role(None, path=path, owner__username=ownername)[0]
 
 
 def get_org_app(path, org_path):
-    try:
-        return UniversalApp.objects.get(path=path, org__path=org_path)
-    except UniversalApp.DoesNotExist:
-        raise Http404
+    return get_app_with_role(None, path=path, org__path=org_path)[0]
 
 
 def get_app(path, namespace):
@@ -178,29 +190,18 @@ def get_app(path, namespace):
 
 
 def get_slug_app(slug):
-    try:
-        return UniversalApp.objects.get(install_slug=slug)
-    except UniversalApp.DoesNotExist:
-        raise Http404
+    return get_app_with_role(None, install_slug=slug)[0]
 
 
 def check_user_app_manager_permission(user, path, ownername):
-    try:
-        user_app = UniversalAppUser.objects.get(
-            app__path=path, app__owner__username=ownername, user=user
-        )
-        if user_app.role != Role.Owner and user_app.role != Role.Manager:
-            raise PermissionDenied
-        return user_app.app, UserRoleKind.application(user_app.role)
-    except UniversalAppUser.DoesNotExist:
-        try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            UniversalApp.objects.get(
-                path=path, owner__username=ownername, visibility__in=allow_visibility
-            )
+    app, role = get_app_with_role(user, path=path, owner__username=ownername)
+    if role is None:
+        if app.visibility in [VisibilityType.Public, VisibilityType.Internal]:
             raise PermissionDenied
-        except UniversalApp.DoesNotExist:
-            raise Http404
+        raise Http404
+    if role.role != Role.Owner and role.role != Role.Manager:
+        raise PermissionDenied
+    return app, role
 
 
 def check_org_app_manager_permission(user, path, org_path):
@@ -220,26 +221,18 @@ def check_app_manager_permission(user, path, namespace):
 
 
 def check_user_app_upload_permission(user, path, ownername):
-    try:
-        user_app = UniversalAppUser.objects.get(
-            app__path=path, app__owner__username=ownername, user=user
-        )
-        if (
-            user_app.role != Role.Owner
-            and user_app.role != Role.Manager
-            and user_app.role != Role.Developer
-        ):
-            raise PermissionDenied
-        return user_app.app, UserRoleKind.application(user_app.role)
-    except UniversalAppUser.DoesNotExist:
-        try:
-            allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            UniversalApp.objects.get(
-                path=path, owner__username=ownername, visibility__in=allow_visibility
-            )
+    app, role = get_app_with_role(user, path=path, owner__username=ownername)
+    if role is None:
+        if app.visibility in [VisibilityType.Public, VisibilityType.Internal]:
             raise PermissionDenied
-        except UniversalApp.DoesNotExist:
-            raise Http404
+        raise Http404
+    if (
+        role.role != Role.Owner
+        and role.role != Role.Manager
+        and role.role != Role.Developer
+    ):
+        raise PermissionDenied
+    return app, role
 
 
 def check_org_app_upload_permission(user, path, org_path):
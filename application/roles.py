@@ -0,0 +1,115 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from application.models import EffectiveAppRole, UniversalApp, UniversalAppUser
+from organization.models import OrganizationUser
+
+
+def refresh_effective_role(user_id, app_id):
+    """
+    Recompute the row for one user and app. An app membership wins over
+    the organization one.
+    """
+    kind = EffectiveAppRole.Kind.Application
+    role = (
+        UniversalAppUser.objects.filter(user_id=user_id, app_id=app_id)
+        .values_list("role", flat=True)
+        .first()
+    )
+    if role is None:
+        kind = EffectiveAppRole.Kind.Organization
+        role = (
+            OrganizationUser.objects.filter(
+                user_id=user_id, org__universalapp__id=app_id
+            )
+            .values_list("role", flat=True)
+            .first()
+        )
+    if role is None:
+        EffectiveAppRole.objects.filter(user_id=user_id, app_id=app_id).delete()
+        return
+    EffectiveAppRole.objects.update_or_create(
+        user_id=user_id, app_id=app_id, defaults={"role": role, "kind": kind}
+    )
+
+
+def rebuild_effective_roles(using=DEFAULT_DB_ALIAS):
+    rows = {}
+    org_roles = OrganizationUser.objects.using(using).filter(
+        org__universalapp__isnull=False
+    ).values_list("user_id", "org__universalapp", "role")
+    for user_id, app_id, role in org_roles:
+        rows[(user_id, app_id)] = EffectiveAppRole(
+            user_id=user_id,
+            app_id=app_id,
+            role=role,
+            kind=EffectiveAppRole.Kind.Organization,
+        )
+    app_roles = UniversalAppUser.objects.using(using).values_list(
+        "user_id", "app_id", "role"
+    )
+    for user_id, app_id, role in app_roles:
+        rows[(user_id, app_id)] = EffectiveAppRole(
+            user_id=user_id,
+            app_id=app_id,
+            role=role,
+            kind=EffectiveAppRole.Kind.Application,
+        )
+    with transaction.atomic(using=using):
+        EffectiveAppRole.objects.using(using).all().delete()
+        EffectiveAppRole.objects.using(using).bulk_create(
+            rows.values(), batch_size=1000
+        )
+    return len(rows)
+
+
+def fill_effective_roles(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate receiver: a deployment upgraded from before the table
+    existed has members but no rows, build them once.
+    """
+    if EffectiveAppRole.objects.using(using).exists():
+        return
+    if (
+        not UniversalAppUser.objects.using(using).exists()
+        and not OrganizationUser.objects.using(using).exists()
+    ):
+        return
+    rebuild_effective_roles(using)
+
+
+def _deleted_directly(sender, origin):
+    # Rows removed because their user, app or organization is being deleted
+    # go away with it, there is nothing left to recompute.
+    if isinstance(origin, QuerySet):
+        return origin.model is sender
+    return isinstance(origin, sender)
+
+
+@receiver(post_save, sender=UniversalAppUser)
+@receiver(post_delete, sender=UniversalAppUser)
+def handle_app_user_change(sender, instance, origin=None, **kwargs):
+    if origin is not None and not _deleted_directly(sender, origin):
+        return
+    refresh_effective_role(instance.user_id, instance.app_id)
+
+
+@receiver(post_save, sender=OrganizationUser)
+@receiver(post_delete, sender=OrganizationUser)
+def handle_org_user_change(sender, instance, origin=None, **kwargs):
+    if origin is not None and not _deleted_directly(sender, origin):
+        return
+    apps = UniversalApp.objects.filter(org_id=instance.org_id)
+    for app_id in apps.values_list("id", flat=True):
+        refresh_effective_role(instance.user_id, app_id)
+
+
+@receiver(post_save, sender=UniversalApp)
+def handle_app_created(sender, instance, created, **kwargs):
+    if not created or instance.org_id is None:
+        return
+    org_users = OrganizationUser.objects.filter(org_id=instance.org_id)
+    for user_id in org_users.values_list("user_id", flat=True):
+        refresh_effective_role(user_id, instance.id)
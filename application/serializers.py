@@ -5,9 +5,11 @@ from django.core.files import File
 from rest_framework import serializers
 
 from application.models import (AppAPIToken, Application, UniversalApp,
-                                UniversalAppUser, Webhook)
+                                UniversalAppUser, Webhook, WebhookDelivery,
+                                compile_webhook_template)
 from util.choice import ChoiceField
 from util.image import generate_icon_image
+from util.json_template import TemplateContext, render_template
 from util.role import Role
 from util.visibility import VisibilityType
 
@@ -184,59 +186,6 @@ class UniversalAppIconSerializer(serializers.ModelSerializer):
         fields = ["icon_file"]
 
 
-class UserUniversalAppSerializer(serializers.ModelSerializer):
-    path = serializers.StringRelatedField(source="app.path")
-    name = serializers.StringRelatedField(source="app.name")
-    install_slug = serializers.StringRelatedField(source="app.install_slug")
-    description = serializers.StringRelatedField(source="app.description")
-    visibility = ChoiceField(VisibilityType.choices, source="app.visibility")
-    update_time = serializers.ReadOnlyField(source="app.update_time")
-    create_time = serializers.ReadOnlyField(source="app.create_time")
-    enable_os = serializers.SerializerMethodField()
-    namespace = serializers.SerializerMethodField()
-    icon_file = serializers.SerializerMethodField()
-    install_url = serializers.SerializerMethodField()
-
-    def get_icon_file(self, obj):
-        return obj.app.icon_file.url
-
-    def get_enable_os(self, obj):
-        return obj.app.enable_os_enum_list()
-
-    def get_namespace(self, obj):
-        if obj.app.owner:
-            return {
-                "path": obj.app.owner.username,
-                "name": obj.app.owner.get_full_name(),
-                "kind": "User",
-            }
-        if obj.app.org:
-            return {
-                "path": obj.app.org.path,
-                "name": obj.app.name,
-                "kind": "Organization",
-            }
-
-    def get_install_url(self, obj):
-        return os.path.join(settings.EXTERNAL_WEB_URL, 'd/' + obj.app.install_slug)
-
-    class Meta:
-        model = UniversalAppUser
-        fields = [
-            "namespace",
-            "path",
-            "install_slug",
-            "install_url",
-            "name",
-            "icon_file",
-            "description",
-            "visibility",
-            "enable_os",
-            "update_time",
-            "create_time",
-        ]
-
-
 class UniversalAppUserSerializer(serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source="user.username")
     role = ChoiceField(choices=Role.choices)
@@ -289,3 +238,33 @@ class WebhookSerializer(serializers.ModelSerializer):
             "create_time",
         ]
         read_only_fields = ["id", "update_time", "create_time"]
+
+    def validate_template(self, value):
+        parts = compile_webhook_template(value)
+        if parts is not None:
+            # Any value of the event has to give valid JSON.
+            context = TemplateContext(
+                {name: "" for text, name, quoted in parts if name is not None}
+            )
+            try:
+                render_template(parts, context)
+            except ValueError as e:
+                raise serializers.ValidationError(
+                    "The template body is not valid JSON: {}".format(e)
+                )
+        return value
+
+
+class WebhookDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDelivery
+        fields = [
+            "id",
+            "event",
+            "success",
+            "status_code",
+            "error",
+            "attempts",
+            "latency",
+            "create_time",
+        ]
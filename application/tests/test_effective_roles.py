@@ -0,0 +1,111 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+
+from application.models import EffectiveAppRole, UniversalApp
+from application.permissions import Namespace, check_app_view_permission
+from client.api import Api
+from client.unit_test_client import UnitTestClient
+from util.role import Role
+from util.tests import BaseTestCase
+
+
+class EffectiveAppRoleTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.larry = Api(UnitTestClient(), "LarryPage", True)
+        self.bill = Api(UnitTestClient(), "BillGates", True)
+        self.org_api = self.larry.get_org_api(self.google_org()["path"])
+        r = self.larry.get_user_api().create_org(self.google_org())
+        self.assert_status_201(r)
+        app = self.chrome_app(visibility="Private")
+        r = self.org_api.create_app(app)
+        self.assert_status_201(r)
+        self.app_api = self.org_api.get_app_api(app["path"])
+        self.app = UniversalApp.objects.get(path=app["path"])
+
+    def roles(self):
+        return set(
+            EffectiveAppRole.objects.values_list(
+                "user__username", "app__path", "role", "kind"
+            )
+        )
+
+    def bill_role(self):
+        return EffectiveAppRole.objects.filter(
+            user__username="BillGates", app=self.app
+        ).first()
+
+    def test_org_member(self):
+        self.assertIsNone(self.bill_role())
+        r = self.org_api.add_member("BillGates", "Tester")
+        self.assert_status_201(r)
+        role = self.bill_role()
+        self.assertEqual(role.role, Role.Tester)
+        self.assertEqual(role.kind, EffectiveAppRole.Kind.Organization)
+
+        r = self.org_api.change_member_role("BillGates", "Developer")
+        self.assert_status_200(r)
+        self.assertEqual(self.bill_role().role, Role.Developer)
+
+        r = self.org_api.remove_member("BillGates")
+        self.assert_status_204(r)
+        self.assertIsNone(self.bill_role())
+
+    def test_app_member_wins(self):
+        self.org_api.add_member("BillGates", "Tester")
+        r = self.app_api.add_member("BillGates", "Manager")
+        self.assert_status_201(r)
+        role = self.bill_role()
+        self.assertEqual(role.role, Role.Manager)
+        self.assertEqual(role.kind, EffectiveAppRole.Kind.Application)
+
+        # Back to the organization role once the app membership is gone.
+        r = self.app_api.remove_member("BillGates")
+        self.assert_status_204(r)
+        role = self.bill_role()
+        self.assertEqual(role.role, Role.Tester)
+        self.assertEqual(role.kind, EffectiveAppRole.Kind.Organization)
+
+    def test_new_org_app(self):
+        self.org_api.add_member("BillGates", "Tester")
+        app = self.todo_app()
+        r = self.org_api.create_app(app)
+        self.assert_status_201(r)
+        self.assertIn(
+            ("BillGates", app["path"], Role.Tester, EffectiveAppRole.Kind.Organization),
+            self.roles(),
+        )
+
+    def test_remove_app(self):
+        self.org_api.add_member("BillGates", "Tester")
+        r = self.app_api.remove_app()
+        self.assert_status_204(r)
+        self.assertEqual(self.roles(), set())
+
+    def test_rebuild(self):
+        self.org_api.add_member("BillGates", "Tester")
+        self.larry.get_user_api().create_app(self.todo_app())
+        roles = self.roles()
+        EffectiveAppRole.objects.all().delete()
+        call_command("rebuild_app_roles", stdout=StringIO())
+        self.assertEqual(self.roles(), roles)
+
+    def test_filled_after_migrate(self):
+        self.org_api.add_member("BillGates", "Tester")
+        roles = self.roles()
+        EffectiveAppRole.objects.all().delete()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db="default")
+        self.assertEqual(self.roles(), roles)
+
+    def test_permission_check_is_one_query(self):
+        self.org_api.add_member("BillGates", "Tester")
+        user = get_user_model().objects.get(username="BillGates")
+        namespace = Namespace.organization(self.google_org()["path"])
+        with self.assertNumQueries(1):
+            app, role = check_app_view_permission(user, self.app.path, namespace)
+        self.assertEqual(app, self.app)
+        self.assertTrue(role.is_organization())
+        self.assertEqual(role.role, Role.Tester)
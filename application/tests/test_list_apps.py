@@ -1,3 +1,6 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from client.api import Api
 from client.unit_test_client import UnitTestClient
 from util.tests import BaseTestCase
@@ -136,6 +139,23 @@ class OrganizationUniversalAppListTest(UserUniversalAppListTest):
     def get_namespace(self, api, namespace):
         return api.get_org_api(namespace)
 
+    def test_cursor(self):
+        larry = self.create_and_get_user()
+        namespace = self.create_and_get_namespace(larry, larry.client.username)
+        number = 7
+        for i in range(number):
+            r = namespace.create_app(self.generate_app(i))
+            self.assert_status_201(r)
+
+        names = []
+        cursor = ""
+        while cursor is not None:
+            r = namespace.get_app_list(per_page=3, cursor=cursor)
+            self.assert_status_200(r)
+            names.extend(app["name"] for app in r.json())
+            cursor = self.get_next_cursor(r)
+        self.assertEqual(names, [self.generate_app(i)["name"] for i in range(number)])
+
 
 class UserVisibleAppListTest(BaseTestCase):
     def create_and_get_user(self, username="LarryPage", auto_login=True):
@@ -272,3 +292,44 @@ class UserVisibleAppListTest(BaseTestCase):
         bill.get_user_api().get_visible_app_list()
         mark.get_user_api().get_visible_app_list()
         anonymous.get_user_api().get_visible_app_list()
+
+    def test_visible_app_list_content(self):
+        larry = self.create_and_get_user()
+        bill = self.create_and_get_user("BillGates")
+        namespace = self.create_and_get_namespace(larry, larry.client.username)
+        for i, visibility in enumerate(["Public", "Internal", "Private"]):
+            namespace.create_app(self.generate_app(i, visibility=visibility))
+        org = self.create_and_get_org_namespace(larry, "larry_org1", "Private")
+        org.create_app(self.generate_app(3, visibility="Private"))
+        bill.get_user_api().create_org(self.generate_org(2))
+        bill_org = bill.get_org_api(self.generate_org(2)["path"])
+        bill_org.create_app(self.generate_app(4, visibility="Private"))
+        bill_org.create_app(self.generate_app(5, visibility="Private"))
+        bill_org.get_app_api(self.generate_app(4)["path"]).add_member(
+            larry.client.username, "Tester"
+        )
+
+        def names(api, **kwargs):
+            r = api.get_user_api().get_visible_app_list(**kwargs)
+            self.assert_status_200(r)
+            return r.headers["X-Total-Count"], [app["name"] for app in r.json()]
+
+        expected = [self.generate_app(i)["name"] for i in [0, 1, 2, 3, 4]]
+        self.assertEqual(names(larry), ("5", expected))
+        self.assertEqual(names(larry, page=2, per_page=2), ("5", expected[2:4]))
+        self.assertEqual(
+            names(bill),
+            ("4", [self.generate_app(i)["name"] for i in [0, 1, 4, 5]]),
+        )
+        self.assertEqual(
+            names(Api(UnitTestClient())), ("1", [self.generate_app(0)["name"]])
+        )
+
+        # Filtering, counting and paging happen in the database.
+        with CaptureQueriesContext(connection) as context:
+            larry.get_user_api().get_visible_app_list(per_page=2)
+        baseline = len(context)
+        bill_org.create_app(self.generate_app(6, visibility="Public"))
+        bill_org.create_app(self.generate_app(7, visibility="Internal"))
+        with self.assertNumQueries(baseline):
+            larry.get_user_api().get_visible_app_list(per_page=2)
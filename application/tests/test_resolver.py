@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from application.models import UniversalApp
+from application.permissions import (AppResolver, Namespace, app_resolver,
+                                     check_app_manager_permission,
+                                     check_app_view_permission)
+from client.api import Api
+from client.unit_test_client import UnitTestClient
+from util.tests import BaseTestCase
+
+
+class AppResolverTest(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.larry = Api(UnitTestClient(), "LarryPage", True)
+        self.larry.get_user_api().create_org(self.google_org())
+        self.org_api = self.larry.get_org_api(self.google_org()["path"])
+        app = self.chrome_app(visibility="Private")
+        r = self.org_api.create_app(app)
+        self.assert_status_201(r)
+        self.slug = r.json()["install_slug"]
+        self.path = app["path"]
+
+    def app_queries(self, context):
+        table = UniversalApp._meta.db_table
+        return [q for q in context.captured_queries if table in q["sql"]]
+
+    def test_download_page(self):
+        for path in ["", "/packages", "/packages/latest"]:
+            with CaptureQueriesContext(connection) as context:
+                r = self.larry.client.get("/download/" + self.slug + path)
+            self.assert_status_200(r)
+            self.assertEqual(len(self.app_queries(context)), 1)
+
+    def test_memoized_in_request(self):
+        user = get_user_model().objects.get(username="LarryPage")
+        namespace = Namespace.organization(self.google_org()["path"])
+        token = app_resolver.set(AppResolver())
+        self.addCleanup(app_resolver.reset, token)
+        with self.assertNumQueries(1):
+            app, role = check_app_view_permission(user, self.path, namespace)
+            check_app_manager_permission(user, self.path, namespace)
+            app.org.path
+
+    def test_not_memoized_outside_request(self):
+        user = get_user_model().objects.get(username="LarryPage")
+        namespace = Namespace.organization(self.google_org()["path"])
+        with self.assertNumQueries(2):
+            check_app_view_permission(user, self.path, namespace)
+            check_app_view_permission(user, self.path, namespace)
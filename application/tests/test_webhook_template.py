@@ -0,0 +1,94 @@
+from django.test import SimpleTestCase
+
+from application.models import Webhook
+from distribute.tests.base import PackageTestCase
+from util.json_template import (TemplateContext, compile_template,
+                                render_template)
+
+
+class JsonTemplateTest(SimpleTestCase):
+    def render(self, body, **values):
+        return render_template(compile_template(body), TemplateContext(values))
+
+    def test_quotes(self):
+        body = '{"text": "${name} said ${description}"}'
+        payload = self.render(body, name="Chrome", description='"hi"\n\\o/')
+        self.assertEqual(payload, {"text": 'Chrome said "hi"\n\\o/'})
+
+    def test_bare_values(self):
+        body = '{"size": ${size}, "commit": ${commit}, "name": ${name}}'
+        payload = self.render(body, size=42, commit=None, name='a "b"')
+        self.assertEqual(payload, {"size": 42, "commit": None, "name": 'a "b"'})
+
+    def test_strings_in_strings(self):
+        body = '{"a": "${x}", "b": "\\"${x}\\"", "${x}": [${y}]}'
+        payload = self.render(body, x="v", y=None)
+        self.assertEqual(payload, {"a": "v", "b": '"v"', "v": [None]})
+
+    def test_unknown(self):
+        body = '{"a": "${missing}", "b": "\\\\${x}", "c": ${x}}'
+        self.assertEqual(
+            self.render(body, x=1), {"a": "${missing}", "b": "\\1", "c": 1}
+        )
+
+    def test_object_body(self):
+        self.assertEqual(self.render({"text": "${x}"}, x="y"), {"text": "y"})
+
+    def test_encoded_once(self):
+        context = TemplateContext({"x": "value"})
+        parts = compile_template('["${x}", "${x}"]')
+        render_template(parts, context)
+        context.values["x"] = "changed"
+        self.assertEqual(render_template(parts, context), ["value", "value"])
+
+
+class WebhookTemplateTest(PackageTestCase):
+    def test_compiled_on_save(self):
+        r = self.app_api.create_webhook(
+            {
+                "name": "chat",
+                "url": "https://apphub.example.com/webhook/test",
+                "template": {"body": '{"text": "${short_version}"}'},
+            }
+        )
+        self.assert_status_201(r)
+        webhook = Webhook.objects.get(id=r.json()["id"])
+        self.assertEqual(
+            webhook.compiled_template,
+            [['{"text": "', "short_version", True], ['"}', None, False]],
+        )
+        self.assertNotIn("compiled_template", r.json())
+
+        r = self.app_api.update_webhook(
+            webhook.id, {"template": {"body": '{"v": ${version}}'}}
+        )
+        self.assert_status_200(r)
+        webhook.refresh_from_db()
+        self.assertEqual(
+            webhook.render(TemplateContext({"version": "12"})), {"v": "12"}
+        )
+
+    def test_invalid_template(self):
+        r = self.app_api.create_webhook(
+            {
+                "name": "chat",
+                "url": "https://apphub.example.com/webhook/test",
+                "template": {"body": '{"text": "${short_version}"'},
+            }
+        )
+        self.assert_status_400(r)
+
+    def test_not_compiled(self):
+        webhook = Webhook.objects.create(
+            app=self.app, url="https://apphub.example.com/webhook/test"
+        )
+        Webhook.objects.filter(id=webhook.id).update(
+            template={"body": '{"text": "${x}"}'}
+        )
+        webhook.refresh_from_db()
+        self.assertIsNone(webhook.compiled_template)
+        self.assertEqual(webhook.render(TemplateContext({"x": 1})), {"text": "1"})
+
+        webhook.template = {}
+        with self.assertRaises(ValueError):
+            webhook.render(TemplateContext({}))
@@ -3,14 +3,15 @@ import secrets
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
 from django.http import Http404
 from django.urls import reverse
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from application.models import (AppAPIToken, UniversalApp, UniversalAppUser,
-                                Webhook)
+from application.models import (AppAPIToken, EffectiveAppRole, UniversalApp,
+                                UniversalAppUser, Webhook)
 from application.permissions import (Namespace, UserRoleKind,
                                      check_app_download_permission,
                                      check_app_manager_permission,
@@ -21,11 +22,12 @@ from application.serializers import (UniversalAppCreateSerializer,
                                      UniversalAppTokenSerializer,
                                      UniversalAppUserAddSerializer,
                                      UniversalAppUserSerializer,
-                                     UserUniversalAppSerializer,
+                                     WebhookDeliverySerializer,
                                      WebhookSerializer)
 from organization.models import Organization, OrganizationUser
 from organization.views import check_org_manager_permission
-from util.pagination import get_pagination_params
+from util.cache import get_or_compute_for_app
+from util.pagination import paginate
 from util.reserved import reserved_names
 from util.role import Role
 from util.url import build_absolute_uri
@@ -34,51 +36,35 @@ from util.visibility import VisibilityType
 UserModel = get_user_model()
 
 
+def get_app_data(app):
+    return get_or_compute_for_app(
+        app.id, "app", lambda: UniversalAppSerializer(app).data
+    )
+
+
 class VisibleUniversalAppList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request):
         # todo: order, filter
-        page, per_page = get_pagination_params(request)
         if request.user.is_authenticated:
             # todo
             allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            apps = UniversalApp.objects.filter(visibility__in=allow_visibility)
-
-            user_apps = UniversalAppUser.objects.filter(
-                user=request.user
-            ).prefetch_related("app")
-
-            def not_in_user_apps(app):
-                return len(list(filter(lambda x: x.app.id == app.id, user_apps))) == 0
-
-            apps = filter(not_in_user_apps, apps)
-
-            orgs = OrganizationUser.objects.filter(user=request.user).values("org")
-            org_apps = UniversalApp.objects.filter(
-                org__in=orgs, visibility=VisibilityType.Private
-            )
-            org_apps = filter(not_in_user_apps, org_apps)
-
-            app_data = UniversalAppSerializer(apps, many=True).data
-            org_app_data = UniversalAppSerializer(org_apps, many=True).data
-            user_apps_data = UserUniversalAppSerializer(user_apps, many=True).data
-            app_data.extend(org_app_data)
-            app_data.extend(user_apps_data)
-            # app_data.sort(key=lambda x: x['create_time'])
-            headers = {"X-Total-Count": len(app_data)}
-            return Response(
-                app_data[(page - 1) * per_page : page * per_page], headers=headers
+            query = UniversalApp.objects.filter(
+                Q(visibility__in=allow_visibility)
+                | Exists(
+                    EffectiveAppRole.objects.filter(
+                        app=OuterRef("pk"), user=request.user
+                    )
+                )
             )
         else:
             query = UniversalApp.objects.filter(visibility=VisibilityType.Public)
-            count = query.count()
-            apps = query.order_by("create_time")[
-                (page - 1) * per_page : page * per_page
-            ]
-            serializer = UniversalAppSerializer(apps, many=True)
-            headers = {"X-Total-Count": count}
-            return Response(serializer.data, headers=headers)
+        apps, headers = paginate(
+            request, query.select_related("owner", "org"), descending=False
+        )
+        serializer = UniversalAppSerializer(apps, many=True)
+        return Response(serializer.data, headers=headers)
 
 
 class UserUniversalAppList(APIView):
@@ -86,43 +72,27 @@ class UserUniversalAppList(APIView):
 
     def get(self, request, username):
         # todo: order, filter
-        page, per_page = get_pagination_params(request)
-
         if request.user.is_authenticated:
             # todo
             allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            apps = UniversalApp.objects.filter(
-                visibility__in=allow_visibility, owner__username=username
-            )
-            user_apps = UniversalAppUser.objects.filter(
-                user=request.user, app__owner__username=username
-            ).prefetch_related("app")
-
-            def not_in_user_apps(app):
-                return (
-                    len(list(filter(lambda x: x.app.path == app.path, user_apps))) == 0
-                )
-
-            apps = filter(not_in_user_apps, apps)
-            data = UniversalAppSerializer(apps, many=True).data
-            user_apps_data = UserUniversalAppSerializer(user_apps, many=True).data
-            data.extend(user_apps_data)
-            data.sort(key=lambda x: x["create_time"])
-            headers = {"X-Total-Count": len(data)}
-            return Response(
-                data[(page - 1) * per_page : page * per_page], headers=headers
+            query = UniversalApp.objects.filter(
+                Q(visibility__in=allow_visibility)
+                | Exists(
+                    EffectiveAppRole.objects.filter(
+                        app=OuterRef("pk"), user=request.user
+                    )
+                ),
+                owner__username=username,
             )
         else:
             query = UniversalApp.objects.filter(
                 visibility=VisibilityType.Public, owner__username=username
             )
-            count = query.count()
-            apps = query.order_by("create_time")[
-                (page - 1) * per_page : page * per_page
-            ]
-            serializer = UniversalAppSerializer(apps, many=True)
-            headers = {"X-Total-Count": count}
-            return Response(serializer.data, headers=headers)
+        apps, headers = paginate(
+            request, query.select_related("owner", "org"), descending=False
+        )
+        serializer = UniversalAppSerializer(apps, many=True)
+        return Response(serializer.data, headers=headers)
 
 
 class AuthenticatedUserApplicationList(APIView):
@@ -172,7 +142,7 @@ class UserUniversalAppDetail(APIView):
         app, role = check_app_view_permission(
             request.user, path, self.get_namespace(namespace)
         )
-        data = UniversalAppSerializer(app).data
+        data = dict(get_app_data(app))
         if role:
             data["role"] = role.response()
         return Response(data)
@@ -525,29 +495,50 @@ class OrganizationUniversalAppWebhookDetail(UserUniversalAppWebhookDetail):
         return Namespace.organization(path)
 
 
+class UserUniversalAppWebhookDeliveryList(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_namespace(self, path):
+        return Namespace.user(path)
+
+    def get(self, request, namespace, path, webhook_id):
+        app, role = check_app_manager_permission(
+            request.user, path, self.get_namespace(namespace)
+        )
+        try:
+            webhook = Webhook.objects.get(id=webhook_id, app=app)
+        except Webhook.DoesNotExist:
+            raise Http404
+        deliveries, headers = paginate(request, webhook.deliveries.all())
+        serializer = WebhookDeliverySerializer(deliveries, many=True)
+        return Response(serializer.data, headers=headers)
+
+
+class OrganizationUniversalAppWebhookDeliveryList(UserUniversalAppWebhookDeliveryList):
+    def get_namespace(self, path):
+        return Namespace.organization(path)
+
+
 class OrganizationUniversalAppList(APIView):
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def get(self, request, org_path):
-        page, per_page = get_pagination_params(request)
-        apps = []
+        query = UniversalApp.objects.none()
         if request.user.is_authenticated:
             try:
                 user_org = OrganizationUser.objects.get(
                     org__path=org_path, user=request.user
                 )
-                apps = UniversalApp.objects.filter(org=user_org.org).order_by(
-                    "create_time"
-                )[(page - 1) * per_page : page * per_page]
+                query = UniversalApp.objects.filter(org=user_org.org)
             except OrganizationUser.DoesNotExist:
                 try:
                     allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
                     org = Organization.objects.get(
                         path=org_path, visibility__in=allow_visibility
                     )
-                    apps = UniversalApp.objects.filter(
+                    query = UniversalApp.objects.filter(
                         org=org, visibility__in=allow_visibility
-                    ).order_by("create_time")[(page - 1) * per_page : page * per_page]
+                    )
                 except Organization.DoesNotExist:
                     pass
         else:
@@ -555,14 +546,13 @@ class OrganizationUniversalAppList(APIView):
                 org = Organization.objects.get(
                     path=org_path, visibility=VisibilityType.Public
                 )
-                apps = UniversalApp.objects.filter(
+                query = UniversalApp.objects.filter(
                     org=org, visibility=VisibilityType.Public
-                ).order_by("create_time")[(page - 1) * per_page : page * per_page]
+                )
             except Organization.DoesNotExist:
                 pass
-
+        apps, headers = paginate(request, query, descending=False)
         serializer = UniversalAppSerializer(apps, many=True)
-        headers = {"X-Total-Count": len(apps)}
         return Response(serializer.data, headers=headers)
 
     @transaction.atomic
@@ -594,5 +584,4 @@ class SlugAppDetail(APIView):
 
     def get(self, request, slug):
         app = check_app_download_permission(request.user, slug)
-        data = UniversalAppSerializer(app).data
-        return Response(data)
+        return Response(get_app_data(app))
@@ -1,3 +1,5 @@
+import hashlib
+
 from client.client import BaseClient
 from util.image import generate_random_image
 
@@ -168,8 +170,10 @@ class Api:
         def create_app(self, app):
             return self.client.post(self.base_path + "/apps", app)
 
-        def get_app_list(self, page=1, per_page=10):
+        def get_app_list(self, page=1, per_page=10, cursor=None):
             query = {"page": page, "per_page": per_page}
+            if cursor is not None:
+                query = {"cursor": cursor, "per_page": per_page}
             return self.client.get(self.base_path + "/apps", query)
 
         def get_app_api(self, path):
@@ -232,8 +236,34 @@ class Api:
                 url = self.base_path + "/packages/upload"
                 return self.client.upload_post(url, data=data)
 
-        def get_package_list(self, page=1, per_page=10):
+        def get_upload_package_record(self, record_id):
+            url = self.base_path + "/packages/upload/record/" + str(record_id)
+            return self.client.get(url)
+
+        def update_upload_package_record(self, record_id):
+            url = self.base_path + "/packages/upload/record/" + str(record_id)
+            return self.client.put(url, {})
+
+        def create_chunked_upload(self, data):
+            url = self.base_path + "/packages/upload/chunked"
+            return self.client.post(url, data)
+
+        def get_chunked_upload(self, record_id):
+            url = self.base_path + "/packages/upload/chunked/" + str(record_id)
+            return self.client.get(url)
+
+        def upload_chunk(self, record_id, index, data, sha256=None):
+            url = "{}/packages/upload/chunked/{}/{}".format(
+                self.base_path, record_id, index
+            )
+            if sha256 is None:
+                sha256 = hashlib.sha256(data).hexdigest()
+            return self.client.upload_put(url, data, {"X-Chunk-Sha256": sha256})
+
+        def get_package_list(self, page=1, per_page=10, cursor=None):
             query = {"page": page, "per_page": per_page}
+            if cursor is not None:
+                query = {"cursor": cursor, "per_page": per_page}
             return self.client.get(self.base_path + "/packages", query)
 
         def get_one_package(self, package_id):
@@ -296,6 +326,12 @@ class Api:
         def remove_webhook(self, webhook_id):
             return self.client.delete(self.base_path + "/webhooks/" + str(webhook_id))
 
+        def get_webhook_delivery_list(self, webhook_id, page=1, per_page=10):
+            query = {"page": page, "per_page": per_page}
+            return self.client.get(
+                self.base_path + "/webhooks/" + str(webhook_id) + "/deliveries", query
+            )
+
         def get_stores(self):
             return self.client.get(self.base_path + "/stores")
 
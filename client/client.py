@@ -28,3 +28,6 @@ class BaseClient:
 
     def upload_post(self, path, data):
         pass
+
+    def upload_put(self, path, data, headers=None):
+        pass
@@ -82,3 +82,12 @@ class DjangoTestClient(BaseClient):
             format="multipart",
             HTTP_AUTHORIZATION=self.token,
         )
+
+    def upload_put(self, path, data, headers=None):
+        return self.client.put(
+            self.build_url(path),
+            data,
+            content_type="application/octet-stream",
+            headers=headers,
+            HTTP_AUTHORIZATION=self.token,
+        )
@@ -46,3 +46,8 @@ class RequestsClient(BaseClient):
             headers = {"Authorization": "Token " + token}
             return requests.post(self.build_url(path), files=data, headers=headers)
         return requests.post(self.build_url(path), files=data, headers=self.headers())
+
+    def upload_put(self, path, data, headers=None):
+        headers = dict(self.headers(), **(headers or {}))
+        headers["Content-Type"] = "application/octet-stream"
+        return requests.put(self.build_url(path), data=data, headers=headers)
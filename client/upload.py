@@ -1,5 +1,7 @@
 import argparse
+import hashlib
 import os.path
+import time
 
 import requests
 
@@ -37,6 +39,36 @@ class FileUpload:
                 raise
         return r
 
+    def do_chunked_upload(self, token, file, chunked_upload_url, payload):
+        headers = {
+            'Authorization': 'Token ' + token
+        }
+        payload = dict(payload, size=os.path.getsize(file))
+        r = requests.post(chunked_upload_url, data=payload, headers=headers)
+        r.raise_for_status()
+        session = r.json()
+        session_url = chunked_upload_url + '/' + str(session['record_id'])
+        chunk_size = session['chunk_size']
+        with open(file, 'rb') as f:
+            for index in session['missing']:
+                f.seek(index * chunk_size)
+                data = f.read(chunk_size)
+                chunk_headers = dict(headers)
+                chunk_headers['X-Chunk-Sha256'] = hashlib.sha256(data).hexdigest()
+                # A dropped connection only costs the current chunk.
+                for attempt in range(6):
+                    try:
+                        r = requests.put(session_url + '/' + str(index), data=data, headers=chunk_headers)
+                        r.raise_for_status()
+                        break
+                    except requests.RequestException as e:
+                        if attempt == 5:
+                            raise
+                        print(e)
+                        time.sleep(2 ** attempt)
+                print('chunk %d uploaded' % index)
+        return session['record_id']
+
     def upload_package(self, args):
         request_upload_url = os.path.join(args.api_url, 'upload/package/request')
         payload = {
@@ -65,15 +97,25 @@ class FileUpload:
         upload_type = r.json()['storage']
         upload_url = r.json().get('upload_url', '')
         record_id = r.json().get('record_id', '')
-        r = self.do_upload(args.token, args.package, upload_type, upload_url)
-
-        if upload_type == 'LocalFileSystem':
-            return r.json()
+        chunked_upload_url = r.json().get('chunked_upload_url', '')
+        if upload_type == 'LocalFileSystem' and chunked_upload_url:
+            record_id = self.do_chunked_upload(args.token, args.package, chunked_upload_url, payload)
+        else:
+            r = self.do_upload(args.token, args.package, upload_type, upload_url)
+            if upload_type == 'LocalFileSystem':
+                return r.json()
 
         url = os.path.join(args.api_url, 'upload/package/record/' + str(record_id))
         r = requests.put(url, headers=headers)
         print(r.status_code)
         print(r.json())
+        # The server may ingest the package in the background, poll until done.
+        while r.json()['status'] not in ('completed', 'failed'):
+            time.sleep(2)
+            r = requests.get(url, headers=headers)
+            print(r.json())
+        if r.json()['status'] == 'failed':
+            raise Exception(r.json()['error'])
         return r.json()['data']
 
     def upload_symbol(self, args, package_id):
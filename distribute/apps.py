@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class DistributeConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "distribute"
+
+    def ready(self):
+        import distribute.cache  # noqa: F401
+        import distribute.task  # noqa: F401
+        from distribute.latest import fill_latest_packages
+        from distribute.universal_app import fill_universal_app
+        from distribute.version import fill_version_keys
+
+        # In this order: the latest packages are keyed by universal_app.
+        post_migrate.connect(fill_universal_app, sender=self)
+        post_migrate.connect(fill_version_keys, sender=self)
+        post_migrate.connect(fill_latest_packages, sender=self)
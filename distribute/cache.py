@@ -0,0 +1,31 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from application.models import UniversalApp
+from distribute.models import Package, Release
+from organization.models import Organization
+from util.cache import bump_app_version
+
+
+@receiver(post_save, sender=Package)
+@receiver(post_delete, sender=Package)
+@receiver(post_save, sender=Release)
+@receiver(post_delete, sender=Release)
+def invalidate_distribution(sender, instance, **kwargs):
+    bump_app_version(instance.universal_app_id)
+
+
+@receiver(post_save, sender=UniversalApp)
+@receiver(post_delete, sender=UniversalApp)
+def invalidate_app(sender, instance, **kwargs):
+    bump_app_version(instance.id)
+
+
+@receiver(post_save, sender=Organization)
+def invalidate_org_apps(sender, instance, created, **kwargs):
+    # The organization's name and path are part of its apps' data.
+    if created:
+        return
+    apps = UniversalApp.objects.filter(org=instance)
+    for app_id in apps.values_list("id", flat=True):
+        bump_app_version(app_id)
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import random
+import shutil
+import string
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from distribute.models import FileUploadRecord
+from util.url import get_file_extension
+
+# How much of a chunk is held in memory while it is written to disk.
+CHUNK_READ_SIZE = 64 * 1024
+
+
+def session_file_name(slug, filename):
+    ext = get_file_extension(filename, "zip")
+    name = str(timezone.make_aware(timezone.make_naive(timezone.now())))[:19]
+    suffix = "".join(random.choices(string.ascii_letters, k=4))
+    name = name.replace(" ", "T").replace(":", "-") + "-" + suffix + "." + ext
+    return os.path.join("temp/upload", slug, name)
+
+
+def create_session(universal_app, filename, size, data):
+    """
+    Start a chunked upload. The file is created at its final size in the
+    storage's temp directory and chunks are written in place, in any order.
+    """
+    name = session_file_name(universal_app.install_slug, filename)
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.truncate(size)
+    data = dict(
+        data,
+        type="package",
+        file=name,
+        chunked=True,
+        size=size,
+        chunk_size=settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+        chunks=[],
+    )
+    return FileUploadRecord.objects.create(universal_app=universal_app, data=data)
+
+
+def chunk_count(record):
+    return -(-record.data["size"] // record.data["chunk_size"])
+
+
+def missing_chunks(record):
+    received = set(record.data.get("chunks", []))
+    return [i for i in range(chunk_count(record)) if i not in received]
+
+
+def session_data(record):
+    return {
+        "record_id": record.id,
+        "size": record.data["size"],
+        "chunk_size": record.data["chunk_size"],
+        "received": record.data.get("chunks", []),
+        "missing": missing_chunks(record),
+    }
+
+
+def check_session_writable(record):
+    if record.package_id or record.state not in [
+        FileUploadRecord.State.Waiting,
+        FileUploadRecord.State.Failed,
+    ]:
+        raise serializers.ValidationError({"message": "The upload is committed."})
+
+
+def write_chunk(record, index, stream, length, sha256):
+    """
+    Receive chunk ``index`` from ``stream`` into a file of its own and copy
+    it to its offset in the session file once its SHA-256 matches. A chunk
+    that fails the check leaves the session file untouched and is simply
+    sent again.
+    """
+    check_session_writable(record)
+    chunk_size = record.data["chunk_size"]
+    if index < 0 or index >= chunk_count(record):
+        raise serializers.ValidationError({"message": "Invalid chunk index."})
+    expected = min(chunk_size, record.data["size"] - index * chunk_size)
+    if length != expected:
+        raise serializers.ValidationError(
+            {"message": "Chunk {} should be {} bytes.".format(index, expected)}
+        )
+    if not sha256:
+        raise serializers.ValidationError({"message": "Chunk checksum is required."})
+
+    path = default_storage.path(record.data["file"])
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".chunk"
+    ) as chunk:
+        digest = hashlib.sha256()
+        remaining = length
+        while remaining > 0:
+            data = stream.read(min(CHUNK_READ_SIZE, remaining))
+            if not data:
+                break
+            digest.update(data)
+            chunk.write(data)
+            remaining -= len(data)
+        if remaining or digest.hexdigest() != sha256.lower():
+            raise serializers.ValidationError({"message": "Chunk checksum mismatch."})
+        chunk.flush()
+        chunk.seek(0)
+
+        with transaction.atomic():
+            # The session may have been committed while the chunk was received.
+            record = FileUploadRecord.objects.select_for_update().get(id=record.id)
+            check_session_writable(record)
+            with open(path, "r+b") as f:
+                f.seek(index * chunk_size)
+                shutil.copyfileobj(chunk, f, CHUNK_READ_SIZE)
+            record.data["chunks"] = sorted(set(record.data["chunks"]) | {index})
+            record.save(update_fields=["data", "update_time"])
+    return record
+
+
+def check_session_complete(record):
+    if record.data.get("chunked") and missing_chunks(record):
+        raise serializers.ValidationError({"message": "The upload is incomplete."})
@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from application.models import Webhook
+from distribute.jobs import enqueue
+from distribute.models import WebhookDigest, WebhookEvent
+
+Name = WebhookEvent.Name
+
+# The Webhook flag subscribing to each event.
+SUBSCRIPTIONS = {
+    Name.NewPackage: "when_new_package",
+    Name.NewRelease: "when_new_release",
+    Name.ReleaseEnabled: "when_new_upgrade",
+    Name.ReleaseDisabled: "when_new_upgrade",
+    Name.StoreVersionChange: "when_store_state_change",
+}
+
+
+def subscribers(universal_app_id, name):
+    return Webhook.objects.filter(
+        app_id=universal_app_id, **{SUBSCRIPTIONS[name]: True}
+    )
+
+
+def emit(name, universal_app_id, **payload):
+    """
+    Queue an event for the app's webhooks subscribed to it. The first event
+    of a window schedules a digest job, the ones following it until the job
+    runs are sent with it.
+    """
+    if not subscribers(universal_app_id, name).exists():
+        return None
+    with transaction.atomic():
+        # Locked until the caller's transaction commits: a job taking the
+        # events waits for this one to be visible.
+        digest, created = WebhookDigest.objects.select_for_update().get_or_create(
+            universal_app_id=universal_app_id, name=name
+        )
+        event = WebhookEvent.objects.create(
+            universal_app_id=universal_app_id, name=name, payload=payload
+        )
+        if not digest.scheduled:
+            digest.scheduled = True
+            digest.save(update_fields=["scheduled"])
+            schedule_digest(universal_app_id, name)
+    return event
+
+
+def schedule_digest(universal_app_id, name):
+    run_at = timezone.now() + timedelta(seconds=settings.WEBHOOK_DIGEST_WINDOW)
+    enqueue("webhook_digest", run_at=run_at, app=universal_app_id, event=name)
+
+
+def take_events(universal_app_id, name):
+    """
+    Mark the app's pending events as taken and return them, oldest first.
+    Events queued from now on schedule a digest job of their own.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Waits for events being queued, then lets the next one schedule.
+        WebhookDigest.objects.filter(
+            universal_app_id=universal_app_id, name=name
+        ).update(scheduled=False)
+        events = list(
+            WebhookEvent.objects.select_for_update(skip_locked=True)
+            .filter(universal_app_id=universal_app_id, name=name)
+            .filter(Q(taken_until__isnull=True) | Q(taken_until__lt=now))
+            .order_by("id")
+        )
+        WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+            taken_until=now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+        )
+    return events
+
+
+def finish_events(events):
+    WebhookEvent.objects.filter(id__in=[event.id for event in events]).delete()
+
+
+def release_events(events):
+    """Give back events that could not be sent, the job's retry takes them."""
+    WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+        taken_until=None
+    )
@@ -0,0 +1,319 @@
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from application.models import AppAPIToken, Application
+from distribute.latest import point_latest_package
+from distribute.models import FileUploadRecord, Package
+from distribute.package_parser import parser
+from distribute.sequence import next_id
+from distribute.task import notify_new_package, queue_package_ingest
+from util.url import get_file_extension
+
+
+def spool_directory():
+    """
+    Where uploads are spooled while the request body streams in.
+
+    With a local storage this is a directory inside the storage itself, so
+    saving the package afterwards is a rename instead of a second copy.
+    """
+    try:
+        directory = default_storage.path("temp/spool")
+    except NotImplementedError:
+        directory = settings.FILE_UPLOAD_TEMP_DIR or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+class HashingUploadedFile(TemporaryUploadedFile):
+    """
+    A spooled upload that carries the MD5 and SHA-256 of its content.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(
+            suffix=".upload" + ext, dir=spool_directory()
+        )
+        super(TemporaryUploadedFile, self).__init__(
+            file, name, content_type, size, charset, content_type_extra
+        )
+        self.md5 = None
+        self.sha256 = None
+
+
+class HashingFileUploadHandler(FileUploadHandler):
+    """
+    Spool uploaded files to disk and hash them while the body is received,
+    so nothing has to read the package again to fingerprint it.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = HashingUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.md5 = hashlib.md5()
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.md5.update(raw_data)
+        self.sha256.update(raw_data)
+        self.file.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.md5 = self.md5.hexdigest()
+        self.file.sha256 = self.sha256.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, "file"):
+            temp_location = self.file.temporary_file_path()
+            try:
+                self.file.close()
+                os.remove(temp_location)
+            except FileNotFoundError:
+                pass
+
+
+class HashingUploadMixin:
+    """
+    Views that accept package uploads stream them through
+    HashingFileUploadHandler.
+    """
+
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [HashingFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
+
+def file_digests(file):
+    """
+    Return the (md5, sha256) hex digests of ``file``, hashing it in a single
+    pass unless the upload handler or the storage already knows them. A
+    storage that only knows the MD5 (from an object's ETag) sets sha256 to
+    None, which is returned as is rather than reading the whole file.
+    """
+    md5 = getattr(file, "md5", None)
+    if md5 and hasattr(file, "sha256"):
+        return md5, file.sha256
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    for chunk in file.chunks():
+        md5.update(chunk)
+        sha256.update(chunk)
+    file.seek(0)
+    return md5.hexdigest(), sha256.hexdigest()
+
+
+class StoredUploadFile(File):
+    """
+    A file uploaded into a local storage, moved into place like a spooled
+    upload instead of being copied.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def open_uploaded_file(name):
+    """
+    Open a file that was uploaded straight to the storage. Remote storages
+    read it by byte ranges and copy it into place on the server side
+    instead of downloading it.
+    """
+    fast_open = getattr(default_storage, "fast_open", None)
+    if fast_open is not None:
+        return fast_open(name)
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        return default_storage.open(name)
+    return StoredUploadFile(open(path, "rb"), name)
+
+
+def create_package(
+    operator_content_object,
+    universal_app,
+    file,
+    commit_id="",
+    description="",
+    channel="",
+    build_type="Debug",
+    on_store=None,
+):
+    ext = get_file_extension(file.name)
+    try:
+        pkg = parser.parse(file.file, ext)
+    except parser.PARSE_ERRORS:
+        pkg = None
+    if pkg is None:
+        raise serializers.ValidationError({"message": "Can not parse the package."})
+    try:
+        # The parsers read the package lazily, a broken one can still fail
+        # here.
+        app_icon = pkg.app_icon
+        metadata = {
+            "os": pkg.os,
+            "name": pkg.display_name,
+            "version": pkg.version,
+            "short_version": pkg.short_version,
+            "bundle_identifier": pkg.bundle_identifier,
+            "min_os": pkg.minimum_os_version,
+            "extra": pkg.extra,
+        }
+    except parser.PARSE_ERRORS:
+        raise serializers.ValidationError({"message": "Can not parse the package."})
+    finally:
+        pkg.close()
+    if app_icon is not None:
+        icon_file = ContentFile(app_icon)
+        icon_file.name = "icon.png"
+    else:
+        icon_file = None
+    app = None
+    if metadata["os"] == Application.OperatingSystem.iOS:
+        app = universal_app.iOS
+    elif metadata["os"] == Application.OperatingSystem.Android:
+        app = universal_app.android
+    if app is None:
+        raise serializers.ValidationError({"message": "OS not supported."})
+    if on_store is not None:
+        on_store()
+    md5, sha256 = file_digests(file)
+    package_id = next_id(universal_app, "package")
+    with transaction.atomic():
+        instance = Package.objects.create(
+            operator_object_id=operator_content_object.id,
+            operator_content_object=operator_content_object,
+            build_type=build_type,
+            channel=channel,
+            app=app,
+            universal_app=universal_app,
+            name=metadata["name"],
+            package_file=file,
+            icon_file=icon_file,
+            fingerprint=md5,
+            sha256=sha256,
+            version=metadata["version"],
+            short_version=metadata["short_version"],
+            bundle_identifier=metadata["bundle_identifier"],
+            package_id=package_id,
+            min_os=metadata["min_os"],
+            commit_id=commit_id,
+            description=description,
+            extra=metadata["extra"],
+            size=file.size,
+        )
+        point_latest_package(instance)
+    if not app.icon_file and icon_file is not None:
+        app.icon_file = icon_file
+        app.save()
+    notify_new_package(instance)
+    return instance
+
+
+RECORD_STATE_TIME_FIELDS = {
+    FileUploadRecord.State.Queued: "queue_time",
+    FileUploadRecord.State.Parsing: "parse_time",
+    FileUploadRecord.State.Storing: "store_time",
+    FileUploadRecord.State.Completed: "finish_time",
+    FileUploadRecord.State.Failed: "finish_time",
+}
+
+
+def set_record_state(record, state, error=""):
+    time_field = RECORD_STATE_TIME_FIELDS[state]
+    record.state = state
+    record.error = error[:1024]
+    setattr(record, time_field, timezone.now())
+    record.save(update_fields=["state", "error", time_field, "package", "update_time"])
+
+
+def get_error_message(e):
+    if isinstance(e, serializers.ValidationError) and isinstance(e.detail, dict):
+        message = e.detail.get("message")
+        if message:
+            return str(message)
+    return str(e) or e.__class__.__name__
+
+
+def get_uploader(data):
+    if data.get("uploader_type", "") == "user":
+        return get_user_model().objects.get(id=data["uploader_id"])
+    return AppAPIToken.objects.get(id=data["uploader_id"])
+
+
+def queue_record(record):
+    """
+    Queue the ingest of an uploaded record. Returns False if the record is
+    already queued, being ingested or done.
+    """
+    now = timezone.now()
+    queued = FileUploadRecord.objects.filter(
+        id=record.id,
+        package__isnull=True,
+        state__in=[FileUploadRecord.State.Waiting, FileUploadRecord.State.Failed],
+    ).update(
+        state=FileUploadRecord.State.Queued,
+        error="",
+        queue_time=now,
+        parse_time=None,
+        store_time=None,
+        finish_time=None,
+        update_time=now,
+    )
+    record.refresh_from_db()
+    if queued:
+        transaction.on_commit(lambda: queue_package_ingest(record.id))
+    return bool(queued)
+
+
+def ingest_record(record):
+    """
+    Create the package of a record whose file was uploaded straight to the
+    storage, keeping the record's state up to date. Errors are recorded on
+    the record and raised again.
+    """
+    extra = record.data
+    try:
+        set_record_state(record, FileUploadRecord.State.Parsing)
+        file = open_uploaded_file(extra["file"])
+        try:
+            instance = create_package(
+                get_uploader(extra),
+                record.universal_app,
+                file,
+                extra.get("commit_id", ""),
+                extra.get("description", ""),
+                extra.get("channel", ""),
+                extra.get("build_type", "Debug"),
+                on_store=lambda: set_record_state(
+                    record, FileUploadRecord.State.Storing
+                ),
+            )
+        finally:
+            file.close()
+    except Exception as e:
+        set_record_state(record, FileUploadRecord.State.Failed, get_error_message(e))
+        raise
+    record.package = instance
+    set_record_state(record, FileUploadRecord.State.Completed)
+    try:
+        default_storage.delete(extra["file"])
+    except:   # noqa: E722
+        pass
+    return instance
@@ -0,0 +1,190 @@
+import os
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from distribute.models import Job
+
+POLL_INTERVAL = 1
+RETRY_DELAY = 10
+MAX_RETRY_DELAY = 60 * 60
+
+handlers = {}
+
+# Set when a job is queued, wakes up the workers of this process.
+_wakeup = threading.Event()
+_in_process_lock = threading.Lock()
+_in_process_workers = []
+_in_process_pid = None
+
+
+def register(name):
+    def decorator(func):
+        handlers[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(name, run_at=None, **payload):
+    job = Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_at=run_at or timezone.now(),
+    )
+    transaction.on_commit(wake_workers)
+    return job
+
+
+def wake_workers():
+    start_in_process_workers()
+    _wakeup.set()
+
+
+def retry_delay(attempts):
+    return min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+
+
+def claim_job():
+    """
+    Take the next due job, or a running one whose worker did not finish it
+    in time. Returns None if there is nothing to do.
+    """
+    now = timezone.now()
+    claimable = Q(state=Job.State.Queued, run_at__lte=now) | Q(
+        state=Job.State.Running, locked_until__lt=now
+    )
+    with transaction.atomic():
+        candidates = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(claimable)
+            .order_by("run_at", "id")[:10]
+        )
+        for job in candidates:
+            locked_until = now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT)
+            # Databases without SKIP LOCKED can hand the same row to two
+            # workers, only the one whose update matches keeps it.
+            claimed = Job.objects.filter(claimable, id=job.id, attempts=job.attempts)
+            if job.state == Job.State.Running and job.attempts >= job.max_attempts:
+                # Its last attempt timed out.
+                claimed.update(
+                    state=Job.State.Dead,
+                    error="The job did not finish in time.",
+                    locked_until=None,
+                    update_time=now,
+                )
+                continue
+            if claimed.update(
+                state=Job.State.Running,
+                attempts=job.attempts + 1,
+                locked_until=locked_until,
+                update_time=now,
+            ):
+                job.state = Job.State.Running
+                job.attempts += 1
+                job.locked_until = locked_until
+                return job
+    return None
+
+
+def owned(job):
+    """
+    The job's row as long as no other worker claimed it since, after this
+    one timed out.
+    """
+    return Job.objects.filter(id=job.id, attempts=job.attempts)
+
+
+def fail_job(job, error):
+    now = timezone.now()
+    job.error = error[-1024:]
+    job.locked_until = None
+    if job.attempts >= job.max_attempts:
+        job.state = Job.State.Dead
+    else:
+        job.state = Job.State.Queued
+        job.run_at = now + timedelta(seconds=retry_delay(job.attempts))
+    owned(job).update(
+        state=job.state,
+        error=job.error,
+        locked_until=None,
+        run_at=job.run_at,
+        update_time=now,
+    )
+
+
+def run_job(job):
+    try:
+        handler = handlers[job.name]
+        handler(**job.payload)
+    except:  # noqa: E722
+        # The error is kept on the job.
+        fail_job(job, traceback.format_exc())
+    else:
+        owned(job).delete()
+
+
+def run_pending_jobs():
+    """Run every due job in this thread, returns how many ran."""
+    count = 0
+    job = claim_job()
+    while job is not None:
+        run_job(job)
+        count += 1
+        job = claim_job()
+    return count
+
+
+def work(stop=None):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        close_old_connections()
+        try:
+            job = claim_job()
+            if job is not None:
+                run_job(job)
+        except:  # noqa: E722
+            # The database is away, the job is taken over once it times out.
+            traceback.print_exc()
+            job = None
+        if job is None and _wakeup.wait(POLL_INTERVAL):
+            _wakeup.clear()
+    close_old_connections()
+
+
+def start_workers(count, stop=None):
+    threads = []
+    for i in range(count):
+        thread = threading.Thread(
+            target=work, args=(stop,), name="job-worker-{}".format(i), daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
+
+
+def start_in_process_workers():
+    """
+    Start the JOB_WORKER_THREADS workers of a web process. Called when the
+    WSGI or ASGI application loads, and again when a job is queued in case
+    the process was forked from one that had them. Deployments running
+    manage.py run_workers set it to 0.
+    """
+    global _in_process_pid
+    if settings.JOB_WORKER_THREADS <= 0:
+        return
+    if _in_process_workers and _in_process_pid == os.getpid():
+        return
+    with _in_process_lock:
+        if _in_process_pid != os.getpid():
+            # Threads are not carried over a fork.
+            _in_process_workers.clear()
+            _in_process_pid = os.getpid()
+        if not _in_process_workers:
+            _in_process_workers.extend(start_workers(settings.JOB_WORKER_THREADS))
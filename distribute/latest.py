@@ -0,0 +1,158 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from distribute.models import LatestPackage, Package
+
+
+def point_latest_package(package):
+    """
+    Make a newly created package the latest one of its os, channel and
+    build type.
+    """
+    with transaction.atomic():
+        LatestPackage.objects.update_or_create(
+            universal_app_id=package.universal_app_id,
+            os=package.app.os,
+            channel=package.channel,
+            build_type=package.build_type,
+            defaults={"package": package},
+        )
+
+
+def refresh_latest_package(universal_app_id, os, channel, build_type):
+    with transaction.atomic():
+        package = (
+            Package.objects.filter(
+                universal_app_id=universal_app_id,
+                app__os=os,
+                channel=channel,
+                build_type=build_type,
+            )
+            .order_by("-create_time", "-id")
+            .first()
+        )
+        if package is None:
+            LatestPackage.objects.filter(
+                universal_app_id=universal_app_id,
+                os=os,
+                channel=channel,
+                build_type=build_type,
+            ).delete()
+            return
+        # The package may still be the pointer of the key it was moved from.
+        LatestPackage.objects.filter(package=package).exclude(
+            universal_app_id=universal_app_id,
+            os=os,
+            channel=channel,
+            build_type=build_type,
+        ).delete()
+        LatestPackage.objects.update_or_create(
+            universal_app_id=universal_app_id,
+            os=os,
+            channel=channel,
+            build_type=build_type,
+            defaults={"package": package},
+        )
+
+
+def move_latest_package(package, channel, build_type):
+    """
+    Repoint the latest packages after package moved from channel and
+    build_type to its current ones.
+    """
+    if (package.channel, package.build_type) == (channel, build_type):
+        return
+    os = package.app.os
+    with transaction.atomic():
+        refresh_latest_package(package.universal_app_id, os, channel, build_type)
+        refresh_latest_package(
+            package.universal_app_id, os, package.channel, package.build_type
+        )
+
+
+def rebuild_latest_packages(using=DEFAULT_DB_ALIAS):
+    rows = {}
+    packages = (
+        Package.objects.using(using)
+        .select_related("app")
+        .order_by("create_time", "id")
+    )
+    for package in packages.iterator():
+        # Not filled in yet on packages from before the column existed.
+        universal_app_id = package.universal_app_id or package.app.universal_app_id
+        key = (universal_app_id, package.app.os, package.channel, package.build_type)
+        rows[key] = LatestPackage(
+            universal_app_id=universal_app_id,
+            os=package.app.os,
+            channel=package.channel,
+            build_type=package.build_type,
+            package=package,
+        )
+    with transaction.atomic(using=using):
+        LatestPackage.objects.using(using).all().delete()
+        LatestPackage.objects.using(using).bulk_create(
+            rows.values(), batch_size=1000
+        )
+    return len(rows)
+
+
+def get_latest_package(universal_app, os=None, channel=None, build_type=None):
+    query = LatestPackage.objects.filter(universal_app=universal_app)
+    packages = Package.objects.filter(universal_app=universal_app)
+    if os is not None:
+        query = query.filter(os=os)
+        packages = packages.filter(app__os=os)
+    if channel is not None:
+        query = query.filter(channel=channel)
+        packages = packages.filter(channel=channel)
+    if build_type is not None:
+        query = query.filter(build_type=build_type)
+        packages = packages.filter(build_type=build_type)
+    latest = (
+        query.select_related("package__app", "package__operator_content_type")
+        .order_by("-package__create_time", "-package_id")
+        .first()
+    )
+    if latest is not None:
+        return latest.package
+    # Packages uploaded before the pointers existed.
+    package = (
+        packages.select_related("app", "operator_content_type")
+        .order_by("-create_time", "-id")
+        .first()
+    )
+    if package is not None:
+        refresh_latest_package(
+            universal_app.id, package.app.os, package.channel, package.build_type
+        )
+    return package
+
+
+def fill_latest_packages(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate receiver: a deployment upgraded from before the table
+    existed has packages but no pointers, build them once.
+    """
+    if LatestPackage.objects.using(using).exists():
+        return
+    if not Package.objects.using(using).exists():
+        return
+    rebuild_latest_packages(using)
+
+
+@receiver(post_delete, sender=Package)
+def handle_package_delete(sender, instance, origin=None, **kwargs):
+    # Packages removed with their app take the pointers along.
+    if isinstance(origin, QuerySet):
+        if origin.model is not Package:
+            return
+    elif origin is not None and not isinstance(origin, Package):
+        return
+    refresh_latest_package(
+        instance.universal_app_id,
+        instance.app.os,
+        instance.channel,
+        instance.build_type,
+    )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from distribute.universal_app import backfill_universal_app
+
+
+class Command(BaseCommand):
+    help = "Fill in universal_app on packages and releases created before it existed."
+
+    def handle(self, *args, **options):
+        for model, count in backfill_universal_app().items():
+            self.stdout.write(
+                "{}: {} rows updated.".format(model._meta.verbose_name_plural, count)
+            )
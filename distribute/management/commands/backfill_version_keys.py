@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from distribute.version import backfill_version_keys
+
+
+class Command(BaseCommand):
+    help = "Compute the sortable version keys of packages created before they existed."
+
+    def handle(self, *args, **options):
+        count = backfill_version_keys()
+        self.stdout.write("packages: {} rows updated.".format(count))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from distribute.latest import rebuild_latest_packages
+
+
+class Command(BaseCommand):
+    help = "Rebuild the latest package of every app, os, channel and build type."
+
+    def handle(self, *args, **options):
+        count = rebuild_latest_packages()
+        self.stdout.write("{} latest packages written.".format(count))
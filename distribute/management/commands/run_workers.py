@@ -0,0 +1,46 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from distribute.jobs import start_workers
+from distribute.models import Job
+
+
+class Command(BaseCommand):
+    help = "Run background job workers until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.JOB_WORKERS,
+            help="Number of worker threads.",
+        )
+        parser.add_argument(
+            "--requeue-dead",
+            action="store_true",
+            help="Queue the dead jobs again before starting.",
+        )
+
+    def handle(self, *args, **options):
+        if options["requeue_dead"]:
+            count = Job.objects.filter(state=Job.State.Dead).update(
+                state=Job.State.Queued, attempts=0, error=""
+            )
+            self.stdout.write("{} dead jobs queued again.".format(count))
+
+        stop = threading.Event()
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        threads = start_workers(options["workers"], stop)
+        self.stdout.write("{} workers started.".format(len(threads)))
+        # Finish the running jobs before exiting.
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(1)
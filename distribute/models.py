@@ -4,11 +4,13 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
 from django.db.models import UniqueConstraint
+from django.utils import timezone
 
 # from django.conf import settings
 from application.models import Application, UniversalApp
 from distribute.stores.base import StoreType
-from util.choice import ChoiceField
+from distribute.version import version_key
+from util.choice import ChoiceField, CustomChoicesMeta
 from util.url import get_file_extension
 
 # from util.storage import make_directory, remove_directory, copy_file
@@ -69,6 +71,8 @@ class Package(models.Model):
     package_id = models.IntegerField()
     build_type = models.CharField(max_length=32, default="Debug")
     app = models.ForeignKey(Application, on_delete=models.CASCADE)
+    # Same as app.universal_app, stored so lookups skip the join.
+    universal_app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE, null=True)
     name = models.CharField(
         max_length=32, help_text="The app's name (extracted from the uploaded package)."
     )
@@ -78,6 +82,13 @@ class Package(models.Model):
     fingerprint = models.CharField(
         max_length=32, help_text="MD5 checksum of the package binary."
     )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        default=None,
+        help_text="SHA-256 checksum of the package binary, null when unknown.",
+    )
     version = models.CharField(
         max_length=64,
         help_text="The package's version.\nFor iOS: CFBundleVersion from info.plist.\nFor Android: android:versionCode from AppManifest.xml.",  # noqa: E501
@@ -86,6 +97,9 @@ class Package(models.Model):
         max_length=64,
         help_text="The package's short version.\nFor iOS: CFBundleShortVersionString from info.plist.\nFor Android: android:versionName from AppManifest.xml.",  # noqa: E501
     )
+    # Sortable forms of version and short_version, see distribute.version.
+    version_key = models.CharField(max_length=128, blank=True, default="")
+    short_version_key = models.CharField(max_length=128, blank=True, default="")
     size = models.IntegerField(help_text="The package's size in bytes.")
     min_os = models.CharField(
         max_length=32, help_text="The package's minimum required operating system."
@@ -102,8 +116,31 @@ class Package(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                "universal_app",
+                "package_id",
+                name="package_id_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["universal_app", "-create_time", "-id"],
+                name="package_universal_create_idx",
+            ),
+            models.Index(
+                fields=["universal_app", "short_version_key"],
+                name="package_short_version_idx",
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        if not self.pk and self.package_file is not None:
+        if self.universal_app_id is None:
+            self.universal_app_id = self.app.universal_app_id
+        self.version_key = version_key(self.version)
+        self.short_version_key = version_key(self.short_version)
+        if not self.pk and self.package_file is not None and not self.fingerprint:
             md5 = hashlib.md5()
             for chunk in self.package_file.chunks():
                 md5.update(chunk)
@@ -134,7 +171,40 @@ class Package(models.Model):
     #     return install_slug + '/' + os_name + '/' + self.short_version + '/' + self.name + '.' + get_file_extension(file.name, 'zip') # noqa: E501
 
 
+class LatestPackage(models.Model):
+    """
+    The newest package of an app for one os, channel and build type, kept
+    up to date by distribute.latest so the latest package is a lookup
+    instead of a sort over all packages.
+    """
+
+    universal_app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE)
+    os = models.IntegerField(choices=Application.OperatingSystem.choices)
+    channel = models.CharField(max_length=32)
+    build_type = models.CharField(max_length=32)
+    package = models.OneToOneField(Package, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                "universal_app",
+                "os",
+                "channel",
+                "build_type",
+                name="latest_package_unique",
+            ),
+        ]
+
+
 class FileUploadRecord(models.Model):
+    class State(models.IntegerChoices, metaclass=CustomChoicesMeta):
+        Waiting = 0, "waiting"
+        Queued = 1, "queued"
+        Parsing = 2, "parsing"
+        Storing = 3, "storing"
+        Completed = 4, "completed"
+        Failed = 5, "failed"
+
     universal_app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE)
     package = models.ForeignKey(
         Package,
@@ -143,12 +213,20 @@ class FileUploadRecord(models.Model):
         on_delete=models.CASCADE
     )
     data = models.JSONField(default=dict)
+    state = models.IntegerField(choices=State.choices, default=State.Waiting)
+    error = models.CharField(max_length=1024, blank=True, default="")
+    queue_time = models.DateTimeField(blank=True, null=True)
+    parse_time = models.DateTimeField(blank=True, null=True)
+    store_time = models.DateTimeField(blank=True, null=True)
+    finish_time = models.DateTimeField(blank=True, null=True)
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
 
 class Release(models.Model):
     app = models.ForeignKey(Application, on_delete=models.CASCADE)
+    # Same as app.universal_app, stored so lookups skip the join.
+    universal_app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE, null=True)
     package = models.OneToOneField(Package, on_delete=models.CASCADE)
     release_id = models.IntegerField()
     release_notes = models.CharField(
@@ -161,6 +239,26 @@ class Release(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                "universal_app",
+                "release_id",
+                name="release_id_unique",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["universal_app", "-create_time", "-id"],
+                name="release_universal_create_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.universal_app_id is None:
+            self.universal_app_id = self.app.universal_app_id
+        super().save(*args, **kwargs)
+
 
 class Upgrade(models.Model):
     release = models.OneToOneField(Release, on_delete=models.CASCADE)
@@ -175,6 +273,26 @@ class Upgrade(models.Model):
     update_time = models.DateTimeField(auto_now=True)
 
 
+class AppSequence(models.Model):
+    """
+    A per-app counter handing out package, release and upgrade ids, see
+    distribute.sequence.
+    """
+
+    app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE)
+    name = models.CharField(max_length=32)
+    value = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                "app",
+                "name",
+                name="app_sequence_unique",
+            ),
+        ]
+
+
 class StoreApp(models.Model):
     app = models.ForeignKey(Application, on_delete=models.CASCADE)
     store = models.IntegerField(choices=StoreType.choices)
@@ -199,6 +317,94 @@ class StoreAppVersionRecord(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["app", "store", "-update_time"],
+                name="store_version_update_idx",
+            ),
+        ]
+
+
+class WebhookEvent(models.Model):
+    """
+    An event waiting to be sent to the webhooks subscribed to it. Events of
+    an app are sent together once its digest window has passed.
+    """
+
+    class Name(models.TextChoices):
+        NewPackage = "new_package"
+        NewRelease = "new_release"
+        ReleaseEnabled = "release_enabled"
+        ReleaseDisabled = "release_disabled"
+        StoreVersionChange = "store_version_change"
+
+    universal_app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE)
+    name = models.CharField(max_length=32, choices=Name.choices)
+    payload = models.JSONField(default=dict)
+    # Set while a digest job sends the event, it is deleted once sent. Taken
+    # again after this time if the job was lost.
+    taken_until = models.DateTimeField(blank=True, null=True)
+    create_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["universal_app", "name", "id"], name="webhook_event_app_idx"
+            ),
+        ]
+
+
+class WebhookDigest(models.Model):
+    """
+    Whether a digest job is queued for an app's events of one kind. The row
+    is locked while an event is queued or a job takes the events, so every
+    event is either taken by the queued job or queues a new one.
+    """
+
+    universal_app = models.ForeignKey(UniversalApp, on_delete=models.CASCADE)
+    name = models.CharField(max_length=32, choices=WebhookEvent.Name.choices)
+    scheduled = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                "universal_app",
+                "name",
+                name="webhook_digest_unique",
+            ),
+        ]
+
+
+class Job(models.Model):
+    """
+    A background job, run by distribute.jobs workers. Finished jobs are
+    deleted, the ones that failed every attempt stay as Dead.
+    """
+
+    class State(models.IntegerChoices, metaclass=CustomChoicesMeta):
+        Queued = 0, "queued"
+        Running = 1, "running"
+        Dead = 2, "dead"
+
+    name = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict)
+    state = models.IntegerField(choices=State.choices, default=State.Queued)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    # Not run before this time, set after a failure to back off.
+    run_at = models.DateTimeField(default=timezone.now)
+    # A running job not finished by then is taken over by another worker.
+    locked_until = models.DateTimeField(blank=True, null=True)
+    error = models.CharField(max_length=1024, blank=True, default="")
+    create_time = models.DateTimeField(auto_now_add=True)
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["state", "run_at"], name="job_state_run_idx"),
+        ]
+
 
 # class ReleaseStore(models.Model):
 #     class State(models.IntegerChoices):
@@ -1,11 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import io
+import zipfile
+
 from androguard.core.bytecodes.apk import APK
 
 from application.models import Application
 
+from .axml import ApkMetadata, AXMLError
 from .base import AppParser
+from .mapped_file import MappedFile
 
 
 class ApkParser(AppParser):
@@ -15,8 +20,41 @@ class ApkParser(AppParser):
             os == Application.OperatingSystem.Android or os is None
         )
 
+    # Only these entries are read, the rest of the package (dex files,
+    # assets, native libraries) is never touched.
+    metadata_entries = ["AndroidManifest.xml", "resources.arsc"]
+
     def __init__(self, file):
-        self.apk = APK(file.read(), raw=True)
+        self.file = file
+        self.zip = zipfile.ZipFile(file)
+        try:
+            self.apk = ApkMetadata(*self._metadata_entries())
+        except (KeyError, AXMLError):
+            # Anything the lightweight reader does not understand is left
+            # to androguard.
+            self.apk = APK(self._metadata_zip(), raw=True)
+
+    def _metadata_entries(self):
+        manifest = self.zip.read("AndroidManifest.xml")
+        try:
+            resources = self.zip.read("resources.arsc")
+        except KeyError:
+            resources = None
+        return manifest, resources
+
+    def _metadata_zip(self):
+        buffer = io.BytesIO()
+        names = set(self.zip.namelist())
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as metadata:
+            for name in self.metadata_entries:
+                if name in names:
+                    metadata.writestr(name, self.zip.read(name))
+        return buffer.getvalue()
+
+    def close(self):
+        self.zip.close()
+        if isinstance(self.file, MappedFile):
+            self.file.close()
 
     @property
     def os(self):
@@ -65,7 +103,13 @@ class ApkParser(AppParser):
 
     @property
     def app_icon(self):
-        return self.apk.get_file(self.apk.get_app_icon())
+        icon = self.apk.get_app_icon()
+        if not icon:
+            return None
+        try:
+            return self.zip.read(icon)
+        except KeyError:
+            return None
 
     @property
     def extra(self):
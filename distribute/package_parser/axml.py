@@ -0,0 +1,635 @@
+import struct
+
+# A small reader for the two binary files aapt writes into an APK:
+# the compiled AndroidManifest.xml and the resources.arsc table. It only
+# decodes what ApkParser needs and mirrors the lookup rules androguard
+# applies for the same values, so both give the same answers.
+
+NS_ANDROID = "http://schemas.android.com/apk/res/android"
+
+RES_STRING_POOL_TYPE = 0x0001
+RES_TABLE_TYPE = 0x0002
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_END_ELEMENT_TYPE = 0x0103
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+RES_TABLE_PACKAGE_TYPE = 0x0200
+RES_TABLE_TYPE_TYPE = 0x0201
+
+TYPE_NULL = 0x00
+TYPE_REFERENCE = 0x01
+TYPE_ATTRIBUTE = 0x02
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+TYPE_INT_BOOLEAN = 0x12
+
+STRING_POOL_UTF8_FLAG = 0x100
+TYPE_FLAG_SPARSE = 0x01
+TYPE_FLAG_OFFSET16 = 0x02
+ENTRY_FLAG_COMPLEX = 0x01
+ENTRY_FLAG_COMPACT = 0x08
+NO_ENTRY = 0xFFFFFFFF
+
+# Framework attribute ids, used when an obfuscated manifest strips the
+# attribute names from the string pool.
+ANDROID_ATTRIBUTES = {
+    0x01010001: "label",
+    0x01010002: "icon",
+    0x01010003: "name",
+    0x0101000E: "enabled",
+    0x0101020C: "minSdkVersion",
+    0x0101021B: "versionCode",
+    0x0101021C: "versionName",
+    0x01010270: "targetSdkVersion",
+}
+
+# Only these elements are kept while walking the manifest.
+MANIFEST_TAGS = {
+    "manifest",
+    "uses-sdk",
+    "application",
+    "activity",
+    "activity-alias",
+    "action",
+    "category",
+}
+
+# Fields of ResTable_config androguard compares configs by (everything after
+# the size field up to and including screenConfig2).
+CONFIG_KEY_SIZE = 36
+DEFAULT_CONFIG = bytes(CONFIG_KEY_SIZE)
+
+MAX_REFERENCE_DEPTH = 16
+
+
+class AXMLError(ValueError):
+    pass
+
+
+def format_value(value_type, data, strings):
+    if value_type == TYPE_STRING:
+        return strings[data]
+    prefix = "android:" if data >> 24 == 1 else ""
+    if value_type == TYPE_REFERENCE:
+        return "@%s%08X" % (prefix, data)
+    if value_type == TYPE_ATTRIBUTE:
+        return "?%s%08X" % (prefix, data)
+    if value_type == TYPE_INT_DEC:
+        return "%d" % (data - 0x100000000 if data > 0x7FFFFFFF else data)
+    if value_type == TYPE_INT_HEX:
+        return "0x%08X" % data
+    if value_type == TYPE_INT_BOOLEAN:
+        return "false" if data == 0 else "true"
+    raise AXMLError("unsupported value type 0x{:02x}".format(value_type))
+
+
+def read_chunk_header(data, offset):
+    if offset + 8 > len(data):
+        raise AXMLError("truncated chunk at {}".format(offset))
+    chunk_type, header_size, size = struct.unpack_from("<HHI", data, offset)
+    if size < 8 or header_size > size or offset + size > len(data):
+        raise AXMLError("invalid chunk at {}".format(offset))
+    return chunk_type, header_size, size
+
+
+class StringPool:
+    """
+    A ResStringPool whose strings are decoded on first access, so a table
+    with tens of thousands of strings only pays for the few that are read.
+    """
+
+    def __init__(self, data, offset):
+        chunk_type, header_size, size = read_chunk_header(data, offset)
+        if chunk_type != RES_STRING_POOL_TYPE:
+            raise AXMLError("expected a string pool at {}".format(offset))
+        count, _, flags, strings_start = struct.unpack_from("<IIII", data, offset + 8)
+        if offset + header_size + 4 * count > offset + size:
+            raise AXMLError("invalid string pool at {}".format(offset))
+        self.data = data
+        self.utf8 = bool(flags & STRING_POOL_UTF8_FLAG)
+        self.offsets = struct.unpack_from(
+            "<{}I".format(count), data, offset + header_size
+        )
+        self.strings_start = offset + strings_start
+        self.end = offset + size
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        if index == NO_ENTRY:
+            return ""
+        try:
+            return self.cache[index]
+        except KeyError:
+            pass
+        if index >= len(self.offsets):
+            raise AXMLError("string index {} out of range".format(index))
+        value = self._decode(self.strings_start + self.offsets[index])
+        self.cache[index] = value
+        return value
+
+    def index(self, value):
+        for i in range(len(self.offsets)):
+            if self[i] == value:
+                return i
+        return None
+
+    def _decode(self, pos):
+        data = self.data
+        if self.utf8:
+            # The utf-16 length comes first and is not needed.
+            _, pos = self._utf8_length(pos)
+            length, pos = self._utf8_length(pos)
+            end = pos + length
+            encoding = "utf-8"
+        else:
+            (length,) = struct.unpack_from("<H", data, pos)
+            pos += 2
+            if length & 0x8000:
+                (low,) = struct.unpack_from("<H", data, pos)
+                length = ((length & 0x7FFF) << 16) | low
+                pos += 2
+            end = pos + length * 2
+            encoding = "utf-16-le"
+        if end > self.end:
+            raise AXMLError("string at {} overruns its pool".format(pos))
+        return bytes(data[pos:end]).decode(encoding, "replace")
+
+    def _utf8_length(self, pos):
+        length = self.data[pos]
+        pos += 1
+        if length & 0x80:
+            length = ((length & 0x7F) << 8) | self.data[pos]
+            pos += 1
+        return length, pos
+
+
+class Element:
+    def __init__(self, tag, order):
+        self.tag = tag
+        self.order = order
+        self.attrib = {}
+        self.actions = []
+        self.categories = []
+
+    def value(self, key):
+        value = self.attrib.get(key)
+        if isinstance(value, tuple):
+            return format_value(value[0], value[1], None)
+        return value
+
+    def get(self, name):
+        # Same fallback as androguard: plain attribute, then android:name.
+        return self.value(name) or self.value("{%s}%s" % (NS_ANDROID, name))
+
+    def get_android(self, name):
+        value = self.value("{%s}%s" % (NS_ANDROID, name))
+        if value is None:
+            value = self.value(name)
+        return value
+
+
+class AndroidManifest:
+    """
+    The elements of a binary AndroidManifest.xml that matter for ingest,
+    grouped by tag in document order.
+    """
+
+    def __init__(self, data):
+        chunk_type, header_size, size = read_chunk_header(data, 0)
+        if chunk_type != RES_XML_TYPE:
+            raise AXMLError("not a binary xml file")
+        self.elements = {tag: [] for tag in MANIFEST_TAGS}
+        self.count = 0
+        strings = None
+        resource_ids = ()
+        stack = []
+        offset = header_size
+        while offset < size:
+            chunk_type, header_size, chunk_size = read_chunk_header(data, offset)
+            if chunk_type == RES_STRING_POOL_TYPE:
+                strings = StringPool(data, offset)
+            elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+                count = (chunk_size - header_size) // 4
+                resource_ids = struct.unpack_from(
+                    "<{}I".format(count), data, offset + header_size
+                )
+            elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+                if strings is None:
+                    raise AXMLError("element before the string pool")
+                element = self._read_element(
+                    data, offset + header_size, strings, resource_ids
+                )
+                stack.append(element)
+                if element is not None:
+                    self._add(element, stack)
+            elif chunk_type == RES_XML_END_ELEMENT_TYPE:
+                if not stack:
+                    raise AXMLError("unbalanced end element")
+                stack.pop()
+            offset += chunk_size
+        if not self.elements["manifest"]:
+            raise AXMLError("no manifest element")
+
+    def _read_element(self, data, offset, strings, resource_ids):
+        _, name, attribute_start, attribute_size, count = struct.unpack_from(
+            "<IIHHH", data, offset
+        )
+        tag = strings[name]
+        if tag not in MANIFEST_TAGS:
+            return None
+        self.count += 1
+        element = Element(tag, self.count)
+        offset += attribute_start
+        for _ in range(count):
+            ns, name, raw, _, _, value_type, value = struct.unpack_from(
+                "<IIIHBBI", data, offset
+            )
+            offset += attribute_size
+            attribute = strings[name]
+            if not attribute and name < len(resource_ids):
+                attribute = ANDROID_ATTRIBUTES.get(resource_ids[name])
+                ns = None
+                if attribute is None:
+                    continue
+            if ns is None:
+                key = "{%s}%s" % (NS_ANDROID, attribute)
+            elif ns == NO_ENTRY:
+                key = attribute
+            else:
+                key = "{%s}%s" % (strings[ns], attribute)
+            if value_type == TYPE_STRING:
+                element.attrib[key] = strings[raw]
+            else:
+                element.attrib[key] = (value_type, value)
+        return element
+
+    def _add(self, element, stack):
+        if element.tag in ("action", "category"):
+            for parent in reversed(stack):
+                if parent is not None and parent.tag in ("activity", "activity-alias"):
+                    if element.tag == "action":
+                        parent.actions.append(element.get_android("name"))
+                    else:
+                        parent.categories.append(element.get_android("name"))
+                    break
+        self.elements[element.tag].append(element)
+
+
+class ResourcePackage:
+    def __init__(self, data, offset):
+        _, header_size, size = read_chunk_header(data, offset)
+        self.id = struct.unpack_from("<I", data, offset + 8)[0]
+        name = bytes(data[offset + 12 : offset + 12 + 256]).decode("utf-16-le")
+        self.name = name.split("\x00", 1)[0]
+        type_strings, _, key_strings, _ = struct.unpack_from(
+            "<IIII", data, offset + 268
+        )
+        self.type_id_offset = 0
+        if header_size >= 288:
+            (self.type_id_offset,) = struct.unpack_from("<I", data, offset + 284)
+        self.data = data
+        self.offset = offset
+        self.type_strings_offset = offset + type_strings
+        self.key_strings_offset = offset + key_strings
+        self._type_strings = None
+        self._key_strings = None
+        # Only the chunk headers are walked here, type chunks are kept as
+        # offsets grouped by type id and read when an id is looked up.
+        self.types = {}
+        position = offset + header_size
+        end = offset + size
+        while position < end:
+            chunk_type, _, chunk_size = read_chunk_header(data, position)
+            if chunk_type == RES_TABLE_TYPE_TYPE:
+                self.types.setdefault(data[position + 8], []).append(position)
+            position += chunk_size
+
+    @property
+    def type_strings(self):
+        if self._type_strings is None:
+            self._type_strings = StringPool(self.data, self.type_strings_offset)
+        return self._type_strings
+
+    @property
+    def key_strings(self):
+        if self._key_strings is None:
+            self._key_strings = StringPool(self.data, self.key_strings_offset)
+        return self._key_strings
+
+    def entries(self, type_id):
+        """
+        Yield ``(config, index, position)`` for every entry of a type.
+        """
+        for chunk in self.types.get(type_id, ()):
+            for index, position in self._chunk_entries(chunk):
+                yield self._config(chunk), index, position
+
+    def entry(self, type_id, index):
+        """
+        Yield ``(config, position)`` for one entry in every config.
+        """
+        for chunk in self.types.get(type_id, ()):
+            position = self._chunk_entry(chunk, index)
+            if position is not None:
+                yield self._config(chunk), position
+
+    def _config(self, chunk):
+        data = self.data
+        start = chunk + 20
+        (size,) = struct.unpack_from("<I", data, start)
+        key = bytes(data[start + 4 : start + min(size, 4 + CONFIG_KEY_SIZE)])
+        return key.ljust(CONFIG_KEY_SIZE, b"\x00")
+
+    def _chunk_layout(self, chunk):
+        _, header_size, _ = read_chunk_header(self.data, chunk)
+        flags, _, count, entries_start = struct.unpack_from(
+            "<BHII", self.data, chunk + 9
+        )
+        return flags, header_size, count, chunk + entries_start
+
+    def _chunk_entry(self, chunk, index):
+        data = self.data
+        flags, header_size, count, entries = self._chunk_layout(chunk)
+        offsets = chunk + header_size
+        if flags & TYPE_FLAG_SPARSE:
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                entry_index, entry_offset = struct.unpack_from(
+                    "<HH", data, offsets + middle * 4
+                )
+                if entry_index == index:
+                    return entries + entry_offset * 4
+                if entry_index < index:
+                    low = middle + 1
+                else:
+                    high = middle
+            return None
+        if index >= count:
+            return None
+        if flags & TYPE_FLAG_OFFSET16:
+            (entry_offset,) = struct.unpack_from("<H", data, offsets + index * 2)
+            if entry_offset == 0xFFFF:
+                return None
+            return entries + entry_offset * 4
+        (entry_offset,) = struct.unpack_from("<I", data, offsets + index * 4)
+        if entry_offset == NO_ENTRY:
+            return None
+        return entries + entry_offset
+
+    def _chunk_entries(self, chunk):
+        flags, _, count, _ = self._chunk_layout(chunk)
+        if flags & TYPE_FLAG_SPARSE:
+            _, header_size, _ = read_chunk_header(self.data, chunk)
+            indexes = [
+                struct.unpack_from("<H", self.data, chunk + header_size + i * 4)[0]
+                for i in range(count)
+            ]
+        else:
+            indexes = range(count)
+        for index in indexes:
+            position = self._chunk_entry(chunk, index)
+            if position is not None:
+                yield index, position
+
+    def read_entry(self, position):
+        """
+        Return ``(key, value_type, data)`` of the entry at ``position``.
+        """
+        size, flags, key = struct.unpack_from("<HHI", self.data, position)
+        if flags & ENTRY_FLAG_COMPACT:
+            return size, flags >> 8, key
+        if flags & ENTRY_FLAG_COMPLEX:
+            raise AXMLError("complex resource entries are not supported")
+        _, _, value_type, value = struct.unpack_from(
+            "<HBBI", self.data, position + size
+        )
+        return key, value_type, value
+
+
+class ResourceTable:
+    """
+    A resources.arsc table that only resolves the ids it is asked for.
+    """
+
+    def __init__(self, data):
+        chunk_type, header_size, size = read_chunk_header(data, 0)
+        if chunk_type != RES_TABLE_TYPE:
+            raise AXMLError("not a resource table")
+        self.strings = None
+        self.packages = {}
+        offset = header_size
+        while offset < size:
+            chunk_type, _, chunk_size = read_chunk_header(data, offset)
+            if chunk_type == RES_STRING_POOL_TYPE and self.strings is None:
+                self.strings = StringPool(data, offset)
+            elif chunk_type == RES_TABLE_PACKAGE_TYPE:
+                package = ResourcePackage(data, offset)
+                self.packages[package.id] = package
+            offset += chunk_size
+        if self.strings is None:
+            raise AXMLError("resource table without a string pool")
+
+    def get_res_configs(self, res_id):
+        """
+        Return ``{config: (value_type, data)}`` for a resource id, keeping
+        the first-seen order of the configs.
+        """
+        package = self.packages.get(res_id >> 24)
+        if package is None:
+            return {}
+        configs = {}
+        for config, position in package.entry((res_id >> 16) & 0xFF, res_id & 0xFFFF):
+            _, value_type, value = package.read_entry(position)
+            configs[config] = (value_type, value)
+        return configs
+
+    def get_resolved_res_configs(self, res_id, config=None, depth=0):
+        """
+        Return a list of ``(config, value)`` with references followed. When
+        ``config`` is given a single match is picked, falling back to the
+        first entry for the default config.
+        """
+        if depth > MAX_REFERENCE_DEPTH:
+            raise AXMLError("reference loop at 0x{:08x}".format(res_id))
+        options = list(self.get_res_configs(res_id).items())
+        if config is not None and len(options) > 1:
+            matches = [option for option in options if option[0] == config]
+            if matches:
+                options = matches
+            elif config == DEFAULT_CONFIG:
+                options = options[:1]
+            else:
+                options = []
+        result = []
+        for option_config, (value_type, value) in options:
+            if value_type == TYPE_REFERENCE:
+                if value and value != res_id:
+                    result.extend(
+                        self.get_resolved_res_configs(value, config, depth + 1)
+                    )
+            else:
+                result.append(
+                    (option_config, format_value(value_type, value, self.strings))
+                )
+        return result
+
+    def get_res_id_by_key(self, package_name, type_name, key):
+        for package in self.packages.values():
+            if package.name != package_name:
+                continue
+            type_index = package.type_strings.index(type_name)
+            key_index = package.key_strings.index(key)
+            if type_index is None or key_index is None:
+                return None
+            type_id = type_index + 1 + package.type_id_offset
+            for _, index, position in package.entries(type_id):
+                if package.read_entry(position)[0] == key_index:
+                    return (package.id << 24) | (type_id << 16) | index
+        return None
+
+
+def get_density(config):
+    return struct.unpack_from("<H", config, 10)[0]
+
+
+class ApkMetadata:
+    """
+    Package name, versions, SDK levels, label and icon path of an APK, read
+    from its binary manifest and resource table.
+
+    The accessors are named after androguard's ``APK`` so either object can
+    back ApkParser.
+    """
+
+    def __init__(self, manifest, resources=None):
+        try:
+            self.manifest = AndroidManifest(manifest)
+            self.resources = ResourceTable(resources) if resources else None
+            self.package = self._value("manifest", "package") or ""
+            self.version_code = self._value("manifest", "versionCode")
+            self.version_name = self._value("manifest", "versionName")
+            self.min_sdk_version = self._value("uses-sdk", "minSdkVersion")
+            self.target_sdk_version = self._value("uses-sdk", "targetSdkVersion")
+            self.app_name = self._app_name()
+            self.app_icon = self._app_icon()
+        except (struct.error, IndexError, UnicodeDecodeError) as e:
+            raise AXMLError(str(e))
+
+    def get_package(self):
+        return self.package
+
+    def get_androidversion_code(self):
+        return self.version_code
+
+    def get_androidversion_name(self):
+        return self.version_name
+
+    def get_min_sdk_version(self):
+        return self.min_sdk_version
+
+    def get_target_sdk_version(self):
+        return self.target_sdk_version
+
+    def get_app_name(self):
+        return self.app_name
+
+    def get_app_icon(self):
+        return self.app_icon
+
+    def _value(self, tag, attribute, **attribute_filter):
+        for element in self.manifest.elements[tag]:
+            if any(
+                element.get_android(name) != value
+                for name, value in attribute_filter.items()
+            ):
+                continue
+            value = element.get(attribute)
+            if value is not None:
+                return value
+        return None
+
+    def _format_name(self, value):
+        if value.startswith(".") or "." not in value:
+            return self.package + "." + value
+        return value
+
+    def _main_activities(self):
+        # activity and activity-alias elements in document order, like the
+        # set androguard builds but with a stable pick when there are several.
+        elements = sorted(
+            self.manifest.elements["activity"]
+            + self.manifest.elements["activity-alias"],
+            key=lambda element: element.order,
+        )
+        names = []
+        for element in elements:
+            if element.get_android("enabled") == "false":
+                continue
+            name = element.get_android("name")
+            if (
+                name is not None
+                and "android.intent.action.MAIN" in element.actions
+                and "android.intent.category.LAUNCHER" in element.categories
+                and name not in names
+            ):
+                names.append(name)
+        return names
+
+    def _app_name(self):
+        app_name = self._value("application", "label")
+        if app_name is None:
+            activities = self._main_activities()
+            app_name = self._value(
+                "activity", "label", name=activities[0] if activities else None
+            )
+        if app_name is None:
+            return ""
+        if not app_name.startswith("@") or self.resources is None:
+            return app_name
+        if app_name.startswith("@android:"):
+            return app_name
+        try:
+            res_id = int(app_name[1:], 16)
+        except ValueError:
+            return app_name
+        values = self.resources.get_resolved_res_configs(res_id, DEFAULT_CONFIG)
+        if values:
+            return values[0][1]
+        return app_name
+
+    def _app_icon(self, max_dpi=65536):
+        activities = self._main_activities()
+        main_activity = self._format_name(activities[0]) if activities else None
+        app_icon = self._value("activity", "icon", name=main_activity)
+        if not app_icon:
+            app_icon = self._value("application", "icon")
+        if self.resources is None:
+            return None
+        for type_name in ("mipmap", "drawable"):
+            if app_icon:
+                break
+            res_id = self.resources.get_res_id_by_key(
+                self.package, type_name, "ic_launcher"
+            )
+            if res_id:
+                app_icon = "@%x" % res_id
+        if not app_icon:
+            return None
+        if app_icon.startswith("@"):
+            try:
+                res_id = int(app_icon[1:], 16)
+            except ValueError:
+                raise AXMLError("unresolvable icon {}".format(app_icon))
+            app_icon = None
+            current_dpi = -1
+            for config, file_name in self.resources.get_resolved_res_configs(res_id):
+                dpi = get_density(config)
+                if current_dpi < dpi <= max_dpi:
+                    app_icon = file_name
+                    current_dpi = dpi
+        return app_icon
@@ -6,6 +6,9 @@ class AppParser:
     def __init__(self, fp):
         pass
 
+    def close(self):
+        pass
+
     @property
     def os(self):
         pass
@@ -10,6 +10,7 @@ from zlib import compress, crc32, decompress
 from application.models import Application
 
 from .base import AppParser
+from .mapped_file import MappedFile
 
 
 def getNormalizedPNG(data):
@@ -19,10 +20,9 @@ def getNormalizedPNG(data):
     if oldPNG[:8] != pngheader:
         return None
 
-    newPNG = oldPNG[:8]
-    chunkPos = len(newPNG)
-    idatAcc = b""
-    breakLoop = False
+    newPNG = [oldPNG[:8]]
+    chunkPos = 8
+    idatAcc = []
 
     # For each chunk in the PNG file
     while chunkPos < len(oldPNG):
@@ -45,7 +45,7 @@ def getNormalizedPNG(data):
         # Parsing the image chunk
         if chunkType == b"IDAT":
             # Store the chunk data for later decompression
-            idatAcc += chunkData
+            idatAcc.append(chunkData)
             skip = True
 
         # Removing CgBI chunk
@@ -57,45 +57,40 @@ def getNormalizedPNG(data):
             try:
                 # Uncompressing the image chunk
                 bufSize = width * height * 4 + height
-                chunkData = decompress(idatAcc, -15, bufSize)
+                chunkData = bytearray(decompress(b"".join(idatAcc), -15, bufSize))
             except:    # noqa: E722
                 # The PNG image is normalized
                 return None
+            if len(chunkData) != bufSize:
+                return None
 
-            chunkType = b"IDAT"
-
-            # Swapping red & blue bytes for each pixel
-            newdata = bytearray(b"")
-
-            for y in range(height):
-                i = len(newdata)
-                newdata.append(chunkData[i])
-                for x in range(width):
-                    i = len(newdata)
-                    newdata.append(chunkData[i + 2])
-                    newdata.append(chunkData[i + 1])
-                    newdata.append(chunkData[i + 0])
-                    newdata.append(chunkData[i + 3])
-
-            # Compressing the image chunk
-            chunkData = bytes(newdata)
-            chunkData = compress(chunkData)
-            chunkLength = len(chunkData)
-            chunkCRC = crc32(chunkType)
-            chunkCRC = crc32(chunkData, chunkCRC)
-            chunkCRC = (chunkCRC + 0x100000000) % 0x100000000
-            breakLoop = True
+            # Swapping red & blue bytes for each pixel, one scanline at a
+            # time. Every row starts with its filter type byte; the filters
+            # work on bytes of the same channel, so the swap does not need
+            # the rows to be unfiltered first.
+            stride = width * 4 + 1
+            for rowPos in range(1, bufSize, stride):
+                rowEnd = rowPos + stride - 1
+                red = chunkData[rowPos + 2:rowEnd:4]
+                chunkData[rowPos + 2:rowEnd:4] = chunkData[rowPos:rowEnd:4]
+                chunkData[rowPos:rowEnd:4] = red
+
+            # Compressing the image chunk, the IEND chunk follows it
+            chunks = ((b"IDAT", compress(chunkData)), (b"IEND", b""))
+            for chunkType, chunkData in chunks:
+                newPNG.append(pack(">L", len(chunkData)))
+                newPNG.append(chunkType)
+                newPNG.append(chunkData)
+                newPNG.append(pack(">L", crc32(chunkData, crc32(chunkType))))
+            break
 
         if not skip:
-            newPNG += pack(">L", chunkLength)
-            newPNG += chunkType
-            if chunkLength > 0:
-                newPNG += chunkData
-            newPNG += pack(">L", chunkCRC)
-        if breakLoop:
-            break
+            newPNG.append(pack(">L", chunkLength))
+            newPNG.append(chunkType)
+            newPNG.append(chunkData)
+            newPNG.append(pack(">L", chunkCRC))
 
-    return newPNG
+    return b"".join(newPNG)
 
 
 class IpaParser(AppParser):
@@ -104,10 +99,16 @@ class IpaParser(AppParser):
         return ext == "ipa" and (os == Application.OperatingSystem.iOS or os is None)
 
     def __init__(self, file):
+        self.file = file
         self.zip = zipfile.ZipFile(file)
         self.__plist = None
         self.__icon = None
 
+    def close(self):
+        self.zip.close()
+        if isinstance(self.file, MappedFile):
+            self.file.close()
+
     @property
     def os(self):
         return Application.OperatingSystem.iOS
@@ -153,7 +154,7 @@ class IpaParser(AppParser):
                 name = path.split("/")[-1]
                 if name.startswith(icons[0]) and name.endswith(".png"):
                     self.__icon = self.zip.read(path)
-                    data = getNormalizedPNG(self.zip.read(path))
+                    data = getNormalizedPNG(self.__icon)
                     if data:
                         self.__icon = data
                     return self.__icon
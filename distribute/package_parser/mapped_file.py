@@ -0,0 +1,78 @@
+import errno
+import io
+import mmap
+import os
+
+
+class MappedFile(io.RawIOBase):
+    """
+    A read-only, seekable view over an on-disk file backed by mmap.
+
+    Reads are served from the page cache, so only the byte ranges that are
+    actually requested (e.g. a zip's central directory and a few entries)
+    are ever copied into Python objects.
+    """
+
+    def __init__(self, fileno):
+        self._size = os.fstat(fileno).st_size
+        self._mmap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError("invalid whence ({}, should be 0, 1 or 2)".format(whence))
+        if pos < 0:
+            # Same as seeking a real file, zipfile relies on it for short files.
+            raise OSError(errno.EINVAL, "negative seek position {}".format(pos))
+        self._pos = pos
+        return self._pos
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            end = self._size
+        else:
+            end = min(self._pos + size, self._size)
+        if self._pos >= end:
+            return b""
+        data = self._mmap[self._pos:end]
+        self._pos = end
+        return data
+
+    def readinto(self, b):
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._mmap.close()
+        super().close()
+
+
+def open_mapped(file):
+    """
+    Return a memory-mapped view of ``file`` if it is backed by a real file
+    descriptor (a spooled upload or a file on disk), otherwise ``file`` itself.
+    """
+    try:
+        fileno = file.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return file
+    if os.fstat(fileno).st_size == 0:
+        return file
+    return MappedFile(fileno)
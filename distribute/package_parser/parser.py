@@ -1,10 +1,28 @@
+import struct
+import zipfile
+import zlib
+
+from androguard.core.bytecodes.axml import ResParserError
+
 from .apk_parser import ApkParser
 from .ipa_parser import IpaParser
+from .mapped_file import open_mapped
+
+# What reading a file that is not a valid package raises. ValueError covers
+# the AXML reader's AXMLError and plistlib's InvalidFileException.
+PARSE_ERRORS = (
+    zipfile.BadZipFile,
+    KeyError,
+    ValueError,
+    struct.error,
+    zlib.error,
+    ResParserError,
+)
 
 
 def parse(fd, ext, os=None):
     parser_list = [IpaParser, ApkParser]
     for p in parser_list:
         if p.can_parse(ext, os):
-            return p(fd)
+            return p(open_mapped(fd))
     return None
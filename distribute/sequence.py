@@ -0,0 +1,54 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+
+from distribute.models import AppSequence, Package, Release, Upgrade
+
+
+def _max_package_id(universal_app):
+    return Package.objects.filter(app__universal_app=universal_app).aggregate(
+        Max("package_id")
+    )["package_id__max"]
+
+
+def _max_release_id(universal_app):
+    return Release.objects.filter(app__universal_app=universal_app).aggregate(
+        Max("release_id")
+    )["release_id__max"]
+
+
+def _max_upgrade_id(universal_app):
+    return Upgrade.objects.filter(release__app__universal_app=universal_app).aggregate(
+        Max("upgrade_id")
+    )["upgrade_id__max"]
+
+
+# Where a sequence starts for apps that already have rows from before the
+# counter existed. Only read once, when the counter row is created.
+SEQUENCE_SEEDS = {
+    "package": _max_package_id,
+    "release": _max_release_id,
+    "upgrade": _max_upgrade_id,
+}
+
+
+def next_id(universal_app, name):
+    """
+    Allocate the next ``name`` id of ``universal_app``.
+
+    The counter row is incremented before it is read, so the row lock taken
+    by the UPDATE serializes concurrent uploads until the transaction ends.
+    """
+    sequences = AppSequence.objects.filter(app=universal_app, name=name)
+    with transaction.atomic():
+        if not sequences.update(value=F("value") + 1):
+            value = (SEQUENCE_SEEDS[name](universal_app) or 0) + 1
+            try:
+                with transaction.atomic():
+                    AppSequence.objects.create(
+                        app=universal_app, name=name, value=value
+                    )
+                return value
+            except IntegrityError:
+                # Another upload created the counter first.
+                sequences.update(value=F("value") + 1)
+        return sequences.values_list("value", flat=True).get()
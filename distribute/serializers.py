@@ -1,20 +1,22 @@
+from django.conf import settings
 from django.core.signing import TimestampSigner
-from django.db.models import Max
+from django.db import transaction
 from django.urls import reverse
 from rest_framework import serializers
 
 from application.models import Application
-from distribute.models import Package, Release, StoreApp, StoreAppVersionRecord
+from distribute.events import emit
+from distribute.latest import move_latest_package
+from distribute.models import (FileUploadRecord, Package, Release, StoreApp,
+                               StoreAppVersionRecord, WebhookEvent)
+from distribute.sequence import next_id
 from distribute.stores.base import StoreType
 from distribute.stores.store import get_store
+from distribute.version import version_key
 from util.choice import ChoiceField
 from util.url import build_absolute_uri
 
 
-def compare_short_version(short_version1, short_version2):
-    return True
-
-
 class PackageSerializer(serializers.ModelSerializer):
     os = serializers.SerializerMethodField()
     install_url = serializers.SerializerMethodField()
@@ -89,6 +91,7 @@ class PackageSerializer(serializers.ModelSerializer):
             "symbol_file",
             "icon_file",
             "fingerprint",
+            "sha256",
             "version",
             "short_version",
             "package_id",
@@ -112,6 +115,7 @@ class PackageSerializer(serializers.ModelSerializer):
             "symbol_file",
             "icon_file",
             "fingerprint",
+            "sha256",
             "version",
             "short_version",
             "package_id",
@@ -130,6 +134,35 @@ class PackageUpdateSerializer(serializers.ModelSerializer):
         model = Package
         fields = ["description", "commit_id", "channel", "build_type"]
 
+    def update(self, instance, validated_data):
+        channel, build_type = instance.channel, instance.build_type
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            move_latest_package(instance, channel, build_type)
+        return instance
+
+
+class FileUploadRecordSerializer(serializers.ModelSerializer):
+    status = serializers.SerializerMethodField()
+
+    def get_status(self, obj):
+        if obj.package_id:
+            return "completed"
+        return ChoiceField(choices=FileUploadRecord.State.choices).to_representation(
+            obj.state
+        )
+
+    class Meta:
+        model = FileUploadRecord
+        fields = [
+            "status",
+            "error",
+            "queue_time",
+            "parse_time",
+            "store_time",
+            "finish_time",
+        ]
+
 
 class UploadPackageSerializer(serializers.Serializer):
     file = serializers.FileField()
@@ -153,6 +186,22 @@ class RequestUploadPackageSerializer(serializers.Serializer):
         fields = ["filename", "description", "commit_id", "channel", "build_type"]
 
 
+class RequestChunkedUploadPackageSerializer(RequestUploadPackageSerializer):
+    size = serializers.IntegerField(min_value=1)
+
+    def validate_size(self, value):
+        if value > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                "Ensure this value is less than or equal to {}.".format(
+                    settings.CHUNKED_UPLOAD_MAX_SIZE
+                )
+            )
+        return value
+
+    class Meta:
+        fields = RequestUploadPackageSerializer.Meta.fields + ["size"]
+
+
 class UploadSymbolFileSerializer(serializers.Serializer):
     file = serializers.FileField()
 
@@ -262,7 +311,7 @@ class ReleaseCreateSerializer(serializers.Serializer):
     def get_and_check_package(self, package_id, universal_app):
         try:
             package = Package.objects.get(
-                package_id=package_id, app__universal_app=universal_app
+                package_id=package_id, universal_app=universal_app
             )
             try:
                 Release.objects.get(package=package)
@@ -273,6 +322,7 @@ class ReleaseCreateSerializer(serializers.Serializer):
                 pass
             try:
                 Release.objects.get(
+                    universal_app=universal_app,
                     package__version=package.version,
                     package__short_version=package.short_version,
                 )
@@ -285,46 +335,65 @@ class ReleaseCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError({"message": "package_id is not found."})
         return package
 
-    def get_latest_packages(self, universal_app):
-        packages = Package.objects.filter(app__universal_app=universal_app).order_by(
-            "-package_id"
-        )[:2]
-        return packages
+    def check_short_version(self, package, release=None):
+        # A release can not go back to an older version of its platform.
+        newer = Package.objects.filter(
+            universal_app=package.universal_app_id,
+            app=package.app_id,
+            short_version_key__gt=version_key(package.short_version),
+            release__isnull=False,
+        )
+        if release is not None:
+            newer = newer.exclude(release=release)
+        newer = newer.order_by("-short_version_key").first()
+        if newer is not None:
+            raise serializers.ValidationError(
+                {"message": "short version should bigger than " + newer.short_version}
+            )
 
     def create(self, validated_data):
         universal_app = validated_data["universal_app"]
         install_slug = universal_app.install_slug
         package_id = validated_data["package_id"]
         package = self.get_and_check_package(package_id, universal_app)
-        latest_packages = self.get_latest_packages(universal_app)
-        latest_package = latest_packages.first()
-        if latest_package is not None and not compare_short_version(
-            package.short_version, latest_package.short_version
-        ):
-            raise serializers.ValidationError(
-                {"message": "short version should bigger than."}
-            )
+        self.check_short_version(package)
 
         # todo: check version
         if validated_data["enabled"]:
             package.make_public(install_slug)
 
-        max_release_id = Release.objects.filter(app__universal_app=universal_app).aggregate(Max("release_id"))   # noqa: E501
-        max_release_id = max_release_id["release_id__max"]
-        if not max_release_id:
-            max_release_id = 0
-        release_id = max_release_id + 1
+        release_id = next_id(universal_app, "release")
         app = package.app
         instance = Release.objects.create(
             app=app,
+            universal_app=universal_app,
             package=package,
             release_id=release_id,
             release_notes=validated_data.get("release_notes", package.description),
             enabled=validated_data["enabled"],
         )
+        emit(WebhookEvent.Name.NewRelease, universal_app.id, release=instance.id)
+        if instance.enabled:
+            emit(
+                WebhookEvent.Name.ReleaseEnabled, universal_app.id, release=instance.id
+            )
         return instance
 
     def update(self, instance, validated_data):
+        enabled = instance.enabled
+        package_id = instance.package_id
+        instance = self.update_release(instance, validated_data)
+        if instance.enabled and (not enabled or instance.package_id != package_id):
+            # Enabled, or the enabled release now has another package.
+            name = WebhookEvent.Name.ReleaseEnabled
+        elif enabled and not instance.enabled:
+            name = WebhookEvent.Name.ReleaseDisabled
+        else:
+            return instance
+        emit(name, instance.universal_app_id, release=instance.id)
+        return instance
+
+    def update_release(self, instance, validated_data):
         universal_app = validated_data["universal_app"]
         install_slug = universal_app.install_slug
         release_notes = validated_data.get("validated_data", None)
@@ -337,23 +406,7 @@ class ReleaseCreateSerializer(serializers.Serializer):
         if package_id is not None:
             package = self.get_and_check_package(package_id, universal_app)
             if package.short_version != instance.package.short_version:
-                latest_packages = self.get_latest_packages(universal_app)
-                latest_package = latest_packages.first()
-                if latest_package and latest_package.id != instance.package.id:
-                    raise serializers.ValidationError(
-                        {
-                            "message": "package short version should equal with "
-                            + instance.package.short_version
-                        }
-                    )
-                if latest_package and latest_package.id == instance.package.id:
-                    if len(latest_packages) >= 2:
-                        if compare_short_version(
-                            package.short_version, latest_packages[1].short_version
-                        ):
-                            raise serializers.ValidationError(
-                                {"message": "short version should bigger than."}
-                            )
+                self.check_short_version(package, instance)
 
         if release_notes is not None:
             instance.release_notes = release_notes
@@ -4,6 +4,8 @@ from .base import StoreBase, StoreType
 
 
 class AppStore(StoreBase):
+    current_url = "https://apps.apple.com/{country}/app/{name}/id{app_id}"
+
     def __init__(self, auth_data):
         self.country_code_alpha2 = auth_data["country_code_alpha2"].lower()
         self.appstore_app_id = auth_data["appstore_app_id"]
@@ -26,17 +28,14 @@ class AppStore(StoreBase):
     def channel(self):
         return "appstore"
 
-    def store_current(self):
+    def store_current(self, timeout=None):
         version = ""
-        url = (
-            "https://apps.apple.com/"
-            + self.country_code_alpha2
-            + "/app/"
-            + self.app_name
-            + "/id"
-            + self.appstore_app_id
+        url = self.current_url.format(
+            country=self.country_code_alpha2,
+            name=self.app_name,
+            app_id=self.appstore_app_id,
         )
-        r = requests.get(url)
+        r = requests.get(url, timeout=self.request_timeout(timeout))
         key_word = self.key_word
         start = r.text.find(key_word)
         if start == -1:
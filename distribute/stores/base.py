@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 
 
@@ -71,6 +72,9 @@ class AppPackage:
 
 
 class StoreBase:
+    # Seconds to wait for the store's answer, STORE_TIMEOUT when None.
+    timeout = None
+
     def __init__(self, auth_data):
         pass
 
@@ -99,5 +103,14 @@ class StoreBase:
     def submit_result(self, submit_id):
         pass
 
-    def store_current(self):
-        return ""
+    def request_timeout(self, timeout=None):
+        if timeout is None:
+            timeout = self.timeout or settings.STORE_TIMEOUT
+        return timeout
+
+    def store_current(self, timeout=None):
+        """
+        The version on the store as {"version": version}. Requests to the
+        store give up after timeout seconds, the store's own when None.
+        """
+        return {"version": ""}
@@ -22,10 +22,12 @@ class HuaweiStore(StoreBase):
     def channel(self):
         return "huawei"
 
-    def store_current(self):
+    def store_current(self, timeout=None):
         headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36"  # noqa: E501
         }
-        r = requests.get(self.store_url, headers=headers)
+        r = requests.get(
+            self.store_url, headers=headers, timeout=self.request_timeout(timeout)
+        )
         version = r.json()["layoutData"][1]["dataList"][0]["versionName"]
         return {"version": version}
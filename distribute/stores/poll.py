@@ -0,0 +1,48 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+
+from .store import get_store
+
+MAX_THREADS = 16
+
+_executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="store")
+
+
+def fetch_version(store, timeout):
+    return store.store_current(timeout=timeout)["version"]
+
+
+def fetch_current_versions(store_apps, deadline=None):
+    """
+    Ask the stores of store_apps for their current version at once and
+    return {store_app.id: version} by the deadline (STORE_DEADLINE seconds
+    by default). Stores that failed, timed out or are still busy are left
+    out. Nothing here touches the database.
+    """
+    if deadline is None:
+        deadline = settings.STORE_DEADLINE
+    end = time.monotonic() + deadline
+    futures = {}
+    for store_app in store_apps:
+        try:
+            store = get_store(store_app.store)(store_app.auth_data)
+        except:  # noqa: E722
+            # Incomplete auth data.
+            continue
+        timeout = min(store.request_timeout(), deadline)
+        futures[_executor.submit(fetch_version, store, timeout)] = store_app
+    done, not_done = wait(futures, timeout=max(end - time.monotonic(), 0))
+    for future in not_done:
+        # Still queued ones are dropped, running ones end at their timeout.
+        future.cancel()
+    versions = {}
+    for future in done:
+        try:
+            version = future.result()
+        except:  # noqa: E722
+            continue
+        if version:
+            versions[futures[future].id] = version
+    return versions
@@ -9,6 +9,8 @@ from .base import StoreBase, StoreType
 
 
 class VivoStore(StoreBase):
+    current_url = "https://h5-api.appstore.vivo.com.cn/detailInfo"
+
     def __init__(self, auth_data):
         self.access_key = auth_data.get("access_key", "")
         self.access_secret = auth_data.get("access_secret", "")
@@ -82,8 +84,8 @@ class VivoStore(StoreBase):
             return {"error": {"code": "success"}}
         return {"error": {"code": "failure", "message": r.json()["msg"]}}
 
-    def store_current(self):
-        url = "https://h5-api.appstore.vivo.com.cn/detailInfo"
+    def store_current(self, timeout=None):
+        url = self.current_url
         payload = {
             "appId": self.vivo_store_app_id,
             "imei": "1234567890",
@@ -93,7 +95,7 @@ class VivoStore(StoreBase):
             "h5_websource": "h5appstore",
             "frompage": "messageh5",
         }
-        r = requests.post(url, payload)
+        r = requests.post(url, payload, timeout=self.request_timeout(timeout))
         version = r.json()["version_name"]
         return {"version": version}
 
@@ -4,6 +4,8 @@ from .base import StoreBase, StoreType
 
 
 class XiaomiStore(StoreBase):
+    current_url = "https://m.app.mi.com/detailapi/{}"
+
     def __init__(self, auth_data):
         self.xiaomi_store_app_id = auth_data.get("xiaomi_store_app_id", "")
 
@@ -22,11 +24,11 @@ class XiaomiStore(StoreBase):
     def channel(self):
         return "xiaomi"
 
-    def store_current(self):
-        url = "https://m.app.mi.com/detailapi/" + str(self.xiaomi_store_app_id)
+    def store_current(self, timeout=None):
+        url = self.current_url.format(self.xiaomi_store_app_id)
         headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36"  # noqa: E501
         }
-        r = requests.get(url, headers=headers)
+        r = requests.get(url, headers=headers, timeout=self.request_timeout(timeout))
         version = r.json()["appMap"]["versionName"]
         return {"version": version}
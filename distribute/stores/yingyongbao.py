@@ -4,6 +4,8 @@ from .base import StoreBase, StoreType
 
 
 class YingyongbaoStore(StoreBase):
+    current_url = "https://a.app.qq.com/o/simple.jsp?pkgname={}&g_f=1000047"
+
     def __init__(self, auth_data):
         self.bundle_identifier = auth_data.get("bundle_identifier", "")
 
@@ -22,17 +24,13 @@ class YingyongbaoStore(StoreBase):
     def channel(self):
         return "yingyongbao"
 
-    def store_current(self):
+    def store_current(self, timeout=None):
         version = ""
-        url = (
-            "https://a.app.qq.com/o/simple.jsp?pkgname="
-            + self.bundle_identifier
-            + "&g_f=1000047"
-        )
+        url = self.current_url.format(self.bundle_identifier)
         headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/103.0.0.0 Safari/537.36"  # noqa: E501
         }
-        r = requests.get(url, headers=headers)
+        r = requests.get(url, headers=headers, timeout=self.request_timeout(timeout))
         start = r.text.find("版本")
         if start != -1:
             sub = r.text[start + 3 : start + 20]
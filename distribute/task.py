@@ -1,17 +1,20 @@
-import json
 import os.path
-import queue
-import threading
 
-import requests
 from django.conf import settings
+from django.db import close_old_connections
 
-from application.models import Webhook
-from distribute.models import Package
+from application.models import UniversalApp
+from distribute.events import (emit, finish_events, release_events,
+                               subscribers, take_events)
+from distribute.jobs import enqueue, register
+from distribute.models import Package, Release, WebhookEvent
 from distribute.serializers import PackageSerializer
+from distribute.stores.store import get_store
+from distribute.webhook import get_dispatcher
+from util.json_template import TemplateContext
 
 
-def send_webhook(webhook, package):
+def package_values(package):
     app = package.app.universal_app
     plist_url_name = ""
     namespace = ""
@@ -29,52 +32,165 @@ def send_webhook(webhook, package):
     }
     serializer = PackageSerializer(package, context=context)
 
-    url = webhook.url
-    payload = webhook.template["body"]
     data = serializer.data
     data["short_commit_id"] = data.get("commit_id", "")[:8]
     data["download_url"] = os.path.join(settings.EXTERNAL_WEB_URL, 'd/' + app.install_slug)   # noqa: E501
-    for k in data:
-        payload = payload.replace("${" + k + "}", str(data[k]))
-    payload = json.loads(payload)
-    requests.post(url, json=payload)
+    data["summary"] = " ".join(
+        value
+        for value in [
+            data["name"],
+            data["short_version"],
+            "({})".format(data["version"]),
+            data["os"],
+            data["channel"],
+            data["build_type"],
+        ]
+        if value
+    )
+    return data
 
 
-def run_new_package_task(id):
-    package = Package.objects.get(id=id)
-    webhook_list = Webhook.objects.filter(
-        app=package.app.universal_app,
-        when_new_package=True
-    )
-    for webhook in webhook_list:
-        try:
-            send_webhook(webhook, package)
-        except:   # noqa: E722
-            import traceback
-            traceback.print_exc()
+def build_package_context(package):
+    return TemplateContext(package_values(package))
 
 
-q = queue.Queue()
+def release_values(release):
+    data = package_values(release.package)
+    data["release_id"] = release.release_id
+    data["release_notes"] = release.release_notes
+    data["enabled"] = release.enabled
+    data["summary"] = "{} release {}".format(data["summary"], release.release_id)
+    return data
 
 
-def worker():
-    while True:
+def store_version_values(app, payload):
+    store = get_store(payload["store"])
+    data = {
+        "name": app.name,
+        "path": app.path,
+        "os": payload["os"],
+        "store": store.name(),
+        "store_display_name": store.display_name(),
+        "short_version": payload["short_version"],
+        "previous_version": payload["previous_version"],
+        "download_url": os.path.join(
+            settings.EXTERNAL_WEB_URL, "d/" + app.install_slug
+        ),
+    }
+    data["summary"] = "{} {} on {}".format(
+        app.name, payload["short_version"], store.display_name()
+    )
+    return data
+
+
+def event_values(app, name, events):
+    """The template values of each event still having its object."""
+    if name == WebhookEvent.Name.StoreVersionChange:
+        return [store_version_values(app, event.payload) for event in events]
+    related = ["app__universal_app__owner", "app__universal_app__org"]
+    if name == WebhookEvent.Name.NewPackage:
+        objects = Package.objects.select_related(*related).in_bulk(
+            [event.payload["package"] for event in events]
+        )
+        build = package_values
+        key = "package"
+    else:
+        objects = Release.objects.select_related(
+            *["package__" + field for field in related]
+        ).in_bulk([event.payload["release"] for event in events])
+        build = release_values
+        key = "release"
+    return [
+        build(objects[event.payload[key]])
+        for event in events
+        if event.payload[key] in objects
+    ]
+
+
+def digest_context(name, values):
+    """
+    The latest event's values, with event_count and a summary line for
+    every event of the digest.
+    """
+    data = dict(values[-1])
+    data["event"] = name
+    data["event_count"] = len(values)
+    data["summary"] = "\n".join(value["summary"] for value in values)
+    return TemplateContext(data)
+
+
+def send_webhooks(name, webhook_list, context):
+    # Every webhook renders from the same context.
+    payloads = []
+    for webhook in webhook_list:
         try:
-            item = q.get(timeout=3)
+            payloads.append((webhook, webhook.render(context)))
+        except Exception as e:
+            payloads.append((webhook, e))
+    get_dispatcher().dispatch(name, payloads)
+
+
+@register("webhook_digest")
+def run_webhook_digest(app, event):
+    events = take_events(app, event)
+    if not events:
+        return
+    try:
+        webhook_list = list(subscribers(app, event))
+        if webhook_list:
+            universal_app = UniversalApp.objects.get(id=app)
+            values = event_values(universal_app, event, events)
+            if values:
+                send_webhooks(event, webhook_list, digest_context(event, values))
+    except:  # noqa: E722
+        # Kept for the job's retry.
+        release_events(events)
+        raise
+    finish_events(events)
+
+
+@register("new_package")
+def run_new_package_task(id):
+    # Jobs queued before new packages went through webhook_digest.
+    package = Package.objects.select_related(
+        "app__universal_app__owner", "app__universal_app__org"
+    ).get(id=id)
+    webhook_list = list(subscribers(package.universal_app_id, "new_package"))
+    if webhook_list:
+        context = package_values(package)
+        context["event"] = "new_package"
+        context["event_count"] = 1
+        send_webhooks("new_package", webhook_list, TemplateContext(context))
+
+
+@register("package_ingest")
+def run_package_ingest_task(id):
+    # Imported here, distribute.ingest queues its work through this module.
+    from distribute.ingest import ingest_record
+    from distribute.models import FileUploadRecord
+
+    close_old_connections()
+    try:
+        record = FileUploadRecord.objects.get(id=id)
+        if record.package is None and record.state == FileUploadRecord.State.Queued:
             try:
-                run_new_package_task(item)
+                ingest_record(record)
             except:    # noqa: E722
+                # The error is kept on the record.
                 pass
-            q.task_done()
-        except:    # noqa: E722
-            pass
+    finally:
+        close_old_connections()
 
 
-threading.Thread(target=worker, daemon=True).start()
-
-
-def notify_new_package(id):
+def notify_new_package(package):
     try:
-        q.put_nowait(id)
+        emit(
+            WebhookEvent.Name.NewPackage, package.universal_app_id, package=package.id
+        )
     except:    # noqa: E722
-        pass
+        import traceback
+        traceback.print_exc()
+
+
+def queue_package_ingest(id):
+    enqueue("package_ingest", id=id)
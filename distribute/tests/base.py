@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+from application.models import UniversalApp
+from client.api import Api
+from client.unit_test_client import UnitTestClient
+from distribute.tests.package_factory import build_ipa
+from util.tests import BaseTestCase
+
+
+class PackageTestCase(BaseTestCase):
+    """
+    LarryPage's chrome app (self.app_api, self.app) to upload generated
+    packages to. Each package gets the next version, "1" with short version
+    "1.0.1" first, unless told otherwise.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.larry = Api(UnitTestClient(), "LarryPage", True)
+        self.api_client = self.larry.client
+        self.namespace = self.larry.get_user_api(self.larry.client.username)
+        self.version = 0
+        self.app_api, self.app = self.create_app()
+        self.slug = self.app.install_slug
+
+    def create_app(self, path=None):
+        app = self.chrome_app()
+        if path is not None:
+            app["path"] = app["install_slug"] = path
+        r = self.namespace.create_app(app)
+        self.assert_status_201(r)
+        app_api = self.namespace.get_app_api(app["path"])
+        return app_api, UniversalApp.objects.get(path=app["path"])
+
+    def build_package(self, version=None, short_version=None, **kwargs):
+        self.version += 1
+        if version is None:
+            version = str(self.version)
+        if short_version is None:
+            short_version = "1.0.{}".format(self.version)
+        return build_ipa(
+            os.path.join(self.tmpdir.name, "sample{}.ipa".format(self.version)),
+            version=version,
+            short_version=short_version,
+            **kwargs
+        )
+
+    def upload(self, version=None, short_version=None, channel="", build_type="Debug"):
+        path = self.build_package(version, short_version)
+        with open(path, "rb") as fp:
+            data = {"file": fp, "channel": channel, "build_type": build_type}
+            r = self.api_client.upload_post(
+                self.app_api.base_path + "/packages/upload", data=data
+            )
+        self.assert_status_201(r)
+        return r.json()["package_id"]
+
+    def release(self, package_id, enabled=False):
+        r = self.app_api.create_release({"package_id": package_id, "enabled": enabled})
+        self.assert_status_201(r)
+        return r.json()["release_id"]
@@ -0,0 +1,108 @@
+"""
+Compare package parsing throughput on generated packages and icons.
+
+    python -m distribute.tests.benchmark_package_parser --strings 50000
+"""
+import argparse
+import os
+import tempfile
+import timeit
+import zipfile
+import zlib
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "apphub.settings")
+django.setup()
+
+from androguard.core.bytecodes.apk import APK  # noqa: E402
+
+from distribute.package_parser.apk_parser import ApkParser  # noqa: E402
+from distribute.package_parser.ipa_parser import getNormalizedPNG  # noqa: E402
+from distribute.tests.package_factory import build_apk, build_png  # noqa: E402
+
+
+def androguard_parse(path):
+    # What ApkParser did before it had its own manifest reader.
+    with zipfile.ZipFile(path) as apk:
+        metadata = ApkParser.__new__(ApkParser)
+        metadata.zip = apk
+        metadata.apk = APK(metadata._metadata_zip(), raw=True)
+        return metadata.display_name, metadata.app_icon
+
+
+def lightweight_parse(path):
+    with open(path, "rb") as fp:
+        pkg = ApkParser(fp)
+        try:
+            return pkg.display_name, pkg.app_icon
+        finally:
+            pkg.close()
+
+
+def legacy_swap(png, width, height):
+    # The per-pixel loop getNormalizedPNG used to run, with the same
+    # decompress and compress around it.
+    data = b"".join(
+        png[pos + 8:pos + 8 + length]
+        for pos, length in idat_chunks(png)
+    )
+    data = zlib.decompress(data, -15, width * height * 4 + height)
+    newdata = bytearray(b"")
+    for y in range(height):
+        i = len(newdata)
+        newdata.append(data[i])
+        for x in range(width):
+            i = len(newdata)
+            newdata.append(data[i + 2])
+            newdata.append(data[i + 1])
+            newdata.append(data[i + 0])
+            newdata.append(data[i + 3])
+    return zlib.compress(bytes(newdata))
+
+
+def idat_chunks(png):
+    pos = 8
+    while pos < len(png):
+        length = int.from_bytes(png[pos:pos + 4], "big")
+        if png[pos + 4:pos + 8] == b"IDAT":
+            yield pos, length
+        pos += length + 12
+
+
+def report(name, func, path, runs):
+    seconds = min(timeit.repeat(lambda: func(path), number=1, repeat=runs))
+    print("{:<16} {:>10.1f} ms".format(name, seconds * 1000))
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--strings", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--icon-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    size = args.icon_size
+    # Xcode writes icons as CgBI pngs with the image data in 8k IDAT chunks.
+    icon = build_png(size, size, cgbi=True, idat_size=8192)
+    print("{0}x{0} CgBI icon".format(size))
+    before = report("per-pixel", lambda png: legacy_swap(png, size, size), icon, 1)
+    after = report("getNormalizedPNG", getNormalizedPNG, icon, args.runs)
+    print("speedup          {:>10.1f}x".format(before / after))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = build_apk(
+            os.path.join(tmpdir, "benchmark.apk"),
+            labels={"": "Benchmark", "de": "Benchmark"},
+            strings=args.strings,
+        )
+        assert androguard_parse(path) == lightweight_parse(path)
+        print("apk with {} string resources".format(args.strings))
+        before = report("androguard", androguard_parse, path, args.runs)
+        after = report("apk_parser", lightweight_parse, path, args.runs)
+        print("speedup          {:>10.1f}x".format(before / after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Compare building new package webhook payloads per webhook with rendering
+compiled templates from one shared context.
+
+    python -m distribute.tests.benchmark_webhook_template --webhooks 50
+"""
+import argparse
+import json
+import os
+import tempfile
+import timeit
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "apphub.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.test import utils as test_utils  # noqa: E402
+
+from application.models import UniversalApp, Webhook  # noqa: E402
+from client.api import Api  # noqa: E402
+from client.unit_test_client import UnitTestClient  # noqa: E402
+from distribute.models import Package  # noqa: E402
+from distribute.serializers import PackageSerializer  # noqa: E402
+from distribute.task import build_package_context  # noqa: E402
+from distribute.tests.package_factory import build_ipa  # noqa: E402
+
+TEMPLATE = json.dumps(
+    {
+        "msgtype": "markdown",
+        "markdown": {
+            "title": "${name} ${short_version}",
+            "text": "### ${name} ${short_version} (${version})\n"
+            "- os: ${os}\n"
+            "- commit: ${short_commit_id}\n"
+            "- size: ${size}\n"
+            "- [Download](${download_url})",
+        },
+        "url": "${install_url}",
+    }
+)
+
+
+def legacy_payload(webhook, package):
+    # What the new package task did for every webhook before templates
+    # were compiled.
+    app = package.app.universal_app
+    context = {
+        "plist_url_name": "user-app-package-plist",
+        "namespace": app.owner.username,
+        "path": app.path,
+    }
+    serializer = PackageSerializer(package, context=context)
+
+    payload = webhook.template["body"]
+    data = serializer.data
+    data["short_commit_id"] = data.get("commit_id", "")[:8]
+    data["download_url"] = os.path.join(
+        settings.EXTERNAL_WEB_URL, "d/" + app.install_slug
+    )
+    for k in data:
+        payload = payload.replace("${" + k + "}", str(data[k]))
+    return json.loads(payload)
+
+
+def legacy_event(package, webhooks):
+    return [legacy_payload(webhook, package) for webhook in webhooks]
+
+
+def compiled_event(package, webhooks):
+    context = build_package_context(package)
+    return [webhook.render(context) for webhook in webhooks]
+
+
+def create_fixtures(tmpdir, count):
+    larry = Api(UnitTestClient(), "LarryPage", True)
+    namespace = larry.get_user_api(larry.client.username)
+    namespace.create_app(
+        {
+            "path": "chrome",
+            "name": "Google Chrome",
+            "install_slug": "chrome",
+            "visibility": "Public",
+            "enable_os": ["iOS"],
+            "description": "",
+        }
+    )
+    app_api = namespace.get_app_api("chrome")
+    r = app_api.upload_package(build_ipa(os.path.join(tmpdir, "benchmark.ipa")))
+    assert r.status_code == 201, r.json()
+    app = UniversalApp.objects.get(path="chrome")
+    for i in range(count):
+        Webhook.objects.create(
+            app=app,
+            name="webhook{}".format(i),
+            url="https://apphub.example.com/webhook/{}".format(i),
+            template={"body": TEMPLATE},
+        )
+    package = Package.objects.select_related(
+        "app__universal_app__owner", "app__universal_app__org"
+    ).get()
+    return package, list(Webhook.objects.filter(app=app))
+
+
+def report(name, func, runs):
+    seconds = min(timeit.repeat(func, number=1, repeat=runs))
+    print("{:<16} {:>10.2f} ms".format(name, seconds * 1000))
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--webhooks", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    test_utils.setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir, override_settings(
+            MEDIA_ROOT=tmpdir
+        ):
+            package, webhooks = create_fixtures(tmpdir, args.webhooks)
+            expected = legacy_event(package, webhooks)
+            payloads = compiled_event(package, webhooks)
+            for payload in expected + payloads:
+                # Signed with the current time.
+                payload.pop("url")
+            assert expected == payloads
+
+            print("1 event x {} webhooks".format(args.webhooks))
+            before = report(
+                "per webhook", lambda: legacy_event(package, webhooks), args.runs
+            )
+            after = report(
+                "compiled", lambda: compiled_event(package, webhooks), args.runs
+            )
+            print("speedup          {:>10.1f}x".format(before / after))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_utils.teardown_test_environment()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import hashlib
+import re
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import unquote, urlsplit
+
+_range_re = re.compile(r"^bytes=(\d+)-(\d*)$")
+
+
+class FakeObjectStore:
+    """
+    A local HTTP object store for tests. It answers HEAD, GET (with Range)
+    and PUT on path-style URLs, which is enough for oss2 with a custom
+    endpoint and for boto3 with path addressing, and counts the body bytes
+    it sends back.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.requests = []
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return "http://{}:{}".format(host, port)
+
+    def start(self):
+        store = self
+
+        class Handler(FakeObjectStoreHandler):
+            pass
+
+        Handler.store = store
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = []
+            self.bytes_sent = 0
+
+    def record(self, method, key, sent):
+        with self._lock:
+            self.requests.append((method, key))
+            self.bytes_sent += sent
+
+
+class FakeObjectStoreHandler(BaseHTTPRequestHandler):
+    store = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _key(self):
+        return unquote(urlsplit(self.path).path).lstrip("/")
+
+    def _not_found(self, body=True):
+        payload = b"<Error><Code>NoSuchKey</Code></Error>" if body else b""
+        self.send_response(404)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if body:
+            self.wfile.write(payload)
+
+    def _send_headers(self, status, data, length, content_range=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", '"{}"'.format(hashlib.md5(data).hexdigest()))
+        self.send_header("Last-Modified", formatdate(usegmt=True))
+        self.send_header("Accept-Ranges", "bytes")
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        key = self._key()
+        data = self.store.objects.get(key)
+        if data is None:
+            return self._not_found(body=False)
+        self.store.record("HEAD", key, 0)
+        self._send_headers(200, data, len(data))
+
+    def do_GET(self):
+        key = self._key()
+        data = self.store.objects.get(key)
+        if data is None:
+            return self._not_found()
+        match = _range_re.match(self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) + 1 if match.group(2) else len(data)
+            end = min(end, len(data))
+            body = data[start:end]
+            content_range = "bytes {}-{}/{}".format(start, end - 1, len(data))
+            self._send_headers(206, data, len(body), content_range)
+        else:
+            body = data
+            self._send_headers(200, data, len(body))
+        # Counted before the client can see the response, so the counters
+        # are settled as soon as a read returns.
+        self.store.record("GET", key, len(body))
+        self.wfile.write(body)
+
+    def do_PUT(self):
+        key = self._key()
+        length = int(self.headers.get("Content-Length", 0))
+        data = self.rfile.read(length)
+        self.store.objects[key] = data
+        self.store.record("PUT", key, 0)
+        self.send_response(200)
+        self.send_header("ETag", '"{}"'.format(hashlib.md5(data).hexdigest()))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class FakeOssObject:
+    def __init__(self, data):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeOssBucket:
+    """
+    Just enough of oss2.Bucket to run AliyunOssStorage against memory.
+    """
+
+    objects = {}
+    calls = []
+
+    def __init__(self, auth, endpoint, bucket_name, is_cname=False):
+        self.bucket_name = bucket_name
+
+    def put_object(self, key, data, headers=None):
+        self.calls.append(("put_object", key))
+        self.objects[key] = data.read() if hasattr(data, "read") else data
+
+    def get_object_meta(self, key):
+        data = self.objects[key]
+        etag = '"{}"'.format(hashlib.md5(data).hexdigest().upper())
+        return mock.Mock(content_length=len(data), etag=etag)
+
+    def get_object(self, key, byte_range=None):
+        self.calls.append(("get_object", key, byte_range))
+        start, end = byte_range
+        return FakeOssObject(self.objects[key][start:end + 1])
+
+    def object_exists(self, key):
+        return key in self.objects
+
+    def list_objects_v2(self, prefix=""):
+        return mock.Mock(
+            object_list=[key for key in self.objects if key.startswith(prefix)]
+        )
+
+    def copy_object(self, source_bucket_name, source_key, target_key, headers=None):
+        self.calls.append(("copy_object", source_key, target_key))
+        self.objects[target_key] = self.objects[source_key]
+
+    def init_multipart_upload(self, key, headers=None):
+        self.parts = {}
+        self.calls.append(("init_multipart_upload", key))
+        return mock.Mock(upload_id="upload")
+
+    def upload_part(self, key, upload_id, part_number, data):
+        self.calls.append(("upload_part", key, part_number))
+        self.parts[part_number] = data
+        return mock.Mock(etag=str(part_number))
+
+    def upload_part_copy(
+        self, source_bucket_name, source_key, byte_range, target_key, upload_id,
+        part_number,
+    ):
+        self.calls.append(("upload_part_copy", source_key, target_key, byte_range))
+        start, end = byte_range
+        self.parts[part_number] = self.objects[source_key][start:end + 1]
+        return mock.Mock(etag=str(part_number))
+
+    def complete_multipart_upload(self, key, upload_id, parts):
+        self.calls.append(("complete_multipart_upload", key))
+        self.objects[key] = b"".join(self.parts[p.part_number] for p in parts)
+
+    def abort_multipart_upload(self, key, upload_id):
+        self.calls.append(("abort_multipart_upload", key))
+
+    def delete_object(self, key):
+        self.objects.pop(key, None)
+
+    def sign_url(self, method, key, expires, slash_safe=False):
+        return "https://media.example.com/" + key
@@ -0,0 +1,417 @@
+import plistlib
+import struct
+import zipfile
+import zlib
+
+
+def png_chunk(chunk_type, data):
+    crc = zlib.crc32(chunk_type)
+    crc = zlib.crc32(data, crc)
+    return struct.pack(">L", len(data)) + chunk_type + data + struct.pack(">L", crc)
+
+
+def build_png(width, height, cgbi=False, filter_type=0, idat_size=None):
+    # Every pixel is (x, y, x ^ y, 255) in RGBA order. A CgBI png stores the
+    # same pixels as BGRA in a raw deflate stream, like Xcode does.
+    raw = bytearray()
+    for y in range(height):
+        raw.append(filter_type)
+        for x in range(width):
+            r, g, b, a = x & 0xFF, y & 0xFF, (x ^ y) & 0xFF, 255
+            if cgbi:
+                raw.extend((b, g, r, a))
+            else:
+                raw.extend((r, g, b, a))
+    header = struct.pack(">LLBBBBB", width, height, 8, 6, 0, 0, 0)
+    png = b"\x89PNG\r\n\x1a\n"
+    if cgbi:
+        png += png_chunk(b"CgBI", b"\x50\x00\x20\x06")
+        compressor = zlib.compressobj(wbits=-15)
+        data = compressor.compress(bytes(raw)) + compressor.flush()
+    else:
+        data = zlib.compress(bytes(raw))
+    png += png_chunk(b"IHDR", header)
+    # Encoders split the image data into several IDAT chunks.
+    idat_size = idat_size or len(data)
+    for i in range(0, len(data), idat_size):
+        png += png_chunk(b"IDAT", data[i:i + idat_size])
+    png += png_chunk(b"IEND", b"")
+    return png
+
+
+def build_ipa(
+    path,
+    bundle_identifier="com.example.sample",
+    version="1",
+    short_version="1.0.0",
+    display_name="Sample",
+    minimum_os_version="13.0",
+    icon_size=60,
+    padding=0,
+):
+    app_dir = "Payload/Sample.app/"
+    info = {
+        "CFBundleDisplayName": display_name,
+        "CFBundleName": display_name,
+        "CFBundleIdentifier": bundle_identifier,
+        "CFBundleVersion": version,
+        "CFBundleShortVersionString": short_version,
+        "MinimumOSVersion": minimum_os_version,
+        "CFBundleIcons": {
+            "CFBundlePrimaryIcon": {"CFBundleIconFiles": ["AppIcon60x60"]}
+        },
+    }
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as ipa:
+        ipa.writestr(app_dir + "Info.plist", plistlib.dumps(info))
+        ipa.writestr(
+            app_dir + "AppIcon60x60@2x.png",
+            build_png(icon_size, icon_size, cgbi=True),
+        )
+        if padding:
+            # Stored filler standing in for the executable and assets.
+            ipa.writestr(
+                app_dir + "Sample", bytes(padding), compress_type=zipfile.ZIP_STORED
+            )
+    return path
+
+
+NS_ANDROID = "http://schemas.android.com/apk/res/android"
+
+ANDROID_ATTRIBUTES = {
+    "label": 0x01010001,
+    "icon": 0x01010002,
+    "name": 0x01010003,
+    "enabled": 0x0101000E,
+    "minSdkVersion": 0x0101020C,
+    "versionCode": 0x0101021B,
+    "versionName": 0x0101021C,
+    "targetSdkVersion": 0x01010270,
+}
+
+DENSITY_QUALIFIERS = {
+    0: "",
+    120: "-ldpi",
+    160: "-mdpi",
+    240: "-hdpi",
+    320: "-xhdpi",
+    480: "-xxhdpi",
+    640: "-xxxhdpi",
+    0xFFFE: "-anydpi",
+}
+
+
+class Reference(int):
+    """
+    An attribute or resource value that points at another resource id.
+    """
+
+
+def string_pool(strings, utf8=False):
+    def length8(n):
+        return bytes([n]) if n < 0x80 else bytes([(n >> 8) | 0x80, n & 0xFF])
+
+    def length16(n):
+        if n < 0x8000:
+            return struct.pack("<H", n)
+        return struct.pack("<HH", (n >> 16) | 0x8000, n & 0xFFFF)
+
+    data = bytearray()
+    offsets = []
+    for value in strings:
+        offsets.append(len(data))
+        if utf8:
+            encoded = value.encode("utf-8")
+            data += length8(len(value)) + length8(len(encoded)) + encoded + b"\0"
+        else:
+            encoded = value.encode("utf-16-le")
+            data += length16(len(encoded) // 2) + encoded + b"\0\0"
+    data += bytes(-len(data) % 4)
+    strings_start = 28 + 4 * len(strings)
+    header = struct.pack(
+        "<HHIIIIII",
+        0x0001,
+        28,
+        strings_start + len(data),
+        len(strings),
+        0,
+        0x100 if utf8 else 0,
+        strings_start,
+        0,
+    )
+    return header + struct.pack("<{}I".format(len(strings)), *offsets) + bytes(data)
+
+
+def typed_value(value, string_index):
+    if isinstance(value, Reference):
+        return 0x01, int(value)
+    if isinstance(value, bool):
+        return 0x12, 0xFFFFFFFF if value else 0
+    if isinstance(value, int):
+        return 0x10, value
+    if isinstance(value, float):
+        return 0x04, struct.unpack("<I", struct.pack("<f", value))[0]
+    return 0x03, string_index[value]
+
+
+def build_axml(root, utf8=False):
+    """
+    Compile ``root``, a ``(tag, attributes, children)`` tree, into binary xml.
+    Attribute names prefixed with ``android:`` live in the android namespace.
+    """
+    android_names = []
+    strings = []
+
+    def collect(node):
+        tag, attributes, children = node
+        for name, value in attributes:
+            if name.startswith("android:"):
+                if name[8:] not in android_names:
+                    android_names.append(name[8:])
+            elif name not in strings:
+                strings.append(name)
+            if isinstance(value, str) and value not in strings:
+                strings.append(value)
+        if tag not in strings:
+            strings.append(tag)
+        for child in children:
+            collect(child)
+
+    collect(root)
+    # Attribute names that map to framework ids have to come first.
+    strings = android_names + [s for s in strings if s not in android_names]
+    strings += [s for s in ("android", NS_ANDROID) if s not in strings]
+    string_index = {value: i for i, value in enumerate(strings)}
+
+    def start_element(node):
+        tag, attributes, children = node
+        body = bytearray()
+        for name, value in attributes:
+            if name.startswith("android:"):
+                ns, name = strings.index(NS_ANDROID), strings.index(name[8:])
+            else:
+                ns, name = 0xFFFFFFFF, strings.index(name)
+            value_type, data = typed_value(value, string_index)
+            raw = data if value_type == 0x03 else 0xFFFFFFFF
+            body += struct.pack("<IIIHBBI", ns, name, raw, 8, 0, value_type, data)
+        chunk = struct.pack(
+            "<IIHHHHHH",
+            0xFFFFFFFF,
+            strings.index(tag),
+            20,
+            20,
+            len(attributes),
+            0,
+            0,
+            0,
+        )
+        chunk = chunk + bytes(body)
+        header = struct.pack("<HHIII", 0x0102, 16, 16 + len(chunk), 1, 0xFFFFFFFF)
+        nodes = header + chunk
+        for child in children:
+            nodes += start_element(child)
+        nodes += struct.pack(
+            "<HHIIIII", 0x0103, 16, 24, 1, 0xFFFFFFFF, 0xFFFFFFFF, strings.index(tag)
+        )
+        return nodes
+
+    namespace = struct.pack(
+        "<IIII", 1, 0xFFFFFFFF, strings.index("android"), strings.index(NS_ANDROID)
+    )
+    body = string_pool(strings, utf8)
+    resource_map = struct.pack(
+        "<{}I".format(len(android_names)),
+        *[ANDROID_ATTRIBUTES[name] for name in android_names]
+    )
+    body += struct.pack("<HHI", 0x0180, 8, 8 + len(resource_map)) + resource_map
+    body += struct.pack("<HHI", 0x0100, 16, 24) + namespace
+    body += start_element(root)
+    body += struct.pack("<HHI", 0x0101, 16, 24) + namespace
+    return struct.pack("<HHI", 0x0003, 8, 8 + len(body)) + body
+
+
+def table_config(locale="", density=0):
+    config = bytearray(64)
+    struct.pack_into("<I", config, 0, 64)
+    if locale:
+        config[8:10] = locale[:2].encode("ascii")
+        if len(locale) > 2:
+            config[10:12] = locale[-2:].encode("ascii")
+    struct.pack_into("<H", config, 14, density)
+    return bytes(config)
+
+
+def build_arsc(package, resources, utf8=False, sparse=False):
+    """
+    Compile ``resources``, ``{type: {key: {(locale, density): value}}}``, into
+    a resources.arsc for package id 0x7f. Values are strings or References.
+    Returns the table and a ``{"type/key": id}`` map.
+    """
+    ids = {}
+    values = {}
+    key_names = {}
+    for type_id, (type_name, entries) in enumerate(resources.items(), 1):
+        for index, (key, configs) in enumerate(entries.items()):
+            ids["{}/{}".format(type_name, key)] = 0x7F000000 | type_id << 16 | index
+            key_names.setdefault(key, len(key_names))
+            for value in configs.values():
+                if isinstance(value, str):
+                    values.setdefault(value, len(values))
+    type_names = list(resources)
+
+    body = bytearray()
+    body += string_pool(type_names, utf8)
+    key_strings = 288 + len(body)
+    body += string_pool(list(key_names), utf8)
+    for type_id, entries in enumerate(resources.values(), 1):
+        count = len(entries)
+        body += struct.pack(
+            "<HHIBBHI", 0x0202, 16, 16 + 4 * count, type_id, 0, 0, count
+        )
+        body += bytes(4 * count)
+        configs = []
+        for entry_configs in entries.values():
+            configs.extend(c for c in entry_configs if c not in configs)
+        for config in configs:
+            offsets = []
+            data = bytearray()
+            for index, (key, entry_configs) in enumerate(entries.items()):
+                if config not in entry_configs:
+                    if not sparse:
+                        offsets.append(0xFFFFFFFF)
+                    continue
+                value_type, value = typed_value(entry_configs[config], values)
+                if sparse:
+                    offsets.append(index | (len(data) // 4) << 16)
+                else:
+                    offsets.append(len(data))
+                data += struct.pack("<HHI", 8, 0, key_names[key])
+                data += struct.pack("<HBBI", 8, 0, value_type, value)
+            header_size = 20 + 64
+            entries_start = header_size + 4 * len(offsets)
+            body += struct.pack(
+                "<HHIBBHII",
+                0x0201,
+                header_size,
+                entries_start + len(data),
+                type_id,
+                0x01 if sparse else 0,
+                0,
+                len(offsets),
+                entries_start,
+            )
+            body += table_config(*config)
+            body += struct.pack("<{}I".format(len(offsets)), *offsets) + data
+
+    header = struct.pack("<HHII", 0x0200, 288, 288 + len(body), 0x7F)
+    header += package.encode("utf-16-le")[:254].ljust(256, b"\0")
+    header += struct.pack(
+        "<IIIII", 288, len(type_names), key_strings, len(key_names), 0
+    )
+    package_chunk = header + bytes(body)
+    table = string_pool(list(values), utf8) + package_chunk
+    return struct.pack("<HHII", 0x0002, 12, 12 + len(table), 1) + table, ids
+
+
+def build_apk(
+    path,
+    package="com.example.sample",
+    version_code=1,
+    version_name="1.0.0",
+    min_sdk_version=21,
+    target_sdk_version=30,
+    label="Sample",
+    labels=None,
+    icon_densities=(160, 320, 480),
+    activity_icon_densities=None,
+    application_icon=True,
+    main_activity=".MainActivity",
+    utf8=False,
+    sparse=False,
+    strings=0,
+    padding=0,
+):
+    """
+    Write an APK holding a compiled manifest and resource table. With
+    ``labels`` (``{locale: text}``) the label is a string resource, otherwise
+    ``label`` is inlined in the manifest. ``strings`` adds that many unused
+    string resources to make the table as large as a real app's.
+    """
+    resources = {}
+    if labels or strings:
+        resources["string"] = {}
+    if labels:
+        resources["string"]["app_name"] = {
+            (locale, 0): text for locale, text in labels.items()
+        }
+    for i in range(strings):
+        resources["string"]["string_{}".format(i)] = {
+            (locale, 0): "{} {}".format(locale, i) for locale in ("", "de", "fr", "zh")
+        }
+    icons = {}
+    if icon_densities:
+        icons["ic_launcher"] = {
+            ("", density): "res/mipmap{}-v4/ic_launcher.png".format(
+                DENSITY_QUALIFIERS[density]
+            )
+            for density in icon_densities
+        }
+    if activity_icon_densities:
+        icons["ic_launcher_round"] = {
+            ("", density): "res/mipmap{}-v4/ic_launcher_round.png".format(
+                DENSITY_QUALIFIERS[density]
+            )
+            for density in activity_icon_densities
+        }
+    if icons:
+        resources["mipmap"] = icons
+    if resources:
+        table, ids = build_arsc(package, resources, utf8, sparse)
+    else:
+        table, ids = None, {}
+
+    application = []
+    if labels:
+        application.append(("android:label", Reference(ids["string/app_name"])))
+    elif label is not None:
+        application.append(("android:label", label))
+    if icon_densities and application_icon:
+        application.append(("android:icon", Reference(ids["mipmap/ic_launcher"])))
+    activity = [("android:name", main_activity)]
+    if activity_icon_densities:
+        activity.append(("android:icon", Reference(ids["mipmap/ic_launcher_round"])))
+    intent_filter = (
+        "intent-filter",
+        [],
+        [
+            ("action", [("android:name", "android.intent.action.MAIN")], []),
+            ("category", [("android:name", "android.intent.category.LAUNCHER")], []),
+        ],
+    )
+    uses_sdk = [("android:minSdkVersion", min_sdk_version)]
+    if target_sdk_version is not None:
+        uses_sdk.append(("android:targetSdkVersion", target_sdk_version))
+    manifest = (
+        "manifest",
+        [
+            ("android:versionCode", version_code),
+            ("android:versionName", version_name),
+            ("package", package),
+        ],
+        [
+            ("uses-sdk", uses_sdk, []),
+            ("application", application, [("activity", activity, [intent_filter])]),
+        ],
+    )
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as apk:
+        apk.writestr("AndroidManifest.xml", build_axml(manifest, utf8))
+        if table is not None:
+            apk.writestr("resources.arsc", table, compress_type=zipfile.ZIP_STORED)
+        for configs in icons.values():
+            for (_, density), name in configs.items():
+                apk.writestr(name, build_png(48, 48))
+        if padding:
+            apk.writestr(
+                "classes.dex", bytes(padding), compress_type=zipfile.ZIP_STORED
+            )
+    return path
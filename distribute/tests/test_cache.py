@@ -0,0 +1,93 @@
+import threading
+import time
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from distribute.models import Package
+from distribute.tests.base import PackageTestCase
+from util.cache import get_or_compute
+from util.tests import BaseTestCase
+
+
+@override_settings(CACHE_APP_DATA=True)
+class AppCacheTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.upload()
+
+    def package_queries(self, path):
+        with CaptureQueriesContext(connection) as context:
+            r = self.larry.client.get(path)
+        self.assert_status_200(r)
+        table = Package._meta.db_table
+        count = len([q for q in context.captured_queries if table in q["sql"]])
+        return r, count
+
+    def test_package_list(self):
+        path = self.app_api.base_path + "/packages"
+        r, count = self.package_queries(path)
+        self.assertGreater(count, 0)
+        r, count = self.package_queries(path)
+        self.assertEqual(count, 0)
+        self.assert_list_length(r, 1)
+
+        self.upload()
+        r, count = self.package_queries(path)
+        self.assertGreater(count, 0)
+        self.assert_list_length(r, 2)
+        self.assertEqual(r.headers["X-Total-Count"], "2")
+
+    @override_settings(CACHE_APP_DATA=False)
+    def test_private_cache(self):
+        path = self.app_api.base_path + "/packages"
+        self.package_queries(path)
+        r, count = self.package_queries(path)
+        self.assertGreater(count, 0)
+
+    def test_latest_package(self):
+        path = "/download/" + self.slug + "/packages/latest"
+        r, count = self.package_queries(path)
+        self.assertEqual(r.json()["package_id"], 1)
+        r, count = self.package_queries(path)
+        self.assertEqual(count, 0)
+
+        r = self.app_api.update_package(1, {"description": "changed"})
+        self.assert_status_200(r)
+        r, count = self.package_queries(path)
+        self.assertEqual(r.json()["description"], "changed")
+
+        self.app_api.remove_package(1)
+        r, count = self.package_queries(path)
+        self.assertNotIn("package_id", r.json())
+
+    def test_app_detail(self):
+        r = self.larry.client.get("/download/" + self.slug)
+        self.assertEqual(r.json()["name"], self.chrome_app()["name"])
+        r = self.app_api.update_app({"name": "Chromium"})
+        self.assert_status_200(r)
+        r = self.larry.client.get("/download/" + self.slug)
+        self.assertEqual(r.json()["name"], "Chromium")
+
+
+class SingleFlightTest(BaseTestCase):
+    def test_concurrent_misses(self):
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return "value"
+
+        def worker():
+            results.append(get_or_compute("single-flight", compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["value"] * 5)
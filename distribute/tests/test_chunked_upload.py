@@ -0,0 +1,154 @@
+import hashlib
+import os
+from io import BytesIO
+from unittest import mock
+
+from django.core.files import move
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from rest_framework.exceptions import ValidationError
+
+from distribute.chunked_upload import write_chunk
+from distribute.models import FileUploadRecord, Package
+from distribute.tests.base import PackageTestCase
+
+CHUNK_SIZE = 64 * 1024
+
+
+@override_settings(CHUNKED_UPLOAD_CHUNK_SIZE=CHUNK_SIZE)
+class ChunkedUploadTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        path = self.build_package(padding=200 * 1024)
+        with open(path, "rb") as fp:
+            self.content = fp.read()
+
+    def chunk(self, index):
+        return self.content[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+    def create_session(self):
+        r = self.app_api.create_chunked_upload(
+            {"filename": "sample.ipa", "size": len(self.content), "channel": "ci"}
+        )
+        self.assert_status_201(r)
+        return r.json()
+
+    def test_resumable_upload(self):
+        session = self.create_session()
+        record_id = session["record_id"]
+        self.assertEqual(session["chunk_size"], CHUNK_SIZE)
+        self.assertEqual(session["missing"], [0, 1, 2, 3])
+
+        # Chunks can arrive in any order, a corrupted one is not kept.
+        self.assert_status_200(self.app_api.upload_chunk(record_id, 3, self.chunk(3)))
+        r = self.app_api.upload_chunk(
+            record_id, 1, self.chunk(1), sha256=hashlib.sha256(b"").hexdigest()
+        )
+        self.assert_status_400(r)
+        self.assert_status_200(self.app_api.upload_chunk(record_id, 0, self.chunk(0)))
+
+        r = self.app_api.get_chunked_upload(record_id)
+        self.assertEqual(r.json()["received"], [0, 3])
+        self.assertEqual(r.json()["missing"], [1, 2])
+
+        # Nothing is ingested until every chunk is there.
+        r = self.app_api.update_upload_package_record(record_id)
+        self.assert_status_400(r)
+
+        for index in [1, 2]:
+            r = self.app_api.upload_chunk(record_id, index, self.chunk(index))
+            self.assert_status_200(r)
+        self.assertEqual(r.json()["missing"], [])
+
+        record = FileUploadRecord.objects.get(id=record_id)
+        session_file = default_storage.path(record.data["file"])
+        with mock.patch(
+            "django.core.files.storage.filesystem.file_move_safe",
+            wraps=move.file_move_safe,
+        ) as file_move_safe:
+            r = self.app_api.update_upload_package_record(record_id)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()["status"], "completed")
+        self.assertEqual(r.json()["data"]["channel"], "ci")
+        # The assembled file is moved into place, not copied.
+        self.assertEqual(file_move_safe.call_args.args[0], session_file)
+        self.assertFalse(os.path.exists(session_file))
+
+        package = Package.objects.get(package_id=r.json()["data"]["package_id"])
+        self.assertEqual(package.fingerprint, hashlib.md5(self.content).hexdigest())
+        with default_storage.open(package.package_file.name) as fp:
+            self.assertEqual(fp.read(), self.content)
+
+        # A committed upload takes no more chunks.
+        r = self.app_api.upload_chunk(record_id, 0, self.chunk(0))
+        self.assert_status_400(r)
+
+    def test_invalid_chunk(self):
+        record_id = self.create_session()["record_id"]
+        r = self.app_api.upload_chunk(record_id, 4, b"x")
+        self.assert_status_400(r)
+        # Every chunk but the last one is exactly chunk_size long.
+        r = self.app_api.upload_chunk(record_id, 0, self.chunk(0)[:-1])
+        self.assert_status_400(r)
+        r = self.app_api.upload_chunk(record_id, 3, self.chunk(3) + b"x")
+        self.assert_status_400(r)
+        r = self.app_api.get_chunked_upload(record_id)
+        self.assertEqual(r.json()["received"], [])
+
+    def test_corrupted_chunk_keeps_received_one(self):
+        record_id = self.create_session()["record_id"]
+        self.assert_status_200(self.app_api.upload_chunk(record_id, 0, self.chunk(0)))
+        corrupted = bytes(len(self.chunk(0)))
+        r = self.app_api.upload_chunk(
+            record_id, 0, corrupted, sha256=hashlib.sha256(self.chunk(0)).hexdigest()
+        )
+        self.assert_status_400(r)
+        r = self.app_api.get_chunked_upload(record_id)
+        self.assertEqual(r.json()["received"], [0])
+
+        record = FileUploadRecord.objects.get(id=record_id)
+        session_file = default_storage.path(record.data["file"])
+        with open(session_file, "rb") as fp:
+            self.assertEqual(fp.read(CHUNK_SIZE), self.chunk(0))
+        # Chunks are received next to the session file and removed after.
+        self.assertEqual(
+            os.listdir(os.path.dirname(session_file)), [os.path.basename(session_file)]
+        )
+
+    def test_chunk_after_commit(self):
+        record_id = self.create_session()["record_id"]
+        record = FileUploadRecord.objects.get(id=record_id)
+        # The upload is committed while the chunk is being received.
+        FileUploadRecord.objects.filter(id=record_id).update(
+            state=FileUploadRecord.State.Queued
+        )
+        with self.assertRaises(ValidationError):
+            write_chunk(
+                record,
+                0,
+                BytesIO(self.chunk(0)),
+                CHUNK_SIZE,
+                hashlib.sha256(self.chunk(0)).hexdigest(),
+            )
+        record.refresh_from_db()
+        self.assertEqual(record.data["chunks"], [])
+
+    @override_settings(CHUNKED_UPLOAD_MAX_SIZE=100 * 1024)
+    def test_too_large(self):
+        r = self.app_api.create_chunked_upload(
+            {"filename": "sample.ipa", "size": len(self.content)}
+        )
+        self.assert_status_400(r)
+        self.assertEqual(FileUploadRecord.objects.count(), 0)
+
+    def test_request_upload_advertises_chunked_upload(self):
+        r = self.app_api.client.post(
+            self.app_api.base_path + "/packages/upload/request",
+            {"filename": "sample.ipa"},
+        )
+        self.assert_status_200(r)
+        self.assertTrue(
+            r.json()["chunked_upload_url"].endswith(
+                self.app_api.base_path + "/packages/upload/chunked"
+            )
+        )
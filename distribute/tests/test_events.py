@@ -0,0 +1,175 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import override_settings
+from django.utils import timezone
+
+from application.models import Webhook
+from distribute.events import take_events
+from distribute.jobs import run_pending_jobs
+from distribute.models import Job, Package, StoreApp, WebhookEvent
+from distribute.stores.base import StoreBase, StoreType
+from distribute.tests.base import PackageTestCase
+from distribute.views.stores import update_store_app_current_version
+
+TEMPLATE = (
+    '{"event": "${event}", "count": ${event_count}, '
+    '"version": "${short_version}", "summary": "${summary}"}'
+)
+
+
+class FakeStore(StoreBase):
+    version = ""
+
+    def store_current(self, timeout=None):
+        return {"version": self.version}
+
+
+class WebhookEventTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sent = []
+        dispatcher = mock.Mock()
+        dispatcher.dispatch.side_effect = lambda name, payloads: self.sent.append(
+            (name, [payload for webhook, payload in payloads])
+        )
+        patcher = mock.patch("distribute.task.get_dispatcher", return_value=dispatcher)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_webhook(self, **flags):
+        return Webhook.objects.create(
+            app=self.app,
+            url="https://apphub.example.com/webhook/test",
+            template={"body": TEMPLATE},
+            **flags
+        )
+
+    def run_due_jobs(self):
+        Job.objects.update(run_at=timezone.now())
+        run_pending_jobs()
+
+    @override_settings(WEBHOOK_DIGEST_WINDOW=30)
+    def test_digest(self):
+        self.create_webhook()
+        for i in range(5):
+            self.upload(channel="channel{}".format(i))
+        self.assertEqual(WebhookEvent.objects.count(), 5)
+        job = Job.objects.get()
+        self.assertEqual(job.name, "webhook_digest")
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=20))
+        # Not sent before the window has passed.
+        run_pending_jobs()
+        self.assertEqual(self.sent, [])
+
+        self.run_due_jobs()
+        self.assertEqual(len(self.sent), 1)
+        name, payloads = self.sent[0]
+        self.assertEqual(name, "new_package")
+        self.assertEqual(len(payloads), 1)
+        self.assertEqual(payloads[0]["count"], 5)
+        self.assertEqual(payloads[0]["version"], "1.0.5")
+        lines = payloads[0]["summary"].split("\n")
+        self.assertEqual(len(lines), 5)
+        self.assertIn("1.0.1 (1) iOS channel0", lines[0])
+        self.assertEqual(WebhookEvent.objects.count(), 0)
+
+        # The next upload opens a new window.
+        self.upload()
+        self.assertEqual(Job.objects.count(), 1)
+
+    @override_settings(WEBHOOK_DIGEST_WINDOW=0)
+    def test_send_failed(self):
+        self.create_webhook()
+        self.upload()
+        with mock.patch("distribute.task.send_webhooks", side_effect=OSError):
+            run_pending_jobs()
+        # Kept for the retry.
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.assertIsNone(WebhookEvent.objects.get().taken_until)
+        self.assertEqual(Job.objects.get().attempts, 1)
+        self.run_due_jobs()
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(WebhookEvent.objects.count(), 0)
+        self.assertEqual(Job.objects.count(), 0)
+
+    @override_settings(WEBHOOK_DIGEST_WINDOW=0)
+    def test_emit_while_sending(self):
+        self.create_webhook()
+        self.upload()
+        Job.objects.all().delete()
+        taken = take_events(self.app.id, "new_package")
+        self.assertEqual(len(taken), 1)
+        # Not taken twice, and queues a job of its own.
+        self.assertEqual(take_events(self.app.id, "new_package"), [])
+        self.upload()
+        self.assertEqual(Job.objects.count(), 1)
+        run_pending_jobs()
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0][1][0]["count"], 1)
+        self.assertEqual(self.sent[0][1][0]["version"], "1.0.2")
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+
+    def test_not_subscribed(self):
+        self.create_webhook(when_new_package=False, when_new_release=True)
+        self.upload()
+        self.assertEqual(WebhookEvent.objects.count(), 0)
+        self.assertEqual(Job.objects.count(), 0)
+
+    @override_settings(WEBHOOK_DIGEST_WINDOW=0)
+    def test_release_events(self):
+        self.create_webhook(
+            when_new_package=False, when_new_release=True, when_new_upgrade=True
+        )
+        package_id = self.upload()
+        r = self.app_api.create_release({"package_id": package_id, "enabled": True})
+        self.assert_status_201(r)
+        release_id = r.json()["release_id"]
+        run_pending_jobs()
+        self.assertEqual(
+            sorted(name for name, payloads in self.sent),
+            ["new_release", "release_enabled"],
+        )
+
+        self.sent = []
+        r = self.app_api.update_release(release_id, {"enabled": False})
+        self.assert_status_200(r)
+        run_pending_jobs()
+        self.assertEqual(len(self.sent), 1)
+        name, payloads = self.sent[0]
+        self.assertEqual(name, "release_disabled")
+        self.assertEqual(payloads[0]["version"], "1.0.1")
+
+        # Nothing changed, nothing sent.
+        self.sent = []
+        r = self.app_api.update_release(release_id, {"enabled": False})
+        self.assert_status_200(r)
+        run_pending_jobs()
+        self.assertEqual(self.sent, [])
+
+    @override_settings(WEBHOOK_DIGEST_WINDOW=0)
+    def test_deleted_package(self):
+        self.create_webhook()
+        package_id = self.upload()
+        Package.objects.filter(package_id=package_id).delete()
+        run_pending_jobs()
+        self.assertEqual(self.sent, [])
+        self.assertEqual(WebhookEvent.objects.count(), 0)
+
+    @override_settings(WEBHOOK_DIGEST_WINDOW=0)
+    def test_store_version_change(self):
+        self.create_webhook(when_new_package=False, when_store_state_change=True)
+        store_app = StoreApp.objects.create(app=self.app.iOS, store=StoreType.AppStore)
+        with mock.patch("distribute.stores.poll.get_store", return_value=FakeStore):
+            FakeStore.version = "1.0"
+            update_store_app_current_version(store_app)
+            update_store_app_current_version(store_app)
+            self.assertEqual(WebhookEvent.objects.count(), 0)
+            FakeStore.version = "1.1"
+            update_store_app_current_version(store_app)
+        run_pending_jobs()
+        self.assertEqual(len(self.sent), 1)
+        name, payloads = self.sent[0]
+        self.assertEqual(name, "store_version_change")
+        self.assertEqual(payloads[0]["version"], "1.1")
+        self.assertEqual(payloads[0]["summary"], "Google Chrome 1.1 on AppStore")
@@ -0,0 +1,53 @@
+from django.db import connection
+from django.test import TestCase
+
+from application.models import Application, UniversalApp
+from distribute.models import Package, Release, StoreAppVersionRecord
+from distribute.stores.base import StoreType
+
+
+class IndexUsageTest(TestCase):
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            # The tables are nearly empty, make the planner show which index
+            # it would pick for a big one.
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        self.app = Application(id=1)
+        self.universal_app = UniversalApp(id=1)
+
+    def assert_uses_index(self, query, index_name, sorted=True):
+        plan = query.explain()
+        self.assertIn(index_name, plan)
+        if sorted and connection.vendor == "sqlite":
+            self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_package_list(self):
+        query = Package.objects.filter(universal_app=self.universal_app).order_by(
+            "-create_time", "-id"
+        )
+        self.assert_uses_index(query[:10], "package_universal_create_idx")
+
+    def test_release_list(self):
+        query = Release.objects.filter(universal_app=self.universal_app).order_by(
+            "-create_time", "-id"
+        )
+        self.assert_uses_index(query[:10], "release_universal_create_idx")
+
+    def test_store_version(self):
+        query = StoreAppVersionRecord.objects.filter(
+            app=self.app, store=StoreType.AppStore
+        ).order_by("-update_time")
+        self.assert_uses_index(query[:1], "store_version_update_idx")
+
+    def test_universal_app_lookup(self):
+        self.assert_uses_index(
+            UniversalApp.objects.filter(owner__username="larry", path="chrome"),
+            "universal_app_owner_path_idx",
+            sorted=False,
+        )
+        self.assert_uses_index(
+            UniversalApp.objects.filter(org__path="google", path="chrome"),
+            "universal_app_org_path_idx",
+            sorted=False,
+        )
@@ -0,0 +1,223 @@
+import hashlib
+import os
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files import move
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+
+from distribute.ingest import file_digests, spool_directory
+from distribute.models import FileUploadRecord, Package
+from distribute.task import run_package_ingest_task
+from distribute.tests.base import PackageTestCase
+from distribute.tests.fake_object_store import FakeOssBucket
+from storage.aliyun import AliyunOssMediaStorage
+
+
+class IngestTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ipa_path = self.build_package(padding=512 * 1024)
+        with open(self.ipa_path, "rb") as fp:
+            data = fp.read()
+        self.md5 = hashlib.md5(data).hexdigest()
+        self.sha256 = hashlib.sha256(data).hexdigest()
+
+    def test_upload_is_hashed_while_streaming(self):
+        # The package is neither re-read to hash it nor copied into place.
+        with mock.patch(
+            "django.db.models.fields.files.FieldFile.chunks"
+        ) as chunks, mock.patch(
+            "django.core.files.storage.filesystem.file_move_safe",
+            wraps=move.file_move_safe,
+        ) as file_move_safe:
+            r = self.app_api.upload_package(self.ipa_path)
+        self.assert_status_201(r)
+        chunks.assert_not_called()
+        spooled = file_move_safe.call_args_list[0].args[0]
+        self.assertEqual(os.path.dirname(spooled), spool_directory())
+        self.assertEqual(r.json()["fingerprint"], self.md5)
+        self.assertEqual(r.json()["sha256"], self.sha256)
+
+        package = Package.objects.get(package_id=r.json()["package_id"])
+        self.assertEqual(package.fingerprint, self.md5)
+        self.assertEqual(package.size, os.path.getsize(self.ipa_path))
+        with default_storage.open(package.package_file.name) as fp:
+            self.assertEqual(hashlib.md5(fp.read()).hexdigest(), self.md5)
+        self.assertEqual(os.listdir(spool_directory()), [])
+
+    def test_parse_errors(self):
+        path = os.path.join(self.tmpdir.name, "broken.ipa")
+        with open(path, "wb") as fp:
+            fp.write(b"not a zip file")
+        r = self.app_api.upload_package(path)
+        self.assert_status_400(r)
+
+        # Anything else is a bug, not a broken package.
+        with mock.patch(
+            "distribute.package_parser.parser.IpaParser", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                self.app_api.upload_package(self.ipa_path)
+        self.assertEqual(Package.objects.count(), 0)
+
+    def test_file_digests(self):
+        with open(self.ipa_path, "rb") as fp:
+            file = ContentFile(fp.read(), name="sample.ipa")
+        self.assertEqual(file_digests(file), (self.md5, self.sha256))
+        self.assertEqual(file.tell(), 0)
+        file.md5, file.sha256 = "a", "b"
+        self.assertEqual(file_digests(file), ("a", "b"))
+        file.sha256 = None
+        self.assertEqual(file_digests(file), ("a", None))
+
+
+class UploadRecordTest(PackageTestCase):
+    def create_record(self, content=None):
+        if content is None:
+            path = self.build_package()
+            with open(path, "rb") as fp:
+                content = fp.read()
+        name = default_storage.save(
+            "temp/upload/chrome/sample.ipa", ContentFile(content)
+        )
+        user = get_user_model().objects.get(username="LarryPage")
+        return FileUploadRecord.objects.create(
+            universal_app=self.app,
+            data={
+                "type": "package",
+                "file": name,
+                "description": "from record",
+                "uploader_type": "user",
+                "uploader_id": user.id,
+            },
+        )
+
+    def test_synchronous_ingest(self):
+        record = self.create_record()
+        r = self.app_api.get_upload_package_record(record.id)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()["status"], "waiting")
+
+        r = self.app_api.update_upload_package_record(record.id)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()["status"], "completed")
+        self.assertEqual(r.json()["data"]["description"], "from record")
+        self.assertEqual(r.json()["data"]["uploader"]["username"], "LarryPage")
+        for key in ("parse_time", "store_time", "finish_time"):
+            self.assertIsNotNone(r.json()[key])
+        self.assertFalse(default_storage.exists(record.data["file"]))
+
+    @override_settings(ASYNC_PACKAGE_INGEST=True)
+    def test_asynchronous_ingest(self):
+        record = self.create_record()
+        with mock.patch("distribute.ingest.queue_package_ingest") as queue:
+            with self.captureOnCommitCallbacks(execute=True):
+                r = self.app_api.update_upload_package_record(record.id)
+            self.assert_status_202(r)
+            self.assertEqual(r.json()["status"], "queued")
+            self.assertIsNotNone(r.json()["queue_time"])
+            queue.assert_called_once_with(record.id)
+
+            # A second PUT does not queue the record again.
+            with self.captureOnCommitCallbacks(execute=True):
+                r = self.app_api.update_upload_package_record(record.id)
+            self.assert_status_202(r)
+            queue.assert_called_once_with(record.id)
+
+        run_package_ingest_task(record.id)
+        r = self.app_api.get_upload_package_record(record.id)
+        self.assert_status_200(r)
+        self.assertEqual(r.json()["status"], "completed")
+        self.assertEqual(r.json()["data"]["package_id"], 1)
+
+    @override_settings(ASYNC_PACKAGE_INGEST=True)
+    def test_failed_ingest(self):
+        record = self.create_record(b"not a package")
+        with mock.patch("distribute.ingest.queue_package_ingest"):
+            r = self.app_api.update_upload_package_record(record.id)
+        self.assert_status_202(r)
+        run_package_ingest_task(record.id)
+
+        r = self.app_api.get_upload_package_record(record.id)
+        self.assertEqual(r.json()["status"], "failed")
+        self.assertTrue(r.json()["error"])
+        self.assertIsNotNone(r.json()["finish_time"])
+        self.assertNotIn("data", r.json())
+
+        # A failed record can be queued again.
+        with mock.patch("distribute.ingest.queue_package_ingest"):
+            r = self.app_api.update_upload_package_record(record.id)
+        self.assertEqual(r.json()["status"], "queued")
+        self.assertEqual(r.json()["error"], "")
+
+
+class ServerSideCopyTest(UploadRecordTest):
+    def setUp(self):
+        super().setUp()
+        FakeOssBucket.objects = {}
+        FakeOssBucket.calls = []
+        patcher = mock.patch("oss2.Bucket", FakeOssBucket)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # The storage is created as soon as the setting changes.
+        storage_settings = override_settings(
+            DEFAULT_FILE_STORAGE="storage.aliyun.AliyunOssMediaStorage",
+            MEDIA_URL="https://media.example.com/",
+            MEDIA_ROOT="media",
+            ALIYUN_OSS_ACCESS_KEY_ID="id",
+            ALIYUN_OSS_ACCESS_KEY_SECRET="secret",
+            ALIYUN_OSS_ENDPOINT="https://oss-cn-hangzhou.aliyuncs.com",
+            ALIYUN_OSS_BUCKET_NAME="apphub",
+            ALIYUN_OSS_PUBLIC_READ=False,
+        )
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+    def test_synchronous_ingest(self):
+        path = self.build_package(padding=4 * 1024 * 1024)
+        with open(path, "rb") as fp:
+            content = fp.read()
+        record = self.create_record(content)
+        temp_key = "media/" + record.data["file"]
+        del FakeOssBucket.calls[:]
+
+        r = self.app_api.update_upload_package_record(record.id)
+        self.assert_status_200(r)
+        package = Package.objects.get(package_id=r.json()["data"]["package_id"])
+        package_key = "media/" + package.package_file.name
+
+        # The package is copied inside the bucket, never uploaded again...
+        self.assertIn(("copy_object", temp_key, package_key), FakeOssBucket.calls)
+        self.assertNotIn(("put_object", package_key), FakeOssBucket.calls)
+        self.assertEqual(FakeOssBucket.objects[package_key], content)
+        self.assertNotIn(temp_key, FakeOssBucket.objects)
+        # ...and parsing only downloads the ranges it needs.
+        downloaded = sum(
+            call[2][1] - call[2][0] + 1
+            for call in FakeOssBucket.calls
+            if call[0] == "get_object"
+        )
+        self.assertLess(downloaded, len(content) // 4)
+        # The ETag of a single-part upload is the MD5 of the object.
+        self.assertEqual(package.fingerprint, hashlib.md5(content).hexdigest())
+        self.assertIsNone(package.sha256)
+
+    def test_multipart_copy(self):
+        storage = AliyunOssMediaStorage()
+        FakeOssBucket.objects["media/temp/a.ipa"] = bytes(range(256)) * 40
+        file = storage.fast_open("temp/a.ipa")
+        with mock.patch("storage.aliyun.COPY_OBJECT_MAX_SIZE", 4096), mock.patch(
+            "storage.aliyun.COPY_PART_SIZE", 4096
+        ):
+            storage.save("package/a.ipa", file)
+        copies = [c for c in FakeOssBucket.calls if c[0] == "upload_part_copy"]
+        self.assertEqual(
+            [c[3] for c in copies], [(0, 4095), (4096, 8191), (8192, 10239)]
+        )
+        self.assertEqual(
+            FakeOssBucket.objects["media/package/a.ipa"],
+            FakeOssBucket.objects["media/temp/a.ipa"],
+        )
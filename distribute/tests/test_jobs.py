@@ -0,0 +1,148 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from application.models import Webhook
+from distribute import jobs, webhook
+from distribute.models import Job, Package, WebhookEvent
+from distribute.tests.base import PackageTestCase
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_VISIBILITY_TIMEOUT=60)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failures = 0
+        jobs.register("test_record")(self.record)
+        jobs.register("test_fail")(self.fail)
+        self.addCleanup(jobs.handlers.pop, "test_record")
+        self.addCleanup(jobs.handlers.pop, "test_fail")
+
+    def record(self, value):
+        self.calls.append(value)
+
+    def fail(self):
+        self.failures += 1
+        raise RuntimeError("boom")
+
+    def make_due(self):
+        Job.objects.update(run_at=timezone.now())
+
+    def test_run(self):
+        jobs.enqueue("test_record", value=1)
+        jobs.enqueue("test_record", value=2)
+        self.assertEqual(jobs.run_pending_jobs(), 2)
+        self.assertEqual(self.calls, [1, 2])
+        self.assertEqual(Job.objects.count(), 0)
+
+    def test_retry_and_dead_letter(self):
+        jobs.enqueue("test_fail")
+        self.assertEqual(jobs.run_pending_jobs(), 1)
+        job = Job.objects.get()
+        self.assertEqual(job.state, Job.State.Queued)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn("boom", job.error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        # Not due yet.
+        self.assertEqual(jobs.run_pending_jobs(), 0)
+
+        self.make_due()
+        jobs.run_pending_jobs()
+        self.assertEqual(Job.objects.get().attempts, 2)
+        self.make_due()
+        jobs.run_pending_jobs()
+        job = Job.objects.get()
+        self.assertEqual(job.state, Job.State.Dead)
+        self.assertEqual(self.failures, 3)
+        self.make_due()
+        self.assertEqual(jobs.run_pending_jobs(), 0)
+
+    def test_backoff(self):
+        self.assertEqual(
+            [jobs.retry_delay(attempts) for attempts in range(1, 5)], [10, 20, 40, 80]
+        )
+        self.assertEqual(jobs.retry_delay(30), jobs.MAX_RETRY_DELAY)
+
+    def test_visibility_timeout(self):
+        jobs.enqueue("test_record", value=1)
+        job = jobs.claim_job()
+        self.assertEqual(job.state, Job.State.Running)
+        # Claimed jobs are not handed out again while their worker has time.
+        self.assertIsNone(jobs.claim_job())
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        job = jobs.claim_job()
+        self.assertEqual(job.attempts, 2)
+
+    def test_last_attempt_timeout(self):
+        jobs.enqueue("test_record", value=1)
+        Job.objects.update(attempts=2)
+        jobs.claim_job()
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(jobs.claim_job())
+        job = Job.objects.get()
+        self.assertEqual(job.state, Job.State.Dead)
+        self.assertEqual(job.attempts, 3)
+
+    def test_timed_out_worker(self):
+        jobs.enqueue("test_record", value=1)
+        jobs.enqueue("test_fail")
+        first = jobs.claim_job()
+        second = jobs.claim_job()
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        # Other workers took both jobs over, the first workers finish late.
+        jobs.claim_job()
+        jobs.claim_job()
+        jobs.run_job(first)
+        jobs.run_job(second)
+        self.assertEqual(
+            list(Job.objects.order_by("id").values_list("state", "attempts")),
+            [(Job.State.Running, 2), (Job.State.Running, 2)],
+        )
+
+    def test_work_loop(self):
+        stop = threading.Event()
+        jobs.register("test_stop")(lambda: stop.set())
+        self.addCleanup(jobs.handlers.pop, "test_stop")
+        jobs.enqueue("test_record", value=1)
+        jobs.enqueue("test_stop")
+        jobs.work(stop)
+        self.assertEqual(self.calls, [1])
+        self.assertEqual(Job.objects.count(), 0)
+
+    @override_settings(JOB_WORKER_THREADS=2)
+    def test_in_process_workers(self):
+        self.addCleanup(setattr, jobs, "_in_process_pid", jobs._in_process_pid)
+        self.addCleanup(jobs._in_process_workers.clear)
+        jobs._in_process_workers.clear()
+        with mock.patch.object(jobs, "start_workers", return_value=["a", "b"]) as start:
+            jobs.start_in_process_workers()
+            jobs.start_in_process_workers()
+            self.assertEqual(start.call_count, 1)
+            start.assert_called_with(2)
+            # Forked from the process that started them.
+            with mock.patch("os.getpid", return_value=-1):
+                jobs.start_in_process_workers()
+            self.assertEqual(start.call_count, 2)
+            self.assertEqual(jobs._in_process_workers, ["a", "b"])
+
+    def test_unknown_job(self):
+        jobs.enqueue("test_missing")
+        jobs.run_pending_jobs()
+        self.assertIn("test_missing", Job.objects.get().error)
+
+
+class NewPackageJobTest(PackageTestCase):
+    @override_settings(WEBHOOK_DIGEST_WINDOW=0)
+    def test_upload_queues_notification(self):
+        Webhook.objects.create(app=self.app, url="http://127.0.0.1:9/")
+        self.upload()
+        job = Job.objects.get(name="webhook_digest")
+        self.assertEqual(job.payload, {"app": self.app.id, "event": "new_package"})
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.payload, {"package": Package.objects.get().id})
+        with mock.patch.object(webhook, "RETRY_DELAY", 0):
+            self.assertEqual(jobs.run_pending_jobs(), 1)
+        self.assertEqual(WebhookEvent.objects.count(), 0)
@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+
+from distribute.models import LatestPackage, Package
+from distribute.tests.base import PackageTestCase
+
+
+class LatestPackageTest(PackageTestCase):
+    def latest(self, **params):
+        r = self.larry.client.get(
+            "/download/" + self.slug + "/packages/latest", params
+        )
+        self.assert_status_200(r)
+        return r.json().get("package_id", None)
+
+    def test_latest(self):
+        self.assertIsNone(self.latest())
+        self.upload()
+        self.upload(channel="beta")
+        self.upload(build_type="Release")
+        self.assertEqual(self.latest(), 3)
+        self.assertEqual(self.latest(channel=""), 3)
+        self.assertEqual(self.latest(channel="beta"), 2)
+        self.assertEqual(self.latest(build_type="Debug"), 2)
+        self.assertEqual(self.latest(channel="", build_type="Debug"), 1)
+        self.assertEqual(self.latest(tryOS="iOS", channel="beta"), 2)
+        self.assertIsNone(self.latest(channel="alpha"))
+        self.assertEqual(LatestPackage.objects.count(), 3)
+
+    def test_remove_package(self):
+        self.upload()
+        self.upload()
+        self.upload(channel="beta")
+        r = self.app_api.remove_package(2)
+        self.assert_status_204(r)
+        self.assertEqual(self.latest(channel=""), 1)
+        r = self.app_api.remove_package(1)
+        self.assert_status_204(r)
+        self.assertIsNone(self.latest(channel=""))
+        self.assertEqual(self.latest(), 3)
+
+    def test_remove_app(self):
+        self.upload()
+        r = self.app_api.remove_app()
+        self.assert_status_204(r)
+        self.assertEqual(Package.objects.count(), 0)
+        self.assertEqual(LatestPackage.objects.count(), 0)
+
+    def test_update_channel(self):
+        self.upload(channel="beta")
+        self.upload(channel="prod")
+        self.upload(channel="beta")
+        r = self.app_api.update_package(3, {"channel": "prod"})
+        self.assert_status_200(r)
+        self.assertEqual(self.latest(channel="beta"), 1)
+        self.assertEqual(self.latest(channel="prod"), 3)
+        r = self.app_api.update_package(1, {"channel": "prod"})
+        self.assert_status_200(r)
+        self.assertIsNone(self.latest(channel="beta"))
+        self.assertEqual(self.latest(channel="prod"), 3)
+        self.assertEqual(LatestPackage.objects.count(), 1)
+
+    def test_update_build_type(self):
+        self.upload()
+        r = self.app_api.update_package(1, {"build_type": "Release"})
+        self.assert_status_200(r)
+        self.assertIsNone(self.latest(build_type="Debug"))
+        self.assertEqual(self.latest(build_type="Release"), 1)
+
+    def test_refresh_moved_package(self):
+        self.upload(channel="beta")
+        Package.objects.update(channel="prod")
+        self.assertEqual(self.latest(channel="prod"), 1)
+        self.assertEqual(
+            list(LatestPackage.objects.values_list("package__package_id", "channel")),
+            [(1, "prod")],
+        )
+
+    def test_rebuild(self):
+        self.upload()
+        self.upload()
+        self.upload(channel="beta")
+        pointers = set(LatestPackage.objects.values_list("package_id", "channel"))
+        LatestPackage.objects.all().delete()
+        call_command("rebuild_latest_packages", stdout=StringIO())
+        self.assertEqual(
+            set(LatestPackage.objects.values_list("package_id", "channel")), pointers
+        )
+
+    def test_missing_pointers(self):
+        self.upload()
+        self.upload(channel="beta")
+        LatestPackage.objects.all().delete()
+        self.assertEqual(self.latest(channel="beta"), 2)
+        self.assertEqual(
+            list(LatestPackage.objects.values_list("package__package_id", "channel")),
+            [(2, "beta")],
+        )
+        self.assertEqual(self.latest(channel=""), 1)
+        self.assertEqual(LatestPackage.objects.count(), 2)
+
+    def test_filled_after_migrate(self):
+        self.upload()
+        self.upload(channel="beta")
+        pointers = set(LatestPackage.objects.values_list("package_id", "channel"))
+        LatestPackage.objects.all().delete()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db="default")
+        self.assertEqual(
+            set(LatestPackage.objects.values_list("package_id", "channel")), pointers
+        )
@@ -0,0 +1,50 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from client.api import Api
+from client.unit_test_client import UnitTestClient
+from distribute.tests.base import PackageTestCase
+
+PACKAGE_COUNT = 6
+
+
+class ListQueryCountTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        r = self.app_api.create_token({"name": "ci", "enable_upload_package": True})
+        token = r.json()["token"]
+        anonymous = Api(UnitTestClient())
+        # Packages from both kinds of uploader, users and tokens.
+        for i in range(PACKAGE_COUNT):
+            if i % 2:
+                r = anonymous.upload_package(self.build_package(), token)
+                self.assert_status_201(r)
+                package_id = r.json()["package_id"]
+            else:
+                package_id = self.upload()
+            # A version can only be released once.
+            self.release(package_id)
+
+    def count_queries(self, path, per_page):
+        with CaptureQueriesContext(connection) as context:
+            r = self.larry.client.get(path, {"page": 1, "per_page": per_page})
+        self.assert_status_200(r)
+        self.assert_list_length(r, per_page)
+        return len(context.captured_queries)
+
+    def assert_constant_queries(self, path):
+        # The smallest page already holds both kinds of uploader, each
+        # kind costs one query however many packages it uploaded.
+        baseline = self.count_queries(path, 2)
+        with self.assertNumQueries(baseline):
+            r = self.larry.client.get(path, {"page": 1, "per_page": PACKAGE_COUNT})
+        self.assert_list_length(r, PACKAGE_COUNT)
+
+    def test_package_list(self):
+        self.assert_constant_queries(self.app_api.base_path + "/packages")
+
+    def test_release_list(self):
+        self.assert_constant_queries(self.app_api.base_path + "/releases")
+
+    def test_slug_package_list(self):
+        self.assert_constant_queries("/download/" + self.slug + "/packages")
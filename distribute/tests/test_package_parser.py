@@ -0,0 +1,209 @@
+import io
+import os
+import tempfile
+import zipfile
+from unittest import mock
+
+from androguard.core.bytecodes.apk import APK
+from django.test import SimpleTestCase
+
+from application.models import Application
+from distribute.package_parser import parser
+from distribute.package_parser.apk_parser import ApkParser
+from distribute.package_parser.axml import ApkMetadata, AXMLError
+from distribute.package_parser.ipa_parser import getNormalizedPNG
+from distribute.package_parser.mapped_file import MappedFile
+from distribute.tests.package_factory import build_apk, build_ipa, build_png
+
+
+class PackageParserTest(SimpleTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.ipa_path = build_ipa(
+            os.path.join(self.tmpdir.name, "sample.ipa"),
+            bundle_identifier="com.example.chrome",
+            version="42",
+            short_version="2.1.0",
+            display_name="Chrome",
+            padding=4 * 1024 * 1024,
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_ipa(self, pkg):
+        self.assertEqual(pkg.os, Application.OperatingSystem.iOS)
+        self.assertEqual(pkg.display_name, "Chrome")
+        self.assertEqual(pkg.bundle_identifier, "com.example.chrome")
+        self.assertEqual(pkg.version, "42")
+        self.assertEqual(pkg.short_version, "2.1.0")
+        self.assertEqual(pkg.minimum_os_version, "13.0")
+        self.assertTrue(pkg.app_icon.startswith(b"\x89PNG"))
+
+    def test_parse_on_disk_file_is_mapped(self):
+        with open(self.ipa_path, "rb") as fp:
+            pkg = parser.parse(fp, "ipa")
+            self.assertIsInstance(pkg.file, MappedFile)
+            self.assert_ipa(pkg)
+            pkg.close()
+            self.assertTrue(pkg.file.closed)
+            self.assertFalse(fp.closed)
+            self.assertEqual(fp.tell(), 0)
+
+    def test_parse_in_memory_file(self):
+        with open(self.ipa_path, "rb") as fp:
+            data = io.BytesIO(fp.read())
+        pkg = parser.parse(data, "ipa")
+        self.assertIs(pkg.file, data)
+        self.assert_ipa(pkg)
+        pkg.close()
+        self.assertFalse(data.closed)
+
+    def test_parse_unknown_extension(self):
+        with open(self.ipa_path, "rb") as fp:
+            self.assertIsNone(parser.parse(fp, "zip"))
+
+    def test_app_icon_is_read_once(self):
+        with open(self.ipa_path, "rb") as fp:
+            pkg = parser.parse(fp, "ipa")
+            with mock.patch.object(pkg.zip, "read", wraps=pkg.zip.read) as read:
+                self.assertEqual(pkg.app_icon, build_png(60, 60))
+                self.assertEqual(pkg.app_icon, build_png(60, 60))
+            icon = "Payload/Sample.app/AppIcon60x60@2x.png"
+            self.assertEqual([c.args[0] for c in read.call_args_list].count(icon), 1)
+            pkg.close()
+
+    def test_normalized_png(self):
+        for filter_type in range(5):
+            with self.subTest(filter_type=filter_type):
+                cgbi = build_png(33, 17, cgbi=True, filter_type=filter_type)
+                self.assertEqual(
+                    getNormalizedPNG(cgbi), build_png(33, 17, filter_type=filter_type)
+                )
+        cgbi = build_png(64, 64, cgbi=True, idat_size=100)
+        self.assertEqual(getNormalizedPNG(cgbi), build_png(64, 64))
+        # Regular pngs are zlib streams and are left alone.
+        self.assertIsNone(getNormalizedPNG(build_png(16, 16)))
+        self.assertIsNone(getNormalizedPNG(b"GIF89a"))
+
+    def test_mapped_file(self):
+        with open(self.ipa_path, "rb") as fp:
+            expected = fp.read()
+            mapped = MappedFile(fp.fileno())
+        self.assertEqual(mapped.read(4), expected[:4])
+        self.assertEqual(mapped.seek(-10, io.SEEK_END), len(expected) - 10)
+        self.assertEqual(mapped.read(), expected[-10:])
+        self.assertEqual(mapped.read(), b"")
+        mapped.seek(100)
+        buffer = bytearray(16)
+        self.assertEqual(mapped.readinto(buffer), 16)
+        self.assertEqual(bytes(buffer), expected[100:116])
+        self.assertEqual(mapped.tell(), 116)
+        with self.assertRaises(OSError):
+            mapped.seek(-1)
+        mapped.close()
+
+
+class ApkParserTest(SimpleTestCase):
+    # Each case is a variation of the generated apk; the lightweight reader
+    # has to agree with androguard on all of them.
+    corpus = [
+        {},
+        {"utf8": True},
+        {"labels": {"": "Chrome", "zh": "谷歌浏览器"}},
+        {"labels": {"fr": "Bonjour", "de": "Hallo"}},
+        {"labels": {"": "Sparse"}, "sparse": True},
+        {
+            "activity_icon_densities": (240, 640),
+            "main_activity": "com.example.sample.MainActivity",
+        },
+        {"activity_icon_densities": (240, 640)},
+        # androguard only finds ic_launcher by key once the table has been
+        # analysed, which a label resource triggers.
+        {"application_icon": False, "labels": {"": "Sample"}},
+        {"icon_densities": None, "label": None},
+        {"version_code": 2**31 + 5, "target_sdk_version": None},
+        {"strings": 200, "labels": {"": "Large"}},
+    ]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def build(self, **kwargs):
+        return build_apk(os.path.join(self.tmpdir.name, "sample.apk"), **kwargs)
+
+    def test_parity_with_androguard(self):
+        for case in self.corpus:
+            with self.subTest(**case):
+                path = self.build(**case)
+                with open(path, "rb") as fp:
+                    pkg = ApkParser(fp)
+                    self.assertIsInstance(pkg.apk, ApkMetadata)
+                    with zipfile.ZipFile(path) as apk:
+                        expected = ApkParser.__new__(ApkParser)
+                        expected.zip = apk
+                        expected.apk = APK(expected._metadata_zip(), raw=True)
+                        for name in (
+                            "display_name",
+                            "version",
+                            "short_version",
+                            "minimum_os_version",
+                            "bundle_identifier",
+                            "app_icon",
+                            "extra",
+                        ):
+                            self.assertEqual(
+                                getattr(pkg, name), getattr(expected, name), name
+                            )
+                    pkg.close()
+
+    def test_parse(self):
+        path = self.build(
+            package="com.example.chrome",
+            version_code=42,
+            version_name="2.1.0",
+            labels={"": "Chrome", "de": "Chrom"},
+            padding=1024 * 1024,
+        )
+        with open(path, "rb") as fp:
+            pkg = parser.parse(fp, "apk")
+            self.assertIsInstance(pkg.file, MappedFile)
+            self.assertEqual(pkg.os, Application.OperatingSystem.Android)
+            self.assertEqual(pkg.display_name, "Chrome")
+            self.assertEqual(pkg.bundle_identifier, "com.example.chrome")
+            self.assertEqual(pkg.version, "42")
+            self.assertEqual(pkg.short_version, "2.1.0")
+            self.assertEqual(pkg.minimum_os_version, "5.0")
+            self.assertEqual(
+                pkg.extra, {"min_sdk_version": "21", "target_sdk_version": "30"}
+            )
+            self.assertEqual(
+                pkg.apk.get_app_icon(), "res/mipmap-xxhdpi-v4/ic_launcher.png"
+            )
+            self.assertTrue(pkg.app_icon.startswith(b"\x89PNG"))
+            pkg.close()
+
+    def test_fallback_to_androguard(self):
+        # A float version name is valid but not something the reader decodes.
+        path = self.build(version_name=1.5)
+        with open(path, "rb") as fp:
+            manifest = zipfile.ZipFile(fp).read("AndroidManifest.xml")
+            with self.assertRaises(AXMLError):
+                ApkMetadata(manifest)
+            pkg = ApkParser(fp)
+            self.assertIsInstance(pkg.apk, APK)
+            self.assertEqual(pkg.short_version, "1.500000")
+            self.assertEqual(pkg.display_name, "Sample")
+
+    def test_malformed_resources(self):
+        path = self.build(labels={"": "Chrome"})
+        with zipfile.ZipFile(path) as apk:
+            manifest = apk.read("AndroidManifest.xml")
+            resources = apk.read("resources.arsc")
+        with self.assertRaises(AXMLError):
+            ApkMetadata(manifest, resources[: len(resources) // 2])
+        with self.assertRaises(AXMLError):
+            ApkMetadata(manifest[:100], resources)
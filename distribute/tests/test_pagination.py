@@ -0,0 +1,53 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from distribute.tests.base import PackageTestCase
+
+PACKAGE_COUNT = 5
+
+
+class CursorPaginationTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(PACKAGE_COUNT):
+            self.release(self.upload())
+
+    def walk(self, path, key):
+        ids = []
+        cursor = ""
+        while cursor is not None:
+            with CaptureQueriesContext(connection) as context:
+                r = self.api_client.get(path, {"cursor": cursor, "per_page": 2})
+            self.assert_status_200(r)
+            self.assertNotIn("X-Total-Count", r.headers)
+            for query in context.captured_queries:
+                self.assertNotIn("COUNT(", query["sql"])
+                self.assertNotIn("OFFSET", query["sql"])
+            ids.extend(item[key] for item in r.json())
+            cursor = self.get_next_cursor(r)
+        return ids
+
+    def test_package_list(self):
+        ids = self.walk(self.app_api.base_path + "/packages", "package_id")
+        self.assertEqual(ids, [5, 4, 3, 2, 1])
+
+    def test_release_list(self):
+        ids = self.walk(self.app_api.base_path + "/releases", "release_id")
+        self.assertEqual(ids, [5, 4, 3, 2, 1])
+
+    def test_total_on_request(self):
+        r = self.api_client.get(
+            self.app_api.base_path + "/packages",
+            {"cursor": "", "per_page": 2, "total": "true"},
+        )
+        self.assertEqual(r.headers["X-Total-Count"], str(PACKAGE_COUNT))
+
+    def test_invalid_cursor(self):
+        r = self.api_client.get(self.app_api.base_path + "/packages", {"cursor": "abc"})
+        self.assert_status_400(r)
+
+    def test_page_mode_is_unchanged(self):
+        r = self.app_api.get_package_list(page=2, per_page=2)
+        self.assertEqual([p["package_id"] for p in r.json()], [3, 2])
+        self.assertEqual(r.headers["X-Total-Count"], str(PACKAGE_COUNT))
+        self.assertNotIn("Link", r.headers)
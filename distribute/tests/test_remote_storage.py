@@ -0,0 +1,244 @@
+import os
+import random
+import tempfile
+import zipfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from distribute.package_parser import parser
+from distribute.tests.fake_object_store import FakeObjectStore, FakeOssBucket
+from distribute.tests.package_factory import build_ipa
+from storage.aliyun import AliyunOssMediaStorage
+from storage.ranged import RangedFile
+from storage.s3 import AWSS3MediaStorage
+
+
+def random_bytes(n):
+    return random.Random(0).getrandbits(8 * n).to_bytes(n, "little")
+
+
+class RangedFileTest(SimpleTestCase):
+    def setUp(self):
+        self.data = random_bytes(10 * 1024 + 100)
+        self.ranges = []
+
+    def read_range(self, start, end):
+        self.ranges.append((start, end))
+        return self.data[start:end]
+
+    def open(self, **kwargs):
+        kwargs.setdefault("block_size", 1024)
+        return RangedFile(len(self.data), self.read_range, **kwargs)
+
+    def test_seek_and_read(self):
+        f = self.open()
+        f.seek(1000)
+        self.assertEqual(f.read(100), self.data[1000:1100])
+        f.seek(-50, os.SEEK_END)
+        self.assertEqual(f.read(), self.data[-50:])
+        self.assertEqual(f.read(10), b"")
+        self.assertEqual(f.tell(), len(self.data))
+        with self.assertRaises(OSError):
+            f.seek(-1)
+
+    def test_sequential_read_ahead(self):
+        f = self.open(cache_blocks=8, max_read_ahead=4)
+        self.assertEqual(f.read(), self.data)
+        # 1, 2, 4, 4 blocks then the tail.
+        self.assertEqual(
+            [end - start for start, end in self.ranges],
+            [1024, 2048, 4096, 3172],
+        )
+
+    def test_blocks_are_cached(self):
+        f = self.open(cache_blocks=2, max_read_ahead=1)
+        f.seek(5000)
+        f.read(10)
+        f.seek(0)
+        f.read(10)
+        f.seek(5010)
+        f.read(10)
+        self.assertEqual(self.ranges, [(4096, 5120), (0, 1024)])
+
+        # The least recently used block is dropped.
+        f.seek(9000)
+        f.read(10)
+        f.seek(5000)
+        f.read(10)
+        f.seek(0)
+        f.read(10)
+        self.assertEqual(self.ranges[2:], [(8192, 9216), (0, 1024)])
+
+
+class RemoteStorageTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.store = FakeObjectStore().start()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        # A package whose bulk is an entry the parser never opens.
+        path = build_ipa(
+            os.path.join(cls.tmpdir.name, "sample.ipa"), padding=8 * 1024 * 1024
+        )
+        with open(path, "rb") as fp:
+            cls.content = fp.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store.stop()
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.store.objects = {}
+        self.store.reset_counters()
+
+    def oss_storage(self):
+        self.store.objects["apphub/media/temp/sample.ipa"] = self.content
+        with override_settings(
+            MEDIA_URL="https://media.example.com/",
+            MEDIA_ROOT="media",
+            ALIYUN_OSS_ACCESS_KEY_ID="id",
+            ALIYUN_OSS_ACCESS_KEY_SECRET="secret",
+            ALIYUN_OSS_ENDPOINT=self.store.url,
+            ALIYUN_OSS_BUCKET_NAME="apphub",
+            ALIYUN_OSS_PUBLIC_READ=False,
+        ):
+            return AliyunOssMediaStorage()
+
+    def s3_storage(self):
+        self.store.objects["apphub/media/temp/sample.ipa"] = self.content
+        return AWSS3MediaStorage(
+            bucket_name="apphub",
+            location="media",
+            endpoint_url=self.store.url,
+            access_key="id",
+            secret_key="secret",
+            region_name="us-east-1",
+            addressing_style="path",
+        )
+
+    def assert_reads_central_directory_only(self, storage):
+        with storage.open("temp/sample.ipa") as file:
+            self.assertEqual(file.size, len(self.content))
+            pkg = parser.parse(file.file, "ipa")
+            self.assertEqual(pkg.bundle_identifier, "com.example.sample")
+            self.assertIsNotNone(pkg.app_icon)
+            pkg.close()
+        self.assertGreater(self.store.bytes_sent, 0)
+        self.assertLess(self.store.bytes_sent, 1024 * 1024)
+
+    def assert_sequential_read(self, storage):
+        with storage.open("temp/sample.ipa") as file:
+            data = b"".join(file.chunks())
+        self.assertEqual(data, self.content)
+        # Read-ahead keeps the number of requests low and nothing is
+        # fetched twice.
+        self.assertEqual(self.store.bytes_sent, len(self.content))
+        self.assertLess(len(self.store.requests), 16)
+
+    def test_oss_reads_central_directory_only(self):
+        self.assert_reads_central_directory_only(self.oss_storage())
+
+    def test_oss_sequential_read(self):
+        self.assert_sequential_read(self.oss_storage())
+
+    def test_s3_reads_central_directory_only(self):
+        self.assert_reads_central_directory_only(self.s3_storage())
+
+    def test_s3_sequential_read(self):
+        self.assert_sequential_read(self.s3_storage())
+
+    def test_zipfile_selected_entry(self):
+        storage = self.oss_storage()
+        with storage.open("temp/sample.ipa") as file:
+            with zipfile.ZipFile(file.file) as zf:
+                names = zf.namelist()
+                info = [n for n in names if n.endswith("Info.plist")][0]
+                zf.read(info)
+        self.assertLess(self.store.bytes_sent, 1024 * 1024)
+
+    @override_settings(
+        STORAGE_MULTIPART_THRESHOLD=1024 * 1024,
+        STORAGE_MULTIPART_PART_SIZE=256 * 1024,
+        STORAGE_MULTIPART_THREADS=3,
+    )
+    def test_s3_multipart_config(self):
+        storage = self.s3_storage()
+        with mock.patch.object(storage.bucket, "Object") as Object:
+            storage.save("temp/a.bin", ContentFile(b"a"))
+        config = Object.return_value.upload_fileobj.call_args.kwargs["Config"]
+        self.assertIs(config, storage.transfer_config)
+        self.assertEqual(config.multipart_threshold, 1024 * 1024)
+        self.assertEqual(config.multipart_chunksize, 256 * 1024)
+        self.assertEqual(config.max_concurrency, 3)
+
+
+@override_settings(
+    MEDIA_URL="https://media.example.com/",
+    MEDIA_ROOT="media",
+    ALIYUN_OSS_ACCESS_KEY_ID="id",
+    ALIYUN_OSS_ACCESS_KEY_SECRET="secret",
+    ALIYUN_OSS_ENDPOINT="https://oss-cn-hangzhou.aliyuncs.com",
+    ALIYUN_OSS_BUCKET_NAME="apphub",
+    ALIYUN_OSS_PUBLIC_READ=False,
+    STORAGE_MULTIPART_THRESHOLD=512 * 1024,
+    STORAGE_MULTIPART_PART_SIZE=128 * 1024,
+    STORAGE_MULTIPART_THREADS=3,
+    STORAGE_MULTIPART_RETRIES=2,
+)
+class OssMultipartUploadTest(SimpleTestCase):
+    def setUp(self):
+        FakeOssBucket.objects = {}
+        FakeOssBucket.calls = []
+        for patcher in (
+            mock.patch("oss2.Bucket", FakeOssBucket),
+            mock.patch("storage.aliyun.time.sleep"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.storage = AliyunOssMediaStorage()
+        self.data = random_bytes(600 * 1024)
+
+    def calls(self, name):
+        return [c for c in FakeOssBucket.calls if c[0] == name]
+
+    def test_small_file_is_put(self):
+        self.storage.save("a.bin", ContentFile(self.data[:1000]))
+        self.assertEqual(len(self.calls("put_object")), 1)
+        self.assertEqual(self.calls("upload_part"), [])
+
+    def test_large_file_is_uploaded_in_parts(self):
+        self.storage.save("a.bin", ContentFile(self.data))
+        self.assertEqual(self.calls("put_object"), [])
+        self.assertEqual(
+            sorted(c[2] for c in self.calls("upload_part")), [1, 2, 3, 4, 5]
+        )
+        self.assertEqual(FakeOssBucket.objects["media/a.bin"], self.data)
+
+    def test_failed_part_is_retried(self):
+        upload_part = FakeOssBucket.upload_part
+        failures = []
+
+        def flaky_upload_part(bucket, key, upload_id, part_number, data):
+            if part_number == 2 and len(failures) < 2:
+                failures.append(part_number)
+                raise ConnectionError("connection reset")
+            return upload_part(bucket, key, upload_id, part_number, data)
+
+        with mock.patch.object(FakeOssBucket, "upload_part", flaky_upload_part):
+            self.storage.save("a.bin", ContentFile(self.data))
+        self.assertEqual(failures, [2, 2])
+        self.assertEqual(FakeOssBucket.objects["media/a.bin"], self.data)
+
+    def test_upload_is_aborted(self):
+        def broken_upload_part(bucket, key, upload_id, part_number, data):
+            raise ConnectionError("connection reset")
+
+        with mock.patch.object(FakeOssBucket, "upload_part", broken_upload_part):
+            with self.assertRaises(ConnectionError):
+                self.storage.save("a.bin", ContentFile(self.data))
+        self.assertEqual(len(self.calls("abort_multipart_upload")), 1)
+        self.assertNotIn("media/a.bin", FakeOssBucket.objects)
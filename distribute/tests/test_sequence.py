@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.db import IntegrityError, transaction
+
+from distribute.models import AppSequence, Package
+from distribute.sequence import SEQUENCE_SEEDS, next_id
+from distribute.tests.base import PackageTestCase
+
+
+class AppSequenceTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ipa_path = self.build_package()
+
+    def test_ids_are_allocated_per_app(self):
+        chrome_api, chrome = self.app_api, self.app
+        firefox_api, firefox = self.create_app("firefox")
+        for expected in (1, 2, 3):
+            r = chrome_api.upload_package(self.ipa_path)
+            self.assert_status_201(r)
+            self.assertEqual(r.json()["package_id"], expected)
+        r = firefox_api.upload_package(self.ipa_path)
+        self.assertEqual(r.json()["package_id"], 1)
+
+        r = chrome_api.create_release({"package_id": 3, "enabled": True})
+        self.assertEqual(r.json()["release_id"], 1)
+        self.assertEqual(next_id(chrome, "upgrade"), 1)
+        self.assertEqual(next_id(chrome, "package"), 4)
+
+    def test_sequence_is_seeded_from_existing_ids(self):
+        chrome_api, chrome = self.app_api, self.app
+        chrome_api.upload_package(self.ipa_path)
+        chrome_api.upload_package(self.ipa_path)
+        # Apps created before the counter existed have no row yet.
+        AppSequence.objects.filter(app=chrome).delete()
+        Package.objects.filter(package_id=1).delete()
+        self.assertEqual(next_id(chrome, "package"), 3)
+        self.assertEqual(AppSequence.objects.get(app=chrome, name="package").value, 3)
+
+    def test_concurrent_counter_creation(self):
+        chrome = self.app
+
+        def seed(universal_app):
+            # Another runner creates the counter between our UPDATE and INSERT.
+            AppSequence.objects.create(app=universal_app, name="release", value=1)
+            return None
+
+        with mock.patch.dict(SEQUENCE_SEEDS, {"release": seed}):
+            self.assertEqual(next_id(chrome, "release"), 2)
+
+    def test_duplicate_package_id_is_rejected(self):
+        self.app_api.upload_package(self.ipa_path)
+        package = Package.objects.get(package_id=1)
+        package.pk = None
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            package.save()
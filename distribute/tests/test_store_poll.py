@@ -0,0 +1,152 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import override_settings
+
+from distribute.models import StoreApp, StoreAppVersionRecord
+from distribute.stores.app_store import AppStore
+from distribute.stores.base import StoreType
+from distribute.stores.poll import fetch_current_versions
+from distribute.stores.vivo import VivoStore
+from distribute.stores.xiaomi import XiaomiStore
+from distribute.stores.yingyongbao import YingyongbaoStore
+from distribute.tests.base import PackageTestCase
+
+PAGES = {
+    "/appstore": "<p>Version 1.1.0</p>",
+    "/huawei": json.dumps({"layoutData": [{}, {"dataList": [{"versionName": "2.0"}]}]}),
+    "/xiaomi": json.dumps({"appMap": {"versionName": "3.0"}}),
+    "/vivo": json.dumps({"version_name": "4.0"}),
+    "/yingyongbao": "<div>版本:5.0\n</div>",
+}
+
+
+class StoreHandler(BaseHTTPRequestHandler):
+    def respond(self):
+        if "Content-Length" in self.headers:
+            self.rfile.read(int(self.headers["Content-Length"]))
+        name = "/" + self.path.split("/")[1]
+        time.sleep(self.server.delays.get(name, 0))
+        body = self.server.pages.get(name, "").encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except ConnectionError:
+            # The client gave up waiting.
+            pass
+
+    do_GET = respond
+    do_POST = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(STORE_TIMEOUT=5, STORE_DEADLINE=5)
+class StorePollTest(PackageTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StoreHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.pages = dict(PAGES)
+        self.server.delays = {}
+        base = "http://127.0.0.1:{}".format(self.server.server_address[1])
+        for store, url in [
+            (AppStore, base + "/appstore/{country}/{name}/{app_id}"),
+            (XiaomiStore, base + "/xiaomi/{}"),
+            (VivoStore, base + "/vivo"),
+            (YingyongbaoStore, base + "/yingyongbao/{}"),
+        ]:
+            patcher = mock.patch.object(store, "current_url", url)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        stores = [
+            (self.app.iOS, StoreType.AppStore, {
+                "country_code_alpha2": "cn", "appstore_app_id": "414478124"
+            }),
+            (self.app.android, StoreType.Huawei, {"store_url": base + "/huawei"}),
+            (self.app.android, StoreType.Xiaomi, {"xiaomi_store_app_id": "1122"}),
+            (self.app.android, StoreType.Vivo, {"vivo_store_app_id": "40413"}),
+            (self.app.android, StoreType.Yingyongbao, {
+                "bundle_identifier": "com.google.chrome"
+            }),
+        ]
+        self.store_apps = [
+            StoreApp.objects.create(app=app, store=store, auth_data=auth_data)
+            for app, store, auth_data in stores
+        ]
+
+    def update_versions(self):
+        start = time.monotonic()
+        r = self.app_api.update_stores_versions()
+        self.assert_status_200(r)
+        versions = {item["store"]: item["short_version"] for item in r.json()}
+        return versions, time.monotonic() - start
+
+    def test_concurrent(self):
+        self.server.delays = {name: 0.3 for name in PAGES}
+        versions, seconds = self.update_versions()
+        self.assertEqual(
+            versions,
+            {
+                "appstore": "1.1.0",
+                "huawei": "2.0",
+                "xiaomi": "3.0",
+                "vivo": "4.0",
+                "yingyongbao": "5.0",
+            },
+        )
+        # One after another the stores take 1.5 seconds.
+        self.assertLess(seconds, 1)
+        self.assertEqual(StoreAppVersionRecord.objects.count(), 5)
+
+    @override_settings(STORE_DEADLINE=0.5)
+    def test_deadline(self):
+        self.server.delays = {"/appstore": 2, "/vivo": 2}
+        versions, seconds = self.update_versions()
+        self.assertLess(seconds, 1.5)
+        self.assertEqual(sorted(versions), ["huawei", "xiaomi", "yingyongbao"])
+        self.assertEqual(StoreAppVersionRecord.objects.count(), 3)
+
+    @override_settings(STORE_TIMEOUT=0.3)
+    def test_store_timeout(self):
+        self.server.delays = {"/xiaomi": 2}
+        versions, seconds = self.update_versions()
+        self.assertLess(seconds, 1.5)
+        self.assertNotIn("xiaomi", versions)
+        self.assertEqual(len(versions), 4)
+
+    def test_own_timeout(self):
+        self.server.delays = {"/huawei": 2}
+        start = time.monotonic()
+        with mock.patch("distribute.stores.huawei.HuaweiStore.timeout", 0.3):
+            versions = fetch_current_versions(self.store_apps)
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertNotIn(self.store_apps[1].id, versions)
+        self.assertEqual(len(versions), 4)
+
+    def test_broken_store(self):
+        self.server.pages["/huawei"] = "<html>maintenance</html>"
+        # Missing its country and app id.
+        self.store_apps[0].auth_data = {}
+        self.store_apps[0].save()
+        versions, seconds = self.update_versions()
+        self.assertEqual(sorted(versions), ["vivo", "xiaomi", "yingyongbao"])
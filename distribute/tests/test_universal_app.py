@@ -0,0 +1,42 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+
+from distribute.latest import rebuild_latest_packages
+from distribute.models import LatestPackage, Package, Release
+from distribute.tests.base import PackageTestCase
+
+
+class UniversalAppColumnTest(PackageTestCase):
+    def setUp(self):
+        super().setUp()
+        self.release(self.upload(), enabled=True)
+
+    def test_set_on_create(self):
+        package = Package.objects.get()
+        self.assertEqual(package.universal_app, self.app)
+        self.assertEqual(Release.objects.get().universal_app, self.app)
+
+    def test_backfill(self):
+        Package.objects.update(universal_app=None)
+        Release.objects.update(universal_app=None)
+        call_command("backfill_universal_app", stdout=StringIO())
+        self.assertEqual(Package.objects.get().universal_app, self.app)
+        self.assertEqual(Release.objects.get().universal_app, self.app)
+        self.assert_list_length(self.app_api.get_package_list(), 1)
+        self.assert_list_length(self.app_api.get_release_list(), 1)
+
+    def test_filled_after_migrate(self):
+        Package.objects.update(universal_app=None)
+        Release.objects.update(universal_app=None)
+        LatestPackage.objects.all().delete()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db="default")
+        self.assertEqual(Package.objects.get().universal_app, self.app)
+        self.assertEqual(Release.objects.get().universal_app, self.app)
+        self.assertEqual(LatestPackage.objects.get().universal_app, self.app)
+
+    def test_rebuild_latest_before_backfill(self):
+        Package.objects.update(universal_app=None)
+        rebuild_latest_packages()
+        self.assertEqual(LatestPackage.objects.get().universal_app, self.app)
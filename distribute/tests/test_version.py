@@ -0,0 +1,102 @@
+from django.core.management.sql import emit_post_migrate_signal
+from django.test import SimpleTestCase
+
+from distribute.models import Package
+from distribute.tests.base import PackageTestCase
+from distribute.version import compare_version, version_key
+
+
+class VersionKeyTest(SimpleTestCase):
+    def test_order(self):
+        versions = [
+            "0.9",
+            "1.0.0-alpha",
+            "1.0.0-alpha.1",
+            "1.0.0-alpha.beta",
+            "1.0.0-beta.2",
+            "1.0.0-beta.11",
+            "1.0.0-rc.1",
+            "1.0.0-rc2",
+            "1.0.0-rc10",
+            "1.0.0",
+            "1.0.1",
+            "1.9",
+            "1.10",
+            "2",
+            "10.0",
+        ]
+        keys = [version_key(version) for version in versions]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(len(set(keys)), len(keys))
+
+    def test_equal(self):
+        self.assertEqual(compare_version("1.0", "1.0.0"), 0)
+        self.assertEqual(compare_version("v1.2", "1.2.0.0"), 0)
+        self.assertEqual(compare_version("1.2.0+build.5", "1.2.0"), 0)
+
+    def test_number_in_part(self):
+        self.assertEqual(compare_version("2.0b10", "2.0b2"), 1)
+        self.assertEqual(compare_version("1.0-RC10", "1.0-rc10"), 0)
+
+    def test_build_number(self):
+        self.assertEqual(compare_version("9", "10"), -1)
+        self.assertEqual(compare_version("120", "99"), 1)
+
+    def test_not_a_version(self):
+        self.assertEqual(compare_version("nightly", "0.1"), -1)
+
+
+class VersionFilterTest(PackageTestCase):
+    def short_versions(self, path, **params):
+        r = self.api_client.get(self.app_api.base_path + path, params)
+        self.assert_status_200(r)
+        return sorted(item["short_version"] for item in r.json())
+
+    def test_package_keys(self):
+        self.upload("42", "1.2.3")
+        package = Package.objects.get()
+        self.assertEqual(package.version_key, version_key("42"))
+        self.assertEqual(package.short_version_key, version_key("1.2.3"))
+
+    def test_filled_after_migrate(self):
+        self.upload("1", "1.9")
+        self.upload("2", "1.10")
+        Package.objects.filter(short_version="1.10").update(
+            version_key="", short_version_key=""
+        )
+        emit_post_migrate_signal(verbosity=0, interactive=False, db="default")
+        package = Package.objects.get(short_version="1.10")
+        self.assertEqual(package.version_key, version_key("2"))
+        self.assertEqual(package.short_version_key, version_key("1.10"))
+        self.assertEqual(
+            self.short_versions("/packages", min_version="1.10"), ["1.10"]
+        )
+
+    def test_min_version(self):
+        for i, short_version in enumerate(["1.9", "1.10", "2.0-beta", "2.0"]):
+            package_id = self.upload(str(i + 1), short_version)
+            r = self.app_api.create_release(
+                {"package_id": package_id, "enabled": False}
+            )
+            self.assert_status_201(r)
+        for path in ["/packages", "/releases"]:
+            self.assertEqual(
+                self.short_versions(path, min_version="1.10"),
+                ["1.10", "2.0", "2.0-beta"],
+            )
+            self.assertEqual(
+                self.short_versions(path, min_version="1.10", max_version="2.0-rc"),
+                ["1.10", "2.0-beta"],
+            )
+
+    def test_release_older_version(self):
+        new = self.upload("2", "1.10")
+        old = self.upload("1", "1.9")
+        r = self.app_api.create_release({"package_id": new, "enabled": False})
+        self.assert_status_201(r)
+        release_id = r.json()["release_id"]
+        r = self.app_api.create_release({"package_id": old, "enabled": False})
+        self.assert_status_400(r)
+        # Replacing the only release's package is not going back.
+        r = self.app_api.update_release(release_id, {"package_id": old})
+        self.assert_status_200(r)
@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import override_settings
+
+from application.models import Webhook, WebhookDelivery
+from client.api import Api
+from client.unit_test_client import UnitTestClient
+from distribute import webhook as webhook_module
+from distribute.jobs import run_pending_jobs
+from distribute.serializers import PackageSerializer
+from distribute.tests.base import PackageTestCase
+from distribute.webhook import WebhookDispatcher
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.requests.append((self.path, json.loads(body)))
+            count = server.counts.get(self.path, 0) + 1
+            server.counts[self.path] = count
+        if self.path.startswith("/slow"):
+            time.sleep(server.delay)
+        status = 200
+        if self.path.startswith("/flaky") and count == 1:
+            status = 503
+        elif self.path.startswith("/broken"):
+            status = 400
+        try:
+            self.send_response(status)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+        except ConnectionError:
+            # The client gave up waiting.
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+@override_settings(WEBHOOK_DIGEST_WINDOW=0)
+class WebhookDispatchTest(PackageTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), WebhookHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.server.requests = []
+        self.server.counts = {}
+        self.server.delay = 0.3
+        patcher = mock.patch.object(webhook_module, "RETRY_DELAY", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def url(self, path):
+        return "http://127.0.0.1:{}{}".format(self.server.server_address[1], path)
+
+    def create_webhook(self, path, body='{"text": "${short_version}"}'):
+        return Webhook.objects.create(
+            app=self.app,
+            name=path,
+            url=self.url(path),
+            template={"body": body},
+        )
+
+    def dispatcher(self, timeout=(1, 5), attempts=3):
+        dispatcher = WebhookDispatcher(8, 2, timeout, attempts)
+        self.addCleanup(dispatcher.executor.shutdown)
+        return dispatcher
+
+    def test_concurrent(self):
+        webhooks = [self.create_webhook("/slow/{}".format(i)) for i in range(6)]
+        start = time.monotonic()
+        deliveries = self.dispatcher().dispatch(
+            "new_package", [(webhook, {"i": webhook.id}) for webhook in webhooks]
+        )
+        # Sent one after another this takes 1.8 seconds.
+        self.assertLess(time.monotonic() - start, 1.2)
+        self.assertEqual(len(deliveries), 6)
+        for delivery in WebhookDelivery.objects.all():
+            self.assertTrue(delivery.success)
+            self.assertEqual(delivery.status_code, 200)
+            self.assertEqual(delivery.attempts, 1)
+            self.assertGreaterEqual(delivery.latency, 300)
+
+    def test_per_webhook_concurrency(self):
+        webhook = self.create_webhook("/slow")
+        start = time.monotonic()
+        self.dispatcher().dispatch("new_package", [(webhook, {})] * 4)
+        # At most two requests of a webhook are in flight.
+        self.assertGreaterEqual(time.monotonic() - start, 0.6)
+
+    def test_read_timeout(self):
+        self.server.delay = 1
+        webhook = self.create_webhook("/slow")
+        self.dispatcher(timeout=(1, 0.2), attempts=2).dispatch(
+            "new_package", [(webhook, {})]
+        )
+        delivery = WebhookDelivery.objects.get()
+        self.assertFalse(delivery.success)
+        self.assertIsNone(delivery.status_code)
+        self.assertEqual(delivery.attempts, 2)
+        self.assertIn("timed out", delivery.error)
+
+    def test_retry_server_error(self):
+        webhook = self.create_webhook("/flaky")
+        broken = self.create_webhook("/broken")
+        self.dispatcher().dispatch("new_package", [(webhook, {}), (broken, {})])
+        delivery = WebhookDelivery.objects.get(webhook=webhook)
+        self.assertTrue(delivery.success)
+        self.assertEqual(delivery.attempts, 2)
+        # Client errors are not retried.
+        delivery = WebhookDelivery.objects.get(webhook=broken)
+        self.assertFalse(delivery.success)
+        self.assertEqual(delivery.status_code, 400)
+        self.assertEqual(delivery.attempts, 1)
+
+    def test_new_package(self):
+        webhook = self.create_webhook("/ok")
+        bad = self.create_webhook("/bad", body="{not json")
+        self.upload(short_version="1.2.3")
+        run_pending_jobs()
+        self.assertEqual(self.server.requests, [("/ok", {"text": "1.2.3"})])
+        delivery = WebhookDelivery.objects.get(webhook=webhook)
+        self.assertEqual(delivery.event, "new_package")
+        self.assertTrue(delivery.success)
+        delivery = WebhookDelivery.objects.get(webhook=bad)
+        self.assertFalse(delivery.success)
+        self.assertEqual(delivery.attempts, 0)
+        self.assertNotEqual(delivery.error, "")
+
+    def test_new_package_serialized_once(self):
+        for i in range(3):
+            self.create_webhook("/ok/{}".format(i), body='{"id": ${package_id}}')
+        self.upload()
+        with mock.patch(
+            "distribute.task.PackageSerializer", wraps=PackageSerializer
+        ) as serializer:
+            run_pending_jobs()
+        self.assertEqual(serializer.call_count, 1)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(WebhookDelivery.objects.filter(success=True).count(), 3)
+
+    def test_delivery_list(self):
+        webhook = self.create_webhook("/flaky")
+        other = self.create_webhook("/ok")
+        self.dispatcher().dispatch("new_package", [(webhook, {})])
+        self.dispatcher().dispatch("new_package", [(webhook, {}), (other, {})])
+        r = self.app_api.get_webhook_delivery_list(webhook.id)
+        self.assert_status_200(r)
+        self.assertEqual(r.headers["X-Total-Count"], "2")
+        self.assertEqual([item["attempts"] for item in r.json()], [1, 2])
+        self.assertEqual(r.json()[0]["status_code"], 200)
+
+        r = self.app_api.get_webhook_delivery_list(webhook.id + 100)
+        self.assert_status_404(r)
+
+        bill = Api(UnitTestClient(), "BillGates", True)
+        bill_app = bill.get_user_api("LarryPage").get_app_api(self.app.path)
+        r = bill_app.get_webhook_delivery_list(webhook.id)
+        self.assert_status_403(r)
@@ -0,0 +1,33 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import OuterRef, Subquery
+
+from application.models import Application
+from distribute.models import Package, Release
+
+
+def backfill_universal_app(using=DEFAULT_DB_ALIAS):
+    """
+    Fill in universal_app on packages and releases created before it
+    existed, returns {model: rows updated}.
+    """
+    universal_app = Subquery(
+        Application.objects.using(using)
+        .filter(id=OuterRef("app_id"))
+        .values("universal_app")[:1]
+    )
+    counts = {}
+    for model in [Package, Release]:
+        counts[model] = (
+            model.objects.using(using)
+            .filter(universal_app=None)
+            .update(universal_app=universal_app)
+        )
+    return counts
+
+
+def fill_universal_app(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate receiver: every view looks packages and releases up by
+    universal_app, rows upgraded without it would be missing.
+    """
+    backfill_universal_app(using)
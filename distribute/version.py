@@ -0,0 +1,98 @@
+import re
+
+from django.db import DEFAULT_DB_ALIAS
+
+VERSION_PARTS = 4
+PART_WIDTH = 10
+KEY_MAX_LENGTH = 128
+
+_version_re = re.compile(r"^v?(\d+(?:\.\d+)*)(.*)$", re.IGNORECASE)
+_separator_re = re.compile(r"[.\-_+]+")
+_run_re = re.compile(r"\d+|\D+")
+
+
+def _part_key(part):
+    # Numbers inside a part count too: "rc10" after "rc2".
+    return "".join(
+        run.zfill(PART_WIDTH) if run.isdigit() else run.lower()
+        for run in _run_re.findall(part)
+    )
+
+
+def version_key(version):
+    """
+    A string that sorts like the version it is made from, so versions can be
+    compared in the database: "1.10" after "1.9", "2.0-beta.2" after
+    "2.0-beta", "2.0-rc10" after "2.0-rc2" and all of them before "2.0". A
+    plain number like an Android versionCode sorts numerically. Only the
+    first four numeric parts count, build metadata after "+" is ignored.
+    """
+    version = version.strip().split("+", 1)[0]
+    match = _version_re.match(version)
+    if match is None:
+        core, pre = [], version
+    else:
+        core, pre = match.group(1).split("."), match.group(2)
+    core = (core + ["0"] * VERSION_PARTS)[:VERSION_PARTS]
+    key = ".".join(_part_key(part) for part in core)
+    pre = [_part_key(part) for part in _separator_re.split(pre) if part]
+    if pre:
+        # "-" sorts before "~", a pre-release before its release.
+        key += "-" + ".".join(pre)
+    else:
+        key += "~"
+    return key[:KEY_MAX_LENGTH]
+
+
+def compare_version(version1, version2):
+    """Return -1, 0 or 1 as version1 is older, equal to or newer than version2."""
+    key1 = version_key(version1)
+    key2 = version_key(version2)
+    return (key1 > key2) - (key1 < key2)
+
+
+def backfill_version_keys(using=DEFAULT_DB_ALIAS, missing_only=False, batch_size=1000):
+    """
+    Compute the sortable version keys of packages created before they
+    existed, returns how many packages were updated.
+    """
+    from distribute.models import Package
+
+    packages = Package.objects.using(using).only("id", "version", "short_version")
+    if missing_only:
+        # A computed key is never empty.
+        packages = packages.filter(short_version_key="") | packages.filter(
+            version_key=""
+        )
+    count = 0
+    batch = []
+    for package in packages.iterator(chunk_size=batch_size):
+        package.version_key = version_key(package.version)
+        package.short_version_key = version_key(package.short_version)
+        batch.append(package)
+        if len(batch) == batch_size:
+            count += Package.objects.using(using).bulk_update(
+                batch, ["version_key", "short_version_key"]
+            )
+            batch = []
+    if batch:
+        count += Package.objects.using(using).bulk_update(
+            batch, ["version_key", "short_version_key"]
+        )
+    return count
+
+
+def fill_version_keys(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver: packages upgraded without keys get them once."""
+    backfill_version_keys(using, missing_only=True)
+
+
+def filter_version_range(query, request, field="short_version_key"):
+    """Apply the min_version and max_version query parameters, both inclusive."""
+    min_version = request.GET.get("min_version", None)
+    if min_version:
+        query = query.filter(**{field + "__gte": version_key(min_version)})
+    max_version = request.GET.get("max_version", None)
+    if max_version:
+        query = query.filter(**{field + "__lte": version_key(max_version)})
+    return query
@@ -13,10 +13,21 @@ from application.permissions import (Namespace, UploadPackagePermission,
                                      check_app_download_permission,
                                      check_app_manager_permission,
                                      check_app_view_permission, get_app)
+from distribute.latest import get_latest_package
 from distribute.models import Package, Release
 from distribute.serializers import PackageSerializer, PackageUpdateSerializer
+from distribute.version import filter_version_range
+from util.cache import get_or_compute_for_app
 from util.choice import ChoiceField
-from util.pagination import get_pagination_params
+from util.pagination import paginate
+
+
+def with_package_related(query):
+    # Everything PackageSerializer reads, so a page of packages costs the
+    # same number of queries whatever its size.
+    return query.select_related("app", "operator_content_type").prefetch_related(
+        "operator_content_object"
+    )
 
 
 class UserAppPackageList(APIView):
@@ -34,22 +45,28 @@ class UserAppPackageList(APIView):
         app, role = check_app_view_permission(
             request.user, path, self.get_namespace(namespace)
         )
+        data, headers = get_or_compute_for_app(
+            app.id,
+            "packages",
+            lambda: self.list_packages(request, app, namespace, path),
+            request.get_full_path(),
+        )
+        return Response(data, headers=headers)
+
+    def list_packages(self, request, app, namespace, path):
         os = request.GET.get("os", None)
-        page, per_page = get_pagination_params(request)
 
         if os:
             query = Package.objects.filter(
-                app__universal_app=app,
+                universal_app=app,
                 app__os=ChoiceField(
                     choices=Application.OperatingSystem.choices
                 ).to_internal_value(os),
             )
         else:
-            query = Package.objects.filter(app__universal_app=app)
-        count = query.count()
-        packages = query.order_by("-create_time")[
-            (page - 1) * per_page : page * per_page
-        ]
+            query = Package.objects.filter(universal_app=app)
+        query = filter_version_range(query, request)
+        packages, headers = paginate(request, with_package_related(query))
 
         context = {
             "plist_url_name": self.plist_url_name(),
@@ -57,8 +74,7 @@ class UserAppPackageList(APIView):
             "path": path,
         }
         serializer = PackageSerializer(packages, many=True, context=context)
-        headers = {"X-Total-Count": count}
-        return Response(serializer.data, headers=headers)
+        return serializer.data, headers
 
 
 class OrganizationAppPackageList(UserAppPackageList):
@@ -80,8 +96,8 @@ class UserAppPackageDetail(APIView):
 
     def get_object(self, universal_app, package_id):
         try:
-            return Package.objects.get(
-                app__universal_app=universal_app, package_id=package_id
+            return with_package_related(Package.objects).get(
+                universal_app=universal_app, package_id=package_id
             )
         except Package.DoesNotExist:
             raise Http404
@@ -147,7 +163,7 @@ class UserAppPackagePlist(APIView):
     def get_object(self, universal_app, package_id):
         try:
             return Package.objects.get(
-                app__universal_app=universal_app, package_id=package_id
+                universal_app=universal_app, package_id=package_id
             )
         except Package.DoesNotExist:
             raise Http404
@@ -195,7 +211,15 @@ class SlugAppPackageList(APIView):
 
     def get(self, request, slug):
         app = check_app_download_permission(request.user, slug)
-        page, per_page = get_pagination_params(request)
+        data, headers = get_or_compute_for_app(
+            app.id,
+            "packages",
+            lambda: self.list_packages(request, app),
+            request.get_full_path(),
+        )
+        return Response(data, headers=headers)
+
+    def list_packages(self, request, app):
         os = request.GET.get("os", None)
 
         namespace = ""
@@ -206,25 +230,22 @@ class SlugAppPackageList(APIView):
 
         if os:
             query = Package.objects.filter(
-                app__universal_app=app,
+                universal_app=app,
                 app__os=ChoiceField(
                     choices=Application.OperatingSystem.choices
                 ).to_internal_value(os),
             )
         else:
-            query = Package.objects.filter(app__universal_app=app)
-        count = query.count()
-        packages = query.order_by("-create_time")[
-            (page - 1) * per_page : page * per_page
-        ]
+            query = Package.objects.filter(universal_app=app)
+        query = filter_version_range(query, request)
+        packages, headers = paginate(request, with_package_related(query))
         context = {
             "plist_url_name": self.plist_url_name(app),
             "namespace": namespace,
             "path": app.path,
         }
         serializer = PackageSerializer(packages, many=True, context=context)
-        headers = {"X-Total-Count": count}
-        return Response(serializer.data, headers=headers)
+        return serializer.data, headers
 
 
 class SlugAppPackageLatest(APIView):
@@ -239,36 +260,38 @@ class SlugAppPackageLatest(APIView):
     def get(self, request, slug):
         app = check_app_download_permission(request.user, slug)
         tryOS = request.GET.get("tryOS", None)
+        channel = request.GET.get("channel", None)
+        build_type = request.GET.get("build_type", None)
+        data = get_or_compute_for_app(
+            app.id,
+            "latest",
+            lambda: self.latest_package(app, tryOS, channel, build_type),
+            tryOS,
+            channel,
+            build_type,
+        )
+        return Response(data)
+
+    def latest_package(self, app, tryOS, channel, build_type):
         namespace = ""
         if app.owner:
             namespace = app.owner.username
         elif app.org:
             namespace = app.org.path
 
+        os = None
         if tryOS and tryOS in app.enable_os_enum_list():
-            package = (
-                Package.objects.filter(
-                    app__universal_app=app,
-                    app__os=ChoiceField(
-                        choices=Application.OperatingSystem.choices
-                    ).to_internal_value(tryOS),
-                )
-                .order_by("-create_time")
-                .first()
-            )
-        else:
-            package = (
-                Package.objects.filter(app__universal_app=app)
-                .order_by("-create_time")
-                .first()
-            )
+            os = ChoiceField(
+                choices=Application.OperatingSystem.choices
+            ).to_internal_value(tryOS)
+        package = get_latest_package(app, os, channel, build_type)
         context = {
             "plist_url_name": self.plist_url_name(app),
             "namespace": namespace,
             "path": app.path,
         }
         serializer = PackageSerializer(package, context=context)
-        return Response(serializer.data)
+        return serializer.data
 
 
 class SlugAppPackageDetail(APIView):
@@ -282,8 +305,8 @@ class SlugAppPackageDetail(APIView):
 
     def get_object(self, universal_app, package_id):
         try:
-            return Package.objects.get(
-                app__universal_app=universal_app, package_id=package_id
+            return with_package_related(Package.objects).get(
+                universal_app=universal_app, package_id=package_id
             )
         except Package.DoesNotExist:
             raise Http404
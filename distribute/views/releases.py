@@ -8,8 +8,10 @@ from application.permissions import (Namespace, check_app_manager_permission,
                                      check_app_view_permission)
 from distribute.models import Release
 from distribute.serializers import ReleaseCreateSerializer, ReleaseSerializer
+from distribute.version import filter_version_range
+from util.cache import get_or_compute_for_app
 from util.choice import ChoiceField
-from util.pagination import get_pagination_params
+from util.pagination import paginate
 
 
 class UserAppReleaseList(APIView):
@@ -25,30 +27,35 @@ class UserAppReleaseList(APIView):
         app, role = check_app_view_permission(
             request.user, path, self.get_namespace(namespace)
         )
+        data, headers = get_or_compute_for_app(
+            app.id,
+            "releases",
+            lambda: self.list_releases(request, app, namespace, path),
+            request.get_full_path(),
+        )
+        return Response(data, headers=headers)
+
+    def list_releases(self, request, app, namespace, path):
         os = request.GET.get("os", None)
-        page, per_page = get_pagination_params(request)
 
         if os:
             query = Release.objects.filter(
-                app__universal_app=app,
+                universal_app=app,
                 app__os=ChoiceField(
                     choices=Application.OperatingSystem.choices
                 ).to_internal_value(os),
             )
         else:
-            query = Release.objects.filter(app__universal_app=app)
-        count = query.count()
-        releases = query.order_by("-create_time")[
-            (page - 1) * per_page : page * per_page
-        ]
+            query = Release.objects.filter(universal_app=app)
+        query = filter_version_range(query, request, "package__short_version_key")
+        releases, headers = paginate(request, query.select_related("package__app"))
         context = {
             "plist_url_name": self.plist_url_name(),
             "namespace": namespace,
             "path": path,
         }
         serializer = ReleaseSerializer(releases, many=True, context=context)
-        headers = {"X-Total-Count": count}
-        return Response(serializer.data, headers=headers)
+        return serializer.data, headers
 
     def post(self, request, namespace, path):
         app, role = check_app_manager_permission(
@@ -86,8 +93,8 @@ class UserAppReleaseDetail(APIView):
 
     def get_object(self, universal_app, release_id):
         try:
-            return Release.objects.get(
-                app__universal_app=universal_app, release_id=release_id
+            return Release.objects.select_related("package__app").get(
+                universal_app=universal_app, release_id=release_id
             )
         except Release.DoesNotExist:
             raise Http404
@@ -5,9 +5,11 @@ from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from application.models import Application
 from application.permissions import (Namespace, check_app_manager_permission,
                                      check_app_view_permission)
-from distribute.models import StoreApp, StoreAppVersionRecord
+from distribute.events import emit
+from distribute.models import StoreApp, StoreAppVersionRecord, WebhookEvent
 from distribute.serializers import (StoreAppAppStoreAuthSerializer,
                                     StoreAppHuaweiStoreAuthSerializer,
                                     StoreAppSerializer,
@@ -18,10 +20,11 @@ from distribute.serializers import (StoreAppAppStoreAuthSerializer,
 from distribute.stores.app_store import AppStore
 from distribute.stores.base import StoreType
 from distribute.stores.huawei import HuaweiStore
-from distribute.stores.store import get_store
+from distribute.stores.poll import fetch_current_versions
 from distribute.stores.vivo import VivoStore
 from distribute.stores.xiaomi import XiaomiStore
 from distribute.stores.yingyongbao import YingyongbaoStore
+from util.choice import ChoiceField
 
 
 class UserStoreAppBase(APIView):
@@ -140,15 +143,16 @@ class OrganizationStoreAppYingyongbao(UserStoreAppYingyongbao):
 
 
 def update_store_app_current_version(store_app):
-    store = get_store(store_app.store)(store_app.auth_data)
-    try:
-        data = store.store_current()
-        version = data["version"]
-        if not version:
-            return None
-    except:  # noqa: E722
+    versions = fetch_current_versions([store_app])
+    if store_app.id not in versions:
         return None
+    return record_store_app_version(store_app, versions[store_app.id])
+
 
+def record_store_app_version(store_app, version):
+    previous = StoreAppVersionRecord.objects.filter(
+        app=store_app.app, store=store_app.store
+    ).order_by("-update_time").first()
     try:
         ret = StoreAppVersionRecord.objects.get(
             app=store_app.app,
@@ -160,6 +164,17 @@ def update_store_app_current_version(store_app):
             app=store_app.app,
             store=store_app.store,
             short_version=version)
+    if previous is not None and previous.short_version != version:
+        emit(
+            WebhookEvent.Name.StoreVersionChange,
+            store_app.app.universal_app_id,
+            store=store_app.store,
+            os=ChoiceField(
+                choices=Application.OperatingSystem.choices
+            ).to_representation(store_app.app.os),
+            short_version=version,
+            previous_version=previous.short_version,
+        )
     return ret
 
 
@@ -203,16 +218,23 @@ class UserStoreAppCurrentVersion(APIView):
             StoreType.Yingyongbao
         ]
 
+        store_apps = sorted(
+            StoreApp.objects.filter(
+                app__universal_app=app, store__in=stores
+            ).select_related("app"),
+            key=lambda store_app: stores.index(store_app.store),
+        )
+        # The stores are asked at once, the ones too slow to answer by the
+        # deadline are left out.
+        current_versions = fetch_current_versions(store_apps)
         versions = []
-        for store in stores:
-            try:
-                store_app = StoreApp.objects.get(app__universal_app=app, store=store)
-            except StoreApp.DoesNotExist:
-                continue
-
-            ret = update_store_app_current_version(store_app)
-            if ret:
-                versions.append(ret)
+        for store_app in store_apps:
+            if store_app.id in current_versions:
+                versions.append(
+                    record_store_app_version(
+                        store_app, current_versions[store_app.id]
+                    )
+                )
 
         serializer = StoreAppVersionSerializer(versions, many=True)
         return Response(serializer.data)
@@ -1,84 +1,29 @@
 from django.conf import settings
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
-from django.db.models import Max
 from django.http import Http404
 from django.urls import reverse
 from rest_framework import permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from application.models import AppAPIToken, Application
 from application.permissions import (Namespace, UploadPackagePermission,
                                      check_app_upload_permission, get_app)
+from distribute.chunked_upload import (check_session_complete, create_session,
+                                       session_data, write_chunk)
+from distribute.ingest import (HashingUploadMixin, create_package,
+                               ingest_record, open_uploaded_file, queue_record)
 from distribute.models import FileUploadRecord, Package
-from distribute.package_parser import parser
-from distribute.serializers import (PackageSerializer,
+from distribute.serializers import (FileUploadRecordSerializer,
+                                    PackageSerializer,
+                                    RequestChunkedUploadPackageSerializer,
                                     RequestUploadPackageSerializer,
                                     RequestUploadSymbolFileSerializer,
                                     UploadPackageSerializer,
                                     UploadSymbolFileSerializer)
-from distribute.task import notify_new_package
-from util.url import build_absolute_uri, get_file_extension
-
-
-def create_package(
-    operator_content_object,
-    universal_app,
-    file,
-    commit_id="",
-    description="",
-    channel="",
-    build_type="Debug",
-):
-    ext = get_file_extension(file.name)
-    pkg = parser.parse(file.file, ext)
-    if pkg is None:
-        raise serializers.ValidationError({"message": "Can not parse the package."})
-    if pkg.app_icon is not None:
-        icon_file = ContentFile(pkg.app_icon)
-        icon_file.name = "icon.png"
-    else:
-        icon_file = None
-    app = None
-    if pkg.os == Application.OperatingSystem.iOS:
-        app = universal_app.iOS
-    elif pkg.os == Application.OperatingSystem.Android:
-        app = universal_app.android
-    if app is None:
-        raise serializers.ValidationError({"message": "OS not supported."})
-    max_package_id = Package.objects.filter(app__universal_app=universal_app).aggregate(Max("package_id"))   # noqa: E501
-    max_package_id = max_package_id["package_id__max"]
-    if not max_package_id:
-        max_package_id = 0
-    package_id = max_package_id + 1
-    instance = Package.objects.create(
-        operator_object_id=operator_content_object.id,
-        operator_content_object=operator_content_object,
-        build_type=build_type,
-        channel=channel,
-        app=app,
-        name=pkg.display_name,
-        package_file=file,
-        icon_file=icon_file,
-        version=pkg.version,
-        short_version=pkg.short_version,
-        bundle_identifier=pkg.bundle_identifier,
-        package_id=package_id,
-        min_os=pkg.minimum_os_version,
-        commit_id=commit_id,
-        description=description,
-        extra=pkg.extra,
-        size=file.size,
-    )
-    if not app.icon_file and icon_file is not None:
-        app.icon_file = icon_file
-        app.save()
-    notify_new_package(instance.id)
-    return instance
-
-
-class TokenAppPackageUpload(APIView):
+from util.url import build_absolute_uri
+
+
+class TokenAppPackageUpload(HashingUploadMixin, APIView):
     permission_classes = [UploadPackagePermission]
 
     def get_namespace_by_app(self, app):
@@ -170,6 +115,9 @@ class RequestUploadPackage(APIView):
     def upload_url(self):
         return reverse("token-package-upload")
 
+    def chunked_upload_url(self):
+        return reverse("token-package-chunked-upload")
+
     def uploader_type(self, request):
         return "token"
 
@@ -193,6 +141,7 @@ class RequestUploadPackage(APIView):
         if settings.STORAGE_TYPE == "LocalFileSystem":
             ret = {
                 "upload_url": build_absolute_uri(self.upload_url()),
+                "chunked_upload_url": build_absolute_uri(self.chunked_upload_url()),
                 "storage": settings.STORAGE_TYPE
             }
             return Response(ret)
@@ -235,7 +184,10 @@ class UserAppRequestUploadPackage(RequestUploadPackage):
             return app
 
     def upload_url(self):
-        return reverse("user-package-upload")
+        return reverse("user-package-upload", kwargs=self.kwargs)
+
+    def chunked_upload_url(self):
+        return reverse("user-package-chunked-upload", kwargs=self.kwargs)
 
     def uploader_type(self, request):
         return "user"
@@ -254,7 +206,149 @@ class OrganizationAppRequestUploadPackage(UserAppRequestUploadPackage):
         return Namespace.organization(path)
 
     def upload_url(self):
-        return reverse("org-package-upload")
+        return reverse("org-package-upload", kwargs=self.kwargs)
+
+    def chunked_upload_url(self):
+        return reverse("org-package-chunked-upload", kwargs=self.kwargs)
+
+
+class ChunkedUploadPackage(APIView):
+    permission_classes = [UploadPackagePermission]
+
+    def uploader_type(self, request):
+        return "token"
+
+    def uploader_id(self, request):
+        return request.token.id
+
+    def post(self, request):
+        app = request.token.app
+        return self.create_session(request, app)
+
+    def create_session(self, request, app):
+        if settings.STORAGE_TYPE != "LocalFileSystem":
+            raise serializers.ValidationError(
+                {"message": "Chunked upload needs the LocalFileSystem storage."}
+            )
+        serializer = RequestChunkedUploadPackageSerializer(data=request.data)
+        if not serializer.is_valid():
+            raise serializers.ValidationError(serializer.errors)
+        data = {
+            "description": serializer.validated_data.get("description", ""),
+            "commit_id": serializer.validated_data.get("commit_id", ""),
+            "build_type": serializer.validated_data.get("build_type", "Debug"),
+            "channel": serializer.validated_data.get("channel", ""),
+            "uploader_type": self.uploader_type(request),
+            "uploader_id": self.uploader_id(request)
+        }
+        record = create_session(
+            app,
+            serializer.validated_data["filename"],
+            serializer.validated_data["size"],
+            data,
+        )
+        return Response(session_data(record), status=status.HTTP_201_CREATED)
+
+
+class UserAppChunkedUploadPackage(ChunkedUploadPackage):
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_namespace(self, namespace):
+        return Namespace.user(namespace)
+
+    def check_and_get_app(self, request, namespace, path):
+        if request.user.is_authenticated:
+            app, role = check_app_upload_permission(
+                request.user, path, self.get_namespace(namespace)
+            )
+            return app
+        else:
+            app = get_app(path, self.get_namespace(namespace))
+            self.check_object_permissions(request, app)
+            return app
+
+    def uploader_type(self, request):
+        return "user"
+
+    def uploader_id(self, request):
+        return request.user.id
+
+    def post(self, request, namespace, path):
+        app = self.check_and_get_app(request, namespace, path)
+        return self.create_session(request, app)
+
+
+class OrganizationAppChunkedUploadPackage(UserAppChunkedUploadPackage):
+
+    def get_namespace(self, path):
+        return Namespace.organization(path)
+
+
+class ChunkedUploadPackageSession(APIView):
+    permission_classes = [UploadPackagePermission]
+
+    def get(self, request, record_id):
+        app = request.token.app
+        return self.get_session(request, app, record_id)
+
+    def put(self, request, record_id, index):
+        app = request.token.app
+        return self.put_chunk(request, app, record_id, index)
+
+    def get_session_record(self, app, record_id):
+        try:
+            record = FileUploadRecord.objects.get(id=record_id, universal_app=app)
+            if not record.data.get("chunked", False):
+                raise Http404
+        except FileUploadRecord.DoesNotExist:
+            raise Http404
+        return record
+
+    def get_session(self, request, app, record_id):
+        record = self.get_session_record(app, record_id)
+        return Response(session_data(record))
+
+    def put_chunk(self, request, app, record_id, index):
+        record = self.get_session_record(app, record_id)
+        try:
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            length = 0
+        sha256 = request.META.get("HTTP_X_CHUNK_SHA256", "")
+        record = write_chunk(record, index, request.stream, length, sha256)
+        return Response(session_data(record))
+
+
+class UserAppChunkedUploadPackageSession(ChunkedUploadPackageSession):
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_namespace(self, namespace):
+        return Namespace.user(namespace)
+
+    def check_and_get_app(self, request, namespace, path):
+        if request.user.is_authenticated:
+            app, role = check_app_upload_permission(
+                request.user, path, self.get_namespace(namespace)
+            )
+            return app
+        else:
+            app = get_app(path, self.get_namespace(namespace))
+            self.check_object_permissions(request, app)
+            return app
+
+    def get(self, request, namespace, path, record_id):
+        app = self.check_and_get_app(request, namespace, path)
+        return self.get_session(request, app, record_id)
+
+    def put(self, request, namespace, path, record_id, index):
+        app = self.check_and_get_app(request, namespace, path)
+        return self.put_chunk(request, app, record_id, index)
+
+
+class OrganizationAppChunkedUploadPackageSession(UserAppChunkedUploadPackageSession):
+
+    def get_namespace(self, path):
+        return Namespace.organization(path)
 
 
 class CheckUploadPackage(APIView):
@@ -270,14 +364,17 @@ class CheckUploadPackage(APIView):
         app = request.token.app
         return self.get_record(request, app, record_id)
 
-    def get_record(self, request, app, record_id):
+    def get_package_record(self, app, record_id):
         try:
             record = FileUploadRecord.objects.get(id=record_id, universal_app=app)
             if record.data.get("type", "") != "package":
                 raise Http404
         except FileUploadRecord.DoesNotExist:
             raise Http404
+        return record
 
+    def record_data(self, app, record):
+        data = FileUploadRecordSerializer(record).data
         if record.package:
             namespace = ""
             if app.owner:
@@ -290,79 +387,31 @@ class CheckUploadPackage(APIView):
                 "path": app.path,
             }
             serializer = PackageSerializer(record.package, context=context)
-            data = {
-                "status": "completed",
-                "data": serializer.data
-            }
-        else:
-            data = {
-                "status": "waiting"  # expired
-            }
+            data["data"] = serializer.data
+        return data
 
-        return Response(data)
+    def get_record(self, request, app, record_id):
+        record = self.get_package_record(app, record_id)
+        return Response(self.record_data(app, record))
 
     def put(self, request, record_id):
         app = request.token.app
         return self.update_record(request, app, record_id)
 
     def update_record(self, request, app, record_id):
-        try:
-            record = FileUploadRecord.objects.get(id=record_id, universal_app=app)
-            if record.data.get("type", "") != "package":
-                raise Http404
-        except FileUploadRecord.DoesNotExist:
-            raise Http404
-
+        record = self.get_package_record(app, record_id)
         if record.package:
-            namespace = ""
-            if app.owner:
-                namespace = app.owner.username
-            elif app.org:
-                namespace = app.org.path
-            context = {
-                "plist_url_name": self.plist_url_name(app),
-                "namespace": namespace,
-                "path": app.path,
-            }
-            serializer = PackageSerializer(record.package, context=context)
-            data = {
-                "status": "completed",
-                "data": serializer.data
-            }
-        else:
-            extra = record.data
-            file = default_storage.open(extra["file"])
-            commit_id = extra.get("commit_id", "")
-            description = extra.get("description", "")
-            build_type = extra.get("build_type", "Debug")
-            channel = extra.get("channel", "")
-            uploader = AppAPIToken.objects.get(id=extra["uploader_id"])
-            instance = create_package(
-                uploader, app, file, commit_id, description, channel, build_type
+            return Response(self.record_data(app, record))
+        check_session_complete(record)
+
+        if settings.ASYNC_PACKAGE_INGEST:
+            queue_record(record)
+            return Response(
+                self.record_data(app, record), status=status.HTTP_202_ACCEPTED
             )
-            record.package = instance
-            try:
-                default_storage.delete(extra["file"])
-            except:   # noqa: E722
-                pass
-            record.save()
-            namespace = ""
-            if app.owner:
-                namespace = app.owner.username
-            elif app.org:
-                namespace = app.org.path
-            context = {
-                "plist_url_name": self.plist_url_name(app),
-                "namespace": namespace,
-                "path": app.path,
-            }
-            serializer = PackageSerializer(instance, context=context)
-            data = {
-                "status": "completed",
-                "data": serializer.data
-            }
 
-        return Response(data)
+        ingest_record(record)
+        return Response(self.record_data(app, record))
 
 
 class UserAppCheckUploadPackage(CheckUploadPackage):
@@ -432,7 +481,7 @@ class TokenAppSymbolUpload(UserAppPackageUpload):
         if not serializer.is_valid():
             raise serializers.ValidationError(serializer.errors)
         try:
-            package = Package.objects.get(package_id=package_id, app__universal_app=app)
+            package = Package.objects.get(package_id=package_id, universal_app=app)
         except Package.DoesNotExist:
             raise Http404
         file = serializer.validated_data["file"]
@@ -503,7 +552,7 @@ class RequestUploadSymbolFile(APIView):
         if not serializer.is_valid():
             raise serializers.ValidationError(serializer.errors)
         try:
-            package = Package.objects.get(package_id=package_id, app__universal_app=app)
+            package = Package.objects.get(package_id=package_id, universal_app=app)
         except Package.DoesNotExist:
             raise Http404
         filename = serializer.validated_data["filename"]
@@ -642,9 +691,9 @@ class CheckUploadSymbolFile(APIView):
             package = record.package
 
             extra = record.data
-            file = default_storage.fast_open(extra["file"])
-            package.symbol_file = file
-            package.save()
+            with open_uploaded_file(extra["file"]) as file:
+                package.symbol_file = file
+                package.save()
 
             try:
                 default_storage.delete(extra["file"])
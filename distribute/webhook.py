@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from application.models import WebhookDelivery
+
+RETRY_DELAY = 1
+
+
+class WebhookDispatcher:
+    """
+    Posts webhook payloads from a bounded pool of threads. Requests to a
+    host share one keep-alive session, every request has a connect and read
+    timeout, and a webhook never has more than max_concurrency requests in
+    flight.
+    """
+
+    def __init__(self, threads, max_concurrency, timeout, attempts):
+        self.threads = threads
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.attempts = attempts
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="webhook"
+        )
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._limits = {}
+
+    def session(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host, None)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.threads)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def limit(self, webhook_id):
+        with self._lock:
+            limit = self._limits.get(webhook_id, None)
+            if limit is None:
+                limit = threading.BoundedSemaphore(self.max_concurrency)
+                self._limits[webhook_id] = limit
+            return limit
+
+    def post(self, webhook_id, url, payload):
+        """
+        Post a payload, retrying connection errors and 429 or 5xx answers.
+        Returns the delivery, not saved yet.
+        """
+        delivery = WebhookDelivery(webhook_id=webhook_id)
+        start = time.monotonic()
+        for attempt in range(1, self.attempts + 1):
+            if attempt > 1:
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 2))
+            delivery.attempts = attempt
+            try:
+                with self.limit(webhook_id):
+                    r = self.session(url).post(url, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                delivery.status_code = None
+                delivery.error = str(e)[:1024]
+                continue
+            delivery.status_code = r.status_code
+            delivery.success = 200 <= r.status_code < 300
+            delivery.error = "" if delivery.success else r.text[:1024]
+            if r.status_code != 429 and r.status_code < 500:
+                break
+        delivery.latency = int((time.monotonic() - start) * 1000)
+        return delivery
+
+    def dispatch(self, event, payloads):
+        """
+        Send (webhook, payload) pairs at once and log their deliveries. A
+        payload that is an exception is logged as failed without sending.
+        """
+        futures = []
+        deliveries = []
+        for webhook, payload in payloads:
+            if isinstance(payload, Exception):
+                deliveries.append(
+                    WebhookDelivery(webhook=webhook, error=str(payload)[:1024])
+                )
+                continue
+            futures.append(
+                self.executor.submit(self.post, webhook.id, webhook.url, payload)
+            )
+        # The pool only does network work, the log is written from the
+        # caller's database connection.
+        deliveries.extend(future.result() for future in futures)
+        for delivery in deliveries:
+            delivery.event = event
+        return WebhookDelivery.objects.bulk_create(deliveries)
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = WebhookDispatcher(
+                settings.WEBHOOK_THREADS,
+                settings.WEBHOOK_MAX_CONCURRENCY,
+                (settings.WEBHOOK_CONNECT_TIMEOUT, settings.WEBHOOK_READ_TIMEOUT),
+                settings.WEBHOOK_ATTEMPTS,
+            )
+        return _dispatcher
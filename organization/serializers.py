@@ -38,6 +38,24 @@ class OrganizationSerializer(serializers.ModelSerializer):
         ]
 
 
+class VisibleOrganizationSerializer(OrganizationSerializer):
+    """
+    An organization annotated with the current user's ``role``, which is
+    only included for members.
+    """
+
+    role = ChoiceField(choices=Role.choices, read_only=True)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if data["role"] is None:
+            del data["role"]
+        return data
+
+    class Meta(OrganizationSerializer.Meta):
+        fields = ["role"] + OrganizationSerializer.Meta.fields
+
+
 class OrganizationIconSerializer(serializers.ModelSerializer):
     class Meta:
         model = Organization
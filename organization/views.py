@@ -2,7 +2,7 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 from django.core.files import File
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Exists, IntegerField, OuterRef, Q, Subquery, Value
 from django.http import Http404
 from django.urls import reverse
 from rest_framework import permissions, status
@@ -15,10 +15,11 @@ from organization.serializers import (OrganizationIconSerializer,
                                       OrganizationSerializer,
                                       OrganizationUserAddSerializer,
                                       OrganizationUserSerializer,
-                                      UserOrganizationSerializer)
+                                      UserOrganizationSerializer,
+                                      VisibleOrganizationSerializer)
 from util.choice import ChoiceField
 from util.image import generate_icon_image
-from util.pagination import get_pagination_params
+from util.pagination import get_pagination_params, paginate
 from util.reserved import reserved_names
 from util.role import Role
 from util.url import build_absolute_uri
@@ -86,36 +87,22 @@ class OrganizationList(APIView):
         # example
         # - current user's orgs: username is my name and role is not null
         # - some user's orgs: username is user's name and role is not null
-        page, per_page = get_pagination_params(request)
-
         if request.user.is_authenticated:
             # todo
             allow_visibility = [VisibilityType.Public, VisibilityType.Internal]
-            orgs = Organization.objects.filter(visibility__in=allow_visibility)
             user_orgs = OrganizationUser.objects.filter(
-                user=request.user
-            ).prefetch_related("org")
-
-            def not_in_user_orgs(org):
-                return len(list(filter(lambda x: x.org.id == org.id, user_orgs))) == 0
-
-            orgs = filter(not_in_user_orgs, orgs)
-            data = OrganizationSerializer(orgs, many=True).data
-            user_orgs_data = UserOrganizationSerializer(user_orgs, many=True).data
-            data.extend(user_orgs_data)
-            headers = {"X-Total-Count": len(data)}
-            return Response(
-                data[(page - 1) * per_page : page * per_page], headers=headers
+                org=OuterRef("pk"), user=request.user
             )
+            query = Organization.objects.filter(
+                Q(visibility__in=allow_visibility) | Exists(user_orgs)
+            ).annotate(role=Subquery(user_orgs.values("role")[:1]))
         else:
-            query = Organization.objects.filter(visibility=VisibilityType.Public)
-            count = query.count()
-            orgs = query.order_by("create_time")[
-                (page - 1) * per_page : page * per_page
-            ]
-            serializer = OrganizationSerializer(orgs, many=True)
-            headers = {"X-Total-Count": count}
-            return Response(serializer.data, headers=headers)
+            query = Organization.objects.filter(
+                visibility=VisibilityType.Public
+            ).annotate(role=Value(None, output_field=IntegerField()))
+        orgs, headers = paginate(request, query, descending=False)
+        serializer = VisibleOrganizationSerializer(orgs, many=True)
+        return Response(serializer.data, headers=headers)
 
     @transaction.atomic
     def post(self, request):
@@ -1,9 +1,10 @@
 import os.path
 import posixpath
 import random
-import shutil
 import string
-import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from urllib.parse import urlparse
 
@@ -14,8 +15,14 @@ from django.core.files.storage import Storage
 from django.utils import timezone
 from django.utils.deconstruct import deconstructible
 
+from storage.ranged import etag_to_md5, open_ranged
 from util.url import get_file_extension
 
+# CopyObject only accepts objects up to 1 GB, bigger ones are copied part by
+# part with UploadPartCopy.
+COPY_OBJECT_MAX_SIZE = 1024 * 1024 * 1024
+COPY_PART_SIZE = 256 * 1024 * 1024
+
 
 class AliyunOssFile(File):
     """
@@ -58,21 +65,28 @@ class AliyunOssStorage(Storage):
         return posixpath.normpath(posixpath.join(self.key_prefix, _to_posix_path(name)))
 
     def _open(self, name, mode="rb"):
+        """
+        Open a file without downloading it. Reads fetch byte ranges on
+        demand and saving it to another name is a server-side copy.
+        """
         if mode != "rb":
             raise ValueError("OSS files can only be opened in read-only mode")
 
         target_name = self._get_key_name(name)
-        tmpf = tempfile.TemporaryFile()
-        obj = self.bucket.get_object(target_name)
+        meta = self.bucket.get_object_meta(target_name)
 
-        if obj.content_length is None:
-            shutil.copyfileobj(obj, tmpf)
-        else:
-            oss2.utils.copyfileobj_and_verify(
-                obj, tmpf, obj.content_length, request_id=obj.request_id
-            )
-        tmpf.seek(0)
-        return AliyunOssFile(tmpf, target_name, self)
+        def read_range(start, end):
+            obj = self.bucket.get_object(target_name, byte_range=(start, end - 1))
+            return obj.read()
+
+        file = AliyunOssFile(
+            open_ranged(meta.content_length, read_range), target_name, self
+        )
+        file.size = meta.content_length
+        file.md5 = etag_to_md5(meta.etag)
+        # Only known once the object is read, which is what this avoids.
+        file.sha256 = None
+        return file
 
     def _save(self, name, content):
         target_name = self._get_key_name(name)
@@ -82,12 +96,87 @@ class AliyunOssStorage(Storage):
                 'x-oss-object-acl': oss2.OBJECT_ACL_PUBLIC_READ
             }
         if isinstance(content, AliyunOssFile):
-            self.bucket.copy_object(self.bucket_name, content.name, target_name, headers=headers)  # noqa: E501
+            self._copy(content.name, target_name, content.size, headers)
+        elif content.size and content.size >= self.multipart_threshold:
+            self._upload_multipart(target_name, content, headers)
         else:
             content.file.seek(0)
             self.bucket.put_object(target_name, content.file, headers=headers)
         return os.path.normpath(name)
 
+    def _upload_multipart(self, target_key, content, headers=None):
+        """
+        Upload ``content`` in parts from several threads. A failed part is
+        retried on its own, the upload is only aborted when a part keeps
+        failing.
+        """
+        size = content.size
+        part_size = max(self.multipart_part_size, oss2.defaults.min_part_size)
+        lock = threading.Lock()
+
+        def upload_part(part_number, offset):
+            with lock:
+                content.file.seek(offset)
+                data = content.file.read(min(part_size, size - offset))
+            for attempt in range(self.multipart_retries + 1):
+                try:
+                    result = self.bucket.upload_part(
+                        target_key, upload_id, part_number, data
+                    )
+                    return oss2.models.PartInfo(part_number, result.etag)
+                except:  # noqa: E722
+                    if attempt == self.multipart_retries:
+                        raise
+                    time.sleep(2 ** attempt)
+
+        upload_id = self.bucket.init_multipart_upload(
+            target_key, headers=headers
+        ).upload_id
+        try:
+            with ThreadPoolExecutor(self.multipart_threads) as executor:
+                futures = [
+                    executor.submit(upload_part, i + 1, offset)
+                    for i, offset in enumerate(range(0, size, part_size))
+                ]
+                try:
+                    parts = [future.result() for future in futures]
+                except:  # noqa: E722
+                    for future in futures:
+                        future.cancel()
+                    raise
+            self.bucket.complete_multipart_upload(target_key, upload_id, parts)
+        except:  # noqa: E722
+            self.bucket.abort_multipart_upload(target_key, upload_id)
+            raise
+
+    def _copy(self, source_key, target_key, size, headers=None):
+        if size <= COPY_OBJECT_MAX_SIZE:
+            self.bucket.copy_object(
+                self.bucket_name, source_key, target_key, headers=headers
+            )
+            return
+        upload_id = self.bucket.init_multipart_upload(
+            target_key, headers=headers
+        ).upload_id
+        try:
+            parts = []
+            for start in range(0, size, COPY_PART_SIZE):
+                end = min(start + COPY_PART_SIZE, size) - 1
+                part_number = len(parts) + 1
+                result = self.bucket.upload_part_copy(
+                    self.bucket_name,
+                    source_key,
+                    (start, end),
+                    target_key,
+                    upload_id,
+                    part_number,
+                )
+                parts.append(oss2.models.PartInfo(part_number, result.etag))
+            self.bucket.complete_multipart_upload(target_key, upload_id, parts)
+        except:  # noqa: E722
+            self.bucket.abort_multipart_upload(target_key, upload_id)
+            raise
+
     def delete(self, name):
         self.bucket.delete_object(self._get_key_name(name))
 
@@ -159,13 +248,7 @@ class AliyunOssStorage(Storage):
         }
 
     def fast_open(self, name, mode="rb"):
-        if mode != "rb":
-            raise ValueError("OSS files can only be opened in read-only mode")
-
-        target_name = self._get_key_name(name)
-        tmpf = tempfile.TemporaryFile()
-
-        return AliyunOssFile(tmpf, target_name, self)
+        return self._open(name, mode)
 
 
 @deconstructible
@@ -178,4 +261,8 @@ class AliyunOssMediaStorage(AliyunOssStorage):
         self.bucket_name = settings.ALIYUN_OSS_BUCKET_NAME
         self.public_read = settings.ALIYUN_OSS_PUBLIC_READ
         self.key_prefix = settings.MEDIA_ROOT
+        self.multipart_threshold = settings.STORAGE_MULTIPART_THRESHOLD
+        self.multipart_part_size = settings.STORAGE_MULTIPART_PART_SIZE
+        self.multipart_threads = settings.STORAGE_MULTIPART_THREADS
+        self.multipart_retries = settings.STORAGE_MULTIPART_RETRIES
         super().__init__()
@@ -8,6 +8,7 @@ from django.core.files.storage import FileSystemStorage
 from django.core.signing import BadSignature, TimestampSigner
 from django.urls import reverse
 from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
 from rest_framework import permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -15,16 +16,17 @@ from rest_framework.response import Response
 
 @deconstructible
 class NginxPublicFileStorage(FileSystemStorage):
-    def __init__(self):
-        location = os.path.join(settings.MEDIA_ROOT, "public")
-        super().__init__(location)
+    # Read from MEDIA_ROOT when first used, and again whenever it changes.
+    @cached_property
+    def base_location(self):
+        return os.path.join(settings.MEDIA_ROOT, "public")
 
 
 @deconstructible
 class NginxPrivateFileStorage(FileSystemStorage):
-    def __init__(self):
-        location = os.path.join(settings.MEDIA_ROOT, "internal")
-        super().__init__(location)
+    @cached_property
+    def base_location(self):
+        return os.path.join(settings.MEDIA_ROOT, "internal")
 
     def url(self, name):
         signer = TimestampSigner()
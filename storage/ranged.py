@@ -0,0 +1,133 @@
+import errno
+import io
+import re
+from collections import OrderedDict
+
+DEFAULT_BLOCK_SIZE = 256 * 1024
+DEFAULT_CACHE_BLOCKS = 16
+DEFAULT_MAX_READ_AHEAD = 8
+
+_md5_re = re.compile(r"^[0-9a-f]{32}$")
+
+
+class RangedFile(io.RawIOBase):
+    """
+    A read-only, seekable view over a remote object.
+
+    Nothing is downloaded up front. The object is fetched in blocks through
+    ``read_range(start, end)`` (end is exclusive) and the most recently used
+    blocks are kept, so a zip parser only pulls the central directory and
+    the entries it opens. Sequential reads double the number of blocks
+    fetched per request, up to ``max_read_ahead``.
+    """
+
+    def __init__(
+        self,
+        size,
+        read_range,
+        block_size=DEFAULT_BLOCK_SIZE,
+        cache_blocks=DEFAULT_CACHE_BLOCKS,
+        max_read_ahead=DEFAULT_MAX_READ_AHEAD,
+    ):
+        self._size = size
+        self._read_range = read_range
+        self._block_size = block_size
+        self._cache_blocks = cache_blocks
+        self._max_read_ahead = max(1, min(max_read_ahead, cache_blocks))
+        self._blocks = OrderedDict()
+        self._read_ahead = 1
+        self._next_block = None
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError("invalid whence ({}, should be 0, 1 or 2)".format(whence))
+        if pos < 0:
+            raise OSError(errno.EINVAL, "negative seek position {}".format(pos))
+        self._pos = pos
+        return self._pos
+
+    def _get_block(self, index):
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+
+        if index == self._next_block:
+            self._read_ahead = min(self._read_ahead * 2, self._max_read_ahead)
+        else:
+            self._read_ahead = 1
+        count = 1
+        last_block = (self._size - 1) // self._block_size
+        while (
+            count < self._read_ahead
+            and index + count <= last_block
+            and index + count not in self._blocks
+        ):
+            count += 1
+
+        start = index * self._block_size
+        end = min(start + count * self._block_size, self._size)
+        data = self._read_range(start, end)
+        for i in range(count):
+            offset = i * self._block_size
+            self._blocks[index + i] = data[offset:offset + self._block_size]
+        self._next_block = index + count
+        while len(self._blocks) > self._cache_blocks:
+            self._blocks.popitem(last=False)
+        self._blocks.move_to_end(index)
+        return self._blocks[index]
+
+    def readinto(self, b):
+        want = min(len(b), self._size - self._pos)
+        if want <= 0:
+            return 0
+        view = memoryview(b).cast("B")
+        n = 0
+        while n < want:
+            index, offset = divmod(self._pos + n, self._block_size)
+            block = self._get_block(index)
+            chunk = block[offset:offset + want - n]
+            if not chunk:
+                break
+            view[n:n + len(chunk)] = chunk
+            n += len(chunk)
+        self._pos += n
+        return n
+
+    def close(self):
+        self._blocks.clear()
+        super().close()
+
+
+def open_ranged(size, read_range, **kwargs):
+    return RangedFile(size, read_range, **kwargs)
+
+
+def etag_to_md5(etag):
+    """
+    The ETag of an object uploaded in a single request is the MD5 of its
+    content. Multipart or encrypted objects have other ETags, return None
+    for those.
+    """
+    if not etag:
+        return None
+    etag = etag.strip('"').lower()
+    if _md5_re.match(etag):
+        return etag
+    return None
@@ -2,38 +2,48 @@ import os.path
 import random
 import string
 
+from boto3.s3.transfer import TransferConfig
 from django.conf import settings
 from django.utils import timezone
 from storages.backends.s3boto3 import S3Boto3Storage, S3Boto3StorageFile
+from storages.utils import clean_name
 
+from storage.ranged import etag_to_md5, open_ranged
 from util.url import get_file_extension
 
 
 class AWSS3MediaStorage(S3Boto3Storage):
 
-    def _save(self, name, content):
-        cleaned_name = self._clean_name(name)
-        name = self._normalize_name(cleaned_name)
-
-        if isinstance(content, S3Boto3StorageFile):
-            copy_source = {
-                "Bucket": self.bucket.name,
-                "Key": os.path.join(self.location, content.name)
-            }
-            self.bucket.copy(copy_source, name)
-            return cleaned_name
+    def __init__(self, **settings_kwargs):
+        # Large files are uploaded in parts from several threads, boto3
+        # retries failed requests on its own.
+        settings_kwargs.setdefault(
+            "transfer_config",
+            TransferConfig(
+                multipart_threshold=settings.STORAGE_MULTIPART_THRESHOLD,
+                multipart_chunksize=settings.STORAGE_MULTIPART_PART_SIZE,
+                max_concurrency=settings.STORAGE_MULTIPART_THREADS,
+                use_threads=True,
+            ),
+        )
+        super().__init__(**settings_kwargs)
 
-        params = self._get_write_parameters(name, content)
-
-        if not hasattr(content, 'seekable') or content.seekable():
-            content.seek(0, os.SEEK_SET)
-        if (self.gzip and params['ContentType'] in self.gzip_content_types
-                and 'ContentEncoding' not in params):
-            content = self._compress_content(content)
-            params['ContentEncoding'] = 'gzip'
+    def _save(self, name, content):
+        if not isinstance(content, S3Boto3StorageFile):
+            return super()._save(name, content)
 
-        obj = self.bucket.Object(name)
-        obj.upload_fileobj(content, ExtraArgs=params, Config=self._transfer_config)  # noqa: E501
+        cleaned_name = clean_name(name)
+        name = self._normalize_name(cleaned_name)
+        copy_source = {
+            "Bucket": self.bucket.name,
+            "Key": os.path.join(self.location, content.name)
+        }
+        # A managed copy, objects over the multipart threshold are copied
+        # part by part on the S3 side.
+        extra_args = {}
+        if self.default_acl:
+            extra_args["ACL"] = self.default_acl
+        self.bucket.copy(copy_source, name, ExtraArgs=extra_args)
         return cleaned_name
 
     def url(self, name, parameters=None, expire=None, http_method=None):
@@ -63,5 +73,25 @@ class AWSS3MediaStorage(S3Boto3Storage):
         response["file"] = name
         return response
 
+    def _open(self, name, mode="rb"):
+        """
+        Open a file without downloading it. Reads fetch byte ranges on
+        demand and saving it to another name is a server-side copy.
+        """
+        file = super()._open(name, mode)
+        obj = file.obj
+        if mode != "rb" or (self.gzip and obj.content_encoding == "gzip"):
+            return file
+
+        def read_range(start, end):
+            r = obj.get(Range="bytes={}-{}".format(start, end - 1))
+            return r["Body"].read()
+
+        file.file = open_ranged(obj.content_length, read_range)
+        file.md5 = etag_to_md5(obj.e_tag)
+        # Only known once the object is read, which is what this avoids.
+        file.sha256 = None
+        return file
+
     def fast_open(self, name, mode="rb"):
-        return super._open(name, mode)
+        return self._open(name, mode)
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+_missing = object()
+
+
+def app_version_key(app_id):
+    return "app_version:{}".format(app_id)
+
+
+def get_app_version(app_id):
+    key = app_version_key(app_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_app_version(app_id):
+    """
+    Drop everything cached for an app. Called again once the transaction
+    commits, so a reader that cached the old rows meanwhile is not kept.
+    """
+
+    def bump():
+        cache.set(app_version_key(app_id), uuid.uuid4().hex, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def get_or_compute(key, compute):
+    """
+    Return the cached value of ``key``, computing and storing it on a miss.
+    Only one caller computes a missing value, the others wait for it.
+    """
+    value = cache.get(key, _missing)
+    if value is not _missing:
+        return value
+    lock_key = key + ":lock"
+    if cache.add(lock_key, 1, LOCK_TIMEOUT):
+        try:
+            value = compute()
+            cache.set(key, value)
+        finally:
+            cache.delete(lock_key)
+        return value
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key, _missing)
+        if value is not _missing:
+            return value
+    return compute()
+
+
+def get_or_compute_for_app(app_id, name, compute, *parts):
+    if not settings.CACHE_APP_DATA:
+        return compute()
+    digest = hashlib.md5(json.dumps(parts).encode()).hexdigest()
+    key = "app:{}:{}:{}:{}".format(app_id, get_app_version(app_id), name, digest)
+    return get_or_compute(key, compute)
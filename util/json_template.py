@@ -0,0 +1,71 @@
+import json
+import re
+
+_placeholder_re = re.compile(r"\$\{(\w+)\}")
+
+
+def _scan(text, in_string, escaped):
+    for c in text:
+        if escaped:
+            escaped = False
+        elif c == "\\":
+            escaped = in_string
+        elif c == '"':
+            in_string = not in_string
+    return in_string, escaped
+
+
+def compile_template(body):
+    """
+    Split a JSON template into [text, name, quoted] parts, name being the
+    ${name} placeholder following the text and quoted telling whether it is
+    inside a JSON string. The last part has no placeholder.
+    """
+    if not isinstance(body, str):
+        body = json.dumps(body)
+    parts = []
+    start = 0
+    in_string = escaped = False
+    for match in _placeholder_re.finditer(body):
+        text = body[start : match.start()]
+        in_string, escaped = _scan(text, in_string, escaped)
+        parts.append([text, match.group(1), in_string])
+        start = match.end()
+    parts.append([body[start:], None, False])
+    return parts
+
+
+class TemplateContext:
+    """
+    The values of one event. Each value is encoded once however many
+    templates use it.
+    """
+
+    def __init__(self, values):
+        self.values = values
+        self._encoded = {}
+
+    def encode(self, name, quoted):
+        key = (name, quoted)
+        encoded = self._encoded.get(key, None)
+        if encoded is None:
+            if name not in self.values:
+                # Unknown placeholders are left as they are.
+                encoded = "${" + name + "}"
+            elif quoted:
+                value = self.values[name]
+                value = "" if value is None else str(value)
+                encoded = json.dumps(value, ensure_ascii=False)[1:-1]
+            else:
+                encoded = json.dumps(self.values[name], ensure_ascii=False)
+            self._encoded[key] = encoded
+        return encoded
+
+
+def render_template(parts, context):
+    chunks = []
+    for text, name, quoted in parts:
+        chunks.append(text)
+        if name is not None:
+            chunks.append(context.encode(name, quoted))
+    return json.loads("".join(chunks))
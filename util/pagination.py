@@ -1,5 +1,13 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
 
+from util.url import build_absolute_uri
+
 
 def get_pagination_params(request):
     try:
@@ -12,3 +20,71 @@ def get_pagination_params(request):
     if page <= 0 or per_page <= 0 or per_page > 100:
         raise serializers.ValidationError({"message": "0<=page and 0<per_page<=100"})
     return page, per_page
+
+
+def encode_cursor(obj):
+    value = json.dumps([obj.create_time.isoformat(), obj.id])
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        create_time, id = json.loads(value)
+        create_time = parse_datetime(create_time)
+        if create_time is None or not isinstance(id, int):
+            raise ValueError
+        return create_time, id
+    except:  # noqa: E722
+        raise serializers.ValidationError({"message": "Invalid cursor."})
+
+
+def next_page_link(request, cursor):
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return '<{}>; rel="next"'.format(
+        build_absolute_uri(request.path + "?" + urlencode(params))
+    )
+
+
+def paginate(request, query, descending=True):
+    """
+    Return one page of ``query`` ordered by create_time and the response
+    headers for it.
+
+    By default pages are picked with page/per_page and X-Total-Count holds
+    the total. A request with a ``cursor`` parameter (empty for the first
+    page) is paged by (create_time, id) instead: every page costs the same,
+    the next one is in the Link header and the total is only counted when
+    asked for with ``total=true``.
+    """
+    page, per_page = get_pagination_params(request)
+    cursor = request.GET.get("cursor", None)
+    if cursor is None:
+        order = "-create_time" if descending else "create_time"
+        count = query.count()
+        items = query.order_by(order)[(page - 1) * per_page : page * per_page]
+        return items, {"X-Total-Count": count}
+
+    headers = {}
+    if request.GET.get("total", "") in ["1", "true"]:
+        headers["X-Total-Count"] = query.count()
+    if descending:
+        query = query.order_by("-create_time", "-id")
+    else:
+        query = query.order_by("create_time", "id")
+    if cursor:
+        create_time, id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(
+                Q(create_time__lt=create_time) | Q(create_time=create_time, id__lt=id)
+            )
+        else:
+            query = query.filter(
+                Q(create_time__gt=create_time) | Q(create_time=create_time, id__gt=id)
+            )
+    items = list(query[: per_page + 1])
+    if len(items) > per_page:
+        items = items[:per_page]
+        headers["Link"] = next_page_link(request, encode_cursor(items[-1]))
+    return items, headers
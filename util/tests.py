@@ -1,16 +1,25 @@
 import random
+import re
 import shutil
 import string
+import tempfile
+from urllib.parse import parse_qs, urlsplit
 
 from django.core import mail
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 
 
-@override_settings(MEDIA_ROOT="var/media/test")
 class BaseTestCase(TestCase):
     def setUp(self):
         self.maxDiff = None
-        shutil.rmtree("var/media/test", ignore_errors=True)
+        # Stored files go to a directory of their own, removed afterwards.
+        media_root = tempfile.mkdtemp(prefix="apphub-media-")
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        cache.clear()
 
     def get_random_email(self):
         return "".join(random.choices(string.ascii_letters, k=6)) + "@example.com"
@@ -49,6 +58,9 @@ class BaseTestCase(TestCase):
     def assert_status_201(self, resp):
         self.assert_status(resp, 201)
 
+    def assert_status_202(self, resp):
+        self.assert_status(resp, 202)
+
     def assert_status_204(self, resp):
         self.assert_status(resp, 204)
 
@@ -103,6 +115,13 @@ class BaseTestCase(TestCase):
     def get_resp_list(self, r):
         return r.json()
 
+    def get_next_cursor(self, r):
+        link = r.headers.get("Link")
+        if link is None:
+            return None
+        url = re.match(r'^<(.*)>; rel="next"$', link).group(1)
+        return parse_qs(urlsplit(url).query)["cursor"][0]
+
     def get_email_verify_code(self, s):
         return s[
             s.find("verify_email/")